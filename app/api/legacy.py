@@ -0,0 +1,109 @@
+"""旧版根路径接口
+
+原先由仓库根目录的同步应用 (main.py / crud.py) 提供，现在复用 app 内的异步服务层，
+请求与响应结构保持不变，客户端迁移到 /api/v1 后可通过 LEGACY_ROUTES_ENABLED 关闭。
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from app.config import settings
+from app.database import get_db
+from app.schemas.exchange_item import ExchangeItemCreate
+from app.schemas.legacy import (
+    LegacyExchangeCreate,
+    LegacyExchangeResponse,
+    LegacyPostCreate,
+    LegacyPostResponse,
+    LegacyUserResponse,
+)
+from app.schemas.post import PostCreate
+from app.schemas.user import UserCreate
+from app.services.exchange_service import (
+    create_exchange_item as create_exchange_item_service,
+    get_exchange_item as get_exchange_item_service,
+    get_exchange_items as get_exchange_items_service
+)
+from app.services.post_service import (
+    create_post as create_post_service,
+    get_posts as get_posts_service
+)
+from app.services.user_service import (
+    create_user as create_user_service,
+    email_registered,
+    get_user as get_user_service,
+    get_users as get_users_service
+)
+from app.utils.metrics import InstrumentedRoute
+from app.utils.rate_limit import limit_by_ip
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+# 旧版接口不需要登录，发布类接口按 IP 限流；注册与 /api/v1/users/ 共用一个桶
+limit_registrations = limit_by_ip("register", settings.RATE_LIMIT_REGISTER)
+limit_legacy_writes = limit_by_ip("legacy.create", settings.RATE_LIMIT_WRITE)
+
+
+# 用户相关路由
+@router.post("/users/", response_model=LegacyUserResponse, dependencies=[Depends(limit_registrations)])
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    if await email_registered(db, user.email):
+        raise HTTPException(status_code=400, detail="邮箱已被注册")
+    db_user = await create_user_service(db, user)
+    if db_user is None:
+        raise HTTPException(status_code=400, detail="用户名或邮箱已被注册")
+    return db_user
+
+
+@router.get("/users/{user_id}", response_model=LegacyUserResponse)
+async def read_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await get_user_service(db, user_id=user_id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="用户不存在")
+    return user
+
+
+@router.get("/users/", response_model=List[LegacyUserResponse])
+async def read_users(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
+    return await get_users_service(db, skip=skip, limit=limit)
+
+
+# 资源置换相关路由
+@router.post("/exchanges/", response_model=LegacyExchangeResponse, dependencies=[Depends(limit_legacy_writes)])
+async def create_exchange(exchange: LegacyExchangeCreate, db: AsyncSession = Depends(get_db)):
+    item = ExchangeItemCreate(
+        title=exchange.title,
+        description=exchange.description,
+        category=exchange.category,
+        condition=exchange.condition,
+    )
+    return await create_exchange_item_service(
+        db, item, exchange.owner_id, image_urls=exchange.image_urls, is_available=exchange.is_available
+    )
+
+
+@router.get("/exchanges/", response_model=List[LegacyExchangeResponse])
+async def read_exchanges(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
+    # 旧版响应不含物主与图片，不加载关系
+    return await get_exchange_items_service(db, skip=skip, limit=limit, with_relations=False)
+
+
+@router.get("/exchanges/{exchange_id}", response_model=LegacyExchangeResponse)
+async def read_exchange(exchange_id: int, db: AsyncSession = Depends(get_db)):
+    exchange = await get_exchange_item_service(db, exchange_item_id=exchange_id)
+    if exchange is None:
+        raise HTTPException(status_code=404, detail="交换信息不存在")
+    return exchange
+
+
+# 社交帖子相关路由
+@router.post("/posts/", response_model=LegacyPostResponse, dependencies=[Depends(limit_legacy_writes)])
+async def create_post(post: LegacyPostCreate, db: AsyncSession = Depends(get_db)):
+    return await create_post_service(
+        db, PostCreate(title=post.title, content=post.content), post.author_id, image_urls=post.image_urls
+    )
+
+
+@router.get("/posts/", response_model=List[LegacyPostResponse])
+async def read_posts(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)):
+    return await get_posts_service(db, skip=skip, limit=limit, with_relations=False)
@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.schemas.user import CurrentUser
+from app.services.export_service import export_rows
+from app.utils.metrics import InstrumentedRoute
+from app.utils.security import require_admin
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+@router.get("/export/{name}")
+async def export(
+    name: Literal["users", "posts", "exchanges"],
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    current_user: CurrentUser = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """流式导出全表，NDJSON 每行一条记录，CSV 首行为列名"""
+    # 认证查询占用的连接先归还，导出期间只占用服务端游标的那一个连接
+    await db.close()
+    filename = f"{name}-{datetime.utcnow():%Y%m%d%H%M%S}.{fmt}"
+    return StreamingResponse(
+        export_rows(name, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import logging
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+
+from app.config import settings
+from app.database import async_session
+from app.schemas.user import CurrentUser
+from app.utils.metrics import InstrumentedRoute
+from app.utils.events import CHANNEL_PATTERN, OVERFLOW, Subscription, event_hub
+from app.utils.security import authenticate_token
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+# 一次最多合并发送的积压事件数
+_BATCH = 100
+
+
+def _bearer(headers) -> Optional[str]:
+    authorization = headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+
+async def _authenticate(token: Optional[str]) -> Optional[CurrentUser]:
+    # 浏览器的 EventSource / WebSocket 无法自定义请求头，也接受 ?token=
+    # 只在认证时短暂占用数据库连接，长连接期间不持有
+    if not token:
+        return None
+    async with async_session() as db:
+        try:
+            return await authenticate_token(token, db)
+        except HTTPException:
+            return None
+
+
+def _parse_channels(channels: List[str], user: CurrentUser) -> List[str]:
+    """校验频道名；个人通知频道只能订阅自己的"""
+    for channel in channels:
+        if not CHANNEL_PATTERN.match(channel):
+            raise ValueError(f"无效的频道: {channel}")
+        if channel.startswith("user:") and channel != f"user:{user.id}":
+            raise ValueError(f"无权订阅: {channel}")
+    return list(dict.fromkeys(channels))
+
+
+def _split(raw: Optional[str]) -> List[str]:
+    return [channel.strip() for channel in (raw or "").split(",") if channel.strip()]
+
+
+def _event(event_type: str, **data) -> str:
+    return json.dumps({"type": event_type, "data": data}, ensure_ascii=False)
+
+
+@router.get("/stream")
+async def stream_events(request: Request, channels: Optional[str] = None, token: Optional[str] = None):
+    """SSE 推送：自动订阅本人的 user:{id} 频道，另可用 channels=post:1,exchanges 订阅公共频道"""
+    user = await _authenticate(_bearer(request.headers) or token)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无法验证凭据",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    try:
+        wanted = _parse_channels([f"user:{user.id}", *_split(channels)], user)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(wanted) > settings.EVENTS_MAX_CHANNELS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"最多订阅 {settings.EVENTS_MAX_CHANNELS} 个频道"
+        )
+
+    async def body():
+        # 在响应开始后才登记订阅，客户端提前断开时不会遗留订阅
+        subscription = event_hub.open()
+        try:
+            await event_hub.subscribe(subscription, wanted)
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), settings.EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                # 积压的事件合并为一次写入
+                chunk = []
+                while True:
+                    if message is OVERFLOW:
+                        chunk.append(f"data: {_event('overflow')}\n\n")
+                        yield "".join(chunk)
+                        return
+                    chunk.append(f"data: {message}\n\n")
+                    if subscription.queue.empty() or len(chunk) >= _BATCH:
+                        break
+                    message = subscription.queue.get_nowait()
+                yield "".join(chunk)
+        finally:
+            await event_hub.close(subscription)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _receive_commands(websocket: WebSocket, subscription: Subscription, user: CurrentUser):
+    """处理客户端消息 {"action": "subscribe" | "unsubscribe", "channels": [...]}"""
+    async for text in websocket.iter_text():
+        try:
+            command = json.loads(text)
+            action = command["action"]
+            channels = _parse_channels(command["channels"], user)
+        except (ValueError, KeyError, TypeError) as e:
+            subscription.deliver(_event("error", detail=str(e) or "无效的消息"))
+            continue
+        if action == "subscribe":
+            if len(subscription.channels | set(channels)) > settings.EVENTS_MAX_CHANNELS:
+                subscription.deliver(_event("error", detail=f"最多订阅 {settings.EVENTS_MAX_CHANNELS} 个频道"))
+                continue
+            await event_hub.subscribe(subscription, channels)
+        elif action == "unsubscribe":
+            await event_hub.unsubscribe(subscription, [c for c in channels if c != f"user:{user.id}"])
+        else:
+            subscription.deliver(_event("error", detail=f"未知操作: {action}"))
+            continue
+        subscription.deliver(_event("subscribed", channels=sorted(subscription.channels)))
+
+
+async def _send_events(websocket: WebSocket, subscription: Subscription):
+    while True:
+        message = await subscription.queue.get()
+        if message is OVERFLOW:
+            await websocket.send_text(_event("overflow"))
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return
+        await websocket.send_text(message)
+
+
+@router.websocket("/ws")
+async def events_websocket(websocket: WebSocket, channels: Optional[str] = None, token: Optional[str] = None):
+    """WebSocket 推送：频道规则同 SSE，连接后还可发送 subscribe / unsubscribe 消息调整订阅"""
+    user = await _authenticate(_bearer(websocket.headers) or token)
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    try:
+        wanted = _parse_channels([f"user:{user.id}", *_split(channels)], user)[:settings.EVENTS_MAX_CHANNELS]
+    except ValueError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = event_hub.open()
+    tasks = []
+    try:
+        await event_hub.subscribe(subscription, wanted)
+        subscription.deliver(_event("subscribed", channels=sorted(subscription.channels)))
+        tasks = [
+            asyncio.create_task(_receive_commands(websocket, subscription, user)),
+            asyncio.create_task(_send_events(websocket, subscription)),
+        ]
+        # 任一方向结束（客户端断开或因积压被断开）即关闭连接
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.warning("推送连接异常关闭: %r", error)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await event_hub.close(subscription)
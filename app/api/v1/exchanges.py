@@ -1,107 +1,259 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from datetime import datetime
+from typing import Any, List, Optional
 
+from app.config import settings
 from app.database import get_db
-from app.schemas.exchange_item import ExchangeItemCreate, ExchangeItemResponse, ExchangeItemUpdate
+from app.schemas.bulk import BulkResult
+from app.schemas.exchange_match import ExchangeWantCreate, ExchangeWantResponse, SwapMatch
+from app.schemas.exchange_item import (
+    ExchangeFacets, ExchangeItemCreate, ExchangeItemResponse, ExchangeItemSummary, ExchangeItemUpdate
+)
 from app.services.exchange_service import (
     create_exchange_item as create_exchange_item_service,
+    create_exchange_items as create_exchange_items_service,
     get_exchange_item as get_exchange_item_service,
     get_exchange_items as get_exchange_items_service,
+    get_exchange_summaries as get_exchange_summaries_service,
+    get_category_facets as get_category_facets_service,
     update_exchange_item as update_exchange_item_service,
     delete_exchange_item as delete_exchange_item_service
 )
+from app.services.match_service import (
+    count_wants as count_wants_service,
+    create_want as create_want_service,
+    delete_want as delete_want_service,
+    find_matches as find_matches_service,
+    get_wants as get_wants_service
+)
+from app.services.bulk_service import import_ndjson
+from app.services.image_service import missing_image_ids as missing_image_ids_service
+from app.utils.metrics import InstrumentedRoute
+from app.utils.rate_limit import limit_by_user
 from app.utils.security import get_current_user
-from app.models.user import User
+from app.utils.ndjson import iter_ndjson
+from app.utils.pagination import CURSOR_HEADER, Cursor, cursor_param, next_cursor
+from app.utils.response_cache import query_key, response_cache
+from app.schemas.user import CurrentUser
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+exchange_item_adapter = TypeAdapter(ExchangeItemResponse)
+exchange_item_list_adapter = TypeAdapter(List[ExchangeItemSummary])
 
-router = APIRouter()
+# 发布物品（含批量与导入）共用一个桶
+limit_item_writes = limit_by_user("exchanges.create", settings.RATE_LIMIT_WRITE)
 
 
-@router.post("/", response_model=ExchangeItemResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=ExchangeItemResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_item_writes)],
+)
 async def create_exchange_item(
     exchange_item: ExchangeItemCreate, 
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    missing = await missing_image_ids_service(db, exchange_item.image_ids or [])
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"图片不存在: {missing}"
+        )
     return await create_exchange_item_service(db, exchange_item, current_user.id)
 
 
-@router.get("/{exchange_item_id}", response_model=ExchangeItemResponse)
-async def read_exchange_item(
-    exchange_item_id: int, 
-    current_user: User = Depends(get_current_user),
+@router.post("/bulk", response_model=BulkResult, dependencies=[Depends(limit_item_writes)])
+async def create_exchange_items_bulk(
+    rows: List[Any] = Body(...),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if len(rows) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"单次最多提交 {settings.BULK_MAX_ITEMS} 条"
+        )
+    return await create_exchange_items_service(db, list(enumerate(rows)), current_user.id)
+
+
+@router.post("/import", response_model=BulkResult, dependencies=[Depends(limit_item_writes)])
+async def import_exchange_items(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """NDJSON 流式导入，每行一个物品对象，结果中的 index 为行号"""
+    return await import_ndjson(
+        iter_ndjson(request.stream()),
+        lambda rows: create_exchange_items_service(db, rows, current_user.id),
+    )
+
+
+@router.get("/facets", response_model=ExchangeFacets)
+async def read_exchange_facets(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await get_category_facets_service(db)
+
+
+@router.post("/wants", response_model=ExchangeWantResponse, status_code=status.HTTP_201_CREATED)
+async def create_want(
+    want: ExchangeWantCreate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """登记想换到的物品：类别与关键词至少填一项，关键词需全部出现在物品标题中"""
+    if not (want.category or (want.keywords and want.keywords.strip())):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="类别与关键词至少填写一项"
+        )
+    if await count_wants_service(db, current_user.id) >= settings.MATCH_MAX_WANTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"最多登记 {settings.MATCH_MAX_WANTS} 条求购意向"
+        )
+    return await create_want_service(db, want, current_user.id)
+
+
+@router.get("/wants", response_model=List[ExchangeWantResponse])
+async def read_wants(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await get_wants_service(db, current_user.id)
+
+
+@router.delete("/wants/{want_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_want(
+    want_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    item = await get_exchange_item_service(db, exchange_item_id=exchange_item_id)
-    if item is None:
+    if not await delete_want_service(db, want_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="交换物品不存在"
+            detail="求购意向不存在"
         )
-    return item
+    return
+
+
+@router.get("/matches", response_model=List[SwapMatch])
+async def read_matches(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """按当前用户的求购意向与可交换物品推荐直接互换与三方轮换"""
+    return await find_matches_service(db, current_user.id, limit)
 
 
-@router.get("/", response_model=List[ExchangeItemResponse])
+@router.get("/{exchange_item_id}", response_model=ExchangeItemResponse)
+async def read_exchange_item(
+    exchange_item_id: int, 
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    async def build(headers):
+        item = await get_exchange_item_service(db, exchange_item_id=exchange_item_id)
+        if item is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="交换物品不存在"
+            )
+        return item
+
+    return await response_cache.respond(request, f"exchange:{exchange_item_id}", build, exchange_item_adapter)
+
+
+@router.get("/", response_model=List[ExchangeItemSummary])
 async def read_exchange_items(
+    request: Request,
     skip: int = 0, 
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
+    after: Optional[Cursor] = Depends(cursor_param),
+    category: Optional[str] = None,
+    condition: Optional[str] = None,
+    is_available: Optional[bool] = None,
+    owner_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    items = await get_exchange_items_service(db, skip=skip, limit=limit)
-    return items
+    async def build(headers):
+        list_items = get_exchange_summaries_service if settings.FAST_JSON_ENABLED else get_exchange_items_service
+        items = await list_items(
+            db,
+            skip=skip,
+            limit=limit,
+            after=after,
+            category=category,
+            condition=condition,
+            is_available=is_available,
+            owner_id=owner_id,
+            created_after=created_after,
+        )
+        if after is not None or not skip:
+            cursor = next_cursor(items, limit)
+            if cursor:
+                headers[CURSOR_HEADER] = cursor
+        return items
+
+    return await response_cache.respond(
+        request, query_key("exchanges", request), build, exchange_item_list_adapter, deps=("exchanges",)
+    )
 
 
 @router.put("/{exchange_item_id}", response_model=ExchangeItemResponse)
 async def update_exchange_item(
     exchange_item_id: int,
     exchange_item_update: ExchangeItemUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    item = await get_exchange_item_service(db, exchange_item_id=exchange_item_id)
-    if not item:
+    missing = await missing_image_ids_service(db, exchange_item_update.image_ids or [])
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"图片不存在: {missing}"
+        )
+
+    updated_item = await update_exchange_item_service(db, exchange_item_id, current_user.id, exchange_item_update)
+    if updated_item is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="交换物品不存在"
         )
-    if item.owner_id != current_user.id:
+    if updated_item is False:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="只能修改自己发布的物品"
         )
-        
-    updated_item = await update_exchange_item_service(db, exchange_item_id, exchange_item_update)
-    if not updated_item:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="交换物品不存在"
-        )
     return updated_item
 
 
 @router.delete("/{exchange_item_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_exchange_item(
     exchange_item_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    item = await get_exchange_item_service(db, exchange_item_id=exchange_item_id)
-    if not item:
+    deleted = await delete_exchange_item_service(db, exchange_item_id, current_user.id)
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="交换物品不存在"
         )
-    if item.owner_id != current_user.id:
+    if deleted is False:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="只能删除自己发布的物品"
         )
-        
-    success = await delete_exchange_item_service(db, exchange_item_id)
-    if not success:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="交换物品不存在"
-        )
     return
\ No newline at end of file
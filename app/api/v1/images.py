@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import get_db
+from app.schemas.image import ImageResponse
+from app.schemas.user import CurrentUser
+from app.services.image_service import (
+    get_image as get_image_service,
+    save_upload as save_upload_service
+)
+from app.utils.metrics import InstrumentedRoute
+from app.utils.images import ImageTooLarge, InvalidImage
+from app.utils.rate_limit import limit_by_user
+from app.utils.security import get_current_user
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+# multipart 边界与表单头的余量
+_MULTIPART_OVERHEAD = 16 * 1024
+
+# 图片处理占用独立线程池，按用户限流
+limit_uploads = limit_by_user("images.upload", settings.RATE_LIMIT_UPLOAD)
+
+
+@router.post(
+    "/", response_model=ImageResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(limit_uploads)]
+)
+async def upload_image(
+    request: Request,
+    file: UploadFile = File(...),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.IMAGE_MAX_BYTES + _MULTIPART_OVERHEAD:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="图片过大"
+        )
+    try:
+        return await save_upload_service(db, file, current_user.id)
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except InvalidImage as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/{image_id}", response_model=ImageResponse)
+async def read_image(
+    image_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    image = await get_image_service(db, image_id)
+    if image is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="图片不存在"
+        )
+    return image
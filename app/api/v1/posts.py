@@ -1,143 +1,280 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import Any, List, Optional
 
+from app.config import settings
 from app.database import get_db
-from app.schemas.post import PostCreate, PostResponse, PostUpdate, CommentCreate, CommentResponse
+from app.schemas.bulk import BulkResult
+from app.schemas.post import (
+    PostCreate, PostResponse, PostSummary, PostUpdate, CommentCreate, CommentResponse, FeedItem
+)
 from app.services.post_service import (
     create_post as create_post_service,
+    create_posts as create_posts_service,
     get_post as get_post_service,
     get_posts as get_posts_service,
+    get_post_summaries as get_post_summaries_service,
     update_post as update_post_service,
     delete_post as delete_post_service,
     create_comment as create_comment_service,
-    get_comments as get_comments_service
+    get_comments as get_comments_service,
+    like_post as like_post_service,
+    unlike_post as unlike_post_service
 )
+from app.utils.metrics import InstrumentedRoute
+from app.utils.rate_limit import limit_by_user
 from app.utils.security import get_current_user
-from app.models.user import User
+from app.services.bulk_service import import_ndjson
+from app.services.feed_service import get_feed as get_feed_service
+from app.services.image_service import missing_image_ids as missing_image_ids_service
+from app.utils.ndjson import iter_ndjson
+from app.utils.pagination import CURSOR_HEADER, Cursor, cursor_param, next_cursor
+from app.utils.response_cache import query_key, response_cache
+from app.schemas.user import CurrentUser
+
+router = APIRouter(route_class=InstrumentedRoute)
 
-router = APIRouter()
+post_adapter = TypeAdapter(PostResponse)
+post_list_adapter = TypeAdapter(List[PostSummary])
+comment_list_adapter = TypeAdapter(List[CommentResponse])
 
+# 发帖（含批量与导入）共用一个桶，评论单独计数
+limit_post_writes = limit_by_user("posts.create", settings.RATE_LIMIT_WRITE)
+limit_comment_writes = limit_by_user("comments.create", settings.RATE_LIMIT_WRITE)
 
-@router.post("/", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
+
+@router.post(
+    "/", response_model=PostResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(limit_post_writes)]
+)
 async def create_post(
     post: PostCreate, 
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    missing = await missing_image_ids_service(db, post.image_ids or [])
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"图片不存在: {missing}"
+        )
     return await create_post_service(db, post, current_user.id)
 
 
+@router.post("/bulk", response_model=BulkResult, dependencies=[Depends(limit_post_writes)])
+async def create_posts_bulk(
+    rows: List[Any] = Body(...),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if len(rows) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"单次最多提交 {settings.BULK_MAX_ITEMS} 条"
+        )
+    return await create_posts_service(db, list(enumerate(rows)), current_user.id)
+
+
+@router.post("/import", response_model=BulkResult, dependencies=[Depends(limit_post_writes)])
+async def import_posts(
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """NDJSON 流式导入，每行一个帖子对象，结果中的 index 为行号"""
+    return await import_ndjson(
+        iter_ndjson(request.stream()),
+        lambda rows: create_posts_service(db, rows, current_user.id),
+    )
+
+
+@router.get("/feed", response_model=List[FeedItem])
+async def read_feed(
+    response: Response,
+    limit: int = 20,
+    after: Optional[Cursor] = Depends(cursor_param),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # 时间线按帖子 id 倒序，游标中只使用 id 部分
+    posts = await get_feed_service(db, current_user.id, before=after[1] if after else None, limit=limit)
+    cursor = next_cursor(posts, limit)
+    if cursor:
+        response.headers[CURSOR_HEADER] = cursor
+    return posts
+
+
 @router.get("/{post_id}", response_model=PostResponse)
 async def read_post(
     post_id: int, 
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    post = await get_post_service(db, post_id=post_id)
-    if post is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="帖子不存在"
-        )
-    return post
+    async def build(headers):
+        post = await get_post_service(db, post_id=post_id)
+        if post is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="帖子不存在"
+            )
+        return post
 
+    return await response_cache.respond(request, f"post:{post_id}", build, post_adapter)
 
-@router.get("/", response_model=List[PostResponse])
+
+@router.get("/", response_model=List[PostSummary])
 async def read_posts(
+    request: Request,
     skip: int = 0, 
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
+    after: Optional[Cursor] = Depends(cursor_param),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    posts = await get_posts_service(db, skip=skip, limit=limit)
-    return posts
+    async def build(headers):
+        list_posts = get_post_summaries_service if settings.FAST_JSON_ENABLED else get_posts_service
+        posts = await list_posts(db, skip=skip, limit=limit, after=after)
+        if after is not None or not skip:
+            cursor = next_cursor(posts, limit)
+            if cursor:
+                headers[CURSOR_HEADER] = cursor
+        return posts
+
+    return await response_cache.respond(request, query_key("posts", request), build, post_list_adapter, deps=("posts",))
 
 
 @router.put("/{post_id}", response_model=PostResponse)
 async def update_post(
     post_id: int,
     post_update: PostUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    post = await get_post_service(db, post_id=post_id)
-    if not post:
+    missing = await missing_image_ids_service(db, post_update.image_ids or [])
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"图片不存在: {missing}"
+        )
+
+    updated_post = await update_post_service(db, post_id, current_user.id, post_update)
+    if updated_post is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="帖子不存在"
         )
-    if post.author_id != current_user.id:
+    if updated_post is False:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="只能修改自己的帖子"
         )
-        
-    updated_post = await update_post_service(db, post_id, post_update)
-    if not updated_post:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="帖子不存在"
-        )
     return updated_post
 
 
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    post = await get_post_service(db, post_id=post_id)
-    if not post:
+    deleted = await delete_post_service(db, post_id, current_user.id)
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="帖子不存在"
         )
-    if post.author_id != current_user.id:
+    if deleted is False:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="只能删除自己的帖子"
         )
-        
-    success = await delete_post_service(db, post_id)
-    if not success:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="帖子不存在"
-        )
     return
 
 
-@router.post("/{post_id}/comments", response_model=CommentResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/{post_id}/comments",
+    response_model=CommentResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_comment_writes)],
+)
 async def create_comment(
     post_id: int,
     comment: CommentCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    post = await get_post_service(db, post_id=post_id)
-    if not post:
+    db_comment = await create_comment_service(db, post_id, comment, current_user.id)
+    if db_comment is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="帖子不存在"
         )
-    
-    return await create_comment_service(db, comment, current_user.id)
+    if db_comment is False:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="回复的评论不存在"
+        )
+    return db_comment
 
 
 @router.get("/{post_id}/comments", response_model=List[CommentResponse])
 async def read_comments(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[Cursor] = Depends(cursor_param),
+    parent_id: Optional[int] = None,
+    depth: int = Query(0, ge=0, le=settings.COMMENT_MAX_DEPTH),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """不带 parent_id 时按时间正序返回顶层评论，带 parent_id 时返回该评论的回复"""
+    async def build(headers):
+        post = await get_post_service(db, post_id=post_id)
+        if not post:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="帖子不存在"
+            )
+        comments = await get_comments_service(
+            db, post_id, limit=limit, after=after, parent_id=parent_id, depth=depth
+        )
+        cursor = next_cursor(comments, limit)
+        if cursor:
+            headers[CURSOR_HEADER] = cursor
+        return comments
+
+    return await response_cache.respond(
+        request, query_key(f"comments:{post_id}", request), build, comment_list_adapter, deps=(f"comments:{post_id}",)
+    )
+
+
+@router.post("/{post_id}/like", status_code=status.HTTP_204_NO_CONTENT)
+async def like_post(
+    post_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    post = await get_post_service(db, post_id=post_id)
-    if not post:
+    liked = await like_post_service(db, post_id, current_user.id)
+    if liked is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="帖子不存在"
         )
-    
-    comments = await get_comments_service(db, post_id)
-    return comments
\ No newline at end of file
+    return
+
+
+@router.delete("/{post_id}/like", status_code=status.HTTP_204_NO_CONTENT)
+async def unlike_post(
+    post_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    removed = await unlike_post_service(db, post_id, current_user.id)
+    if not removed:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="尚未点赞该帖子"
+        )
+    return
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+
+from app.database import get_db
+from app.schemas.search import SearchHit
+from app.schemas.user import CurrentUser
+from app.services.search_service import search as search_service
+from app.utils.metrics import InstrumentedRoute
+from app.utils.security import get_current_user
+from app.utils.pagination import CURSOR_HEADER, RankCursor, encode_rank_cursor, rank_cursor_param
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+@router.get("", response_model=List[SearchHit])
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    type: Literal["posts", "exchanges"] = "posts",
+    limit: int = Query(20, ge=1, le=100),
+    after: Optional[RankCursor] = Depends(rank_cursor_param),
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    hits = await search_service(db, type, q, limit=limit, after=after)
+    if len(hits) == limit:
+        response.headers[CURSOR_HEADER] = encode_rank_cursor(hits[-1].score, hits[-1].id)
+    return hits
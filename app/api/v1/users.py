@@ -1,64 +1,102 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
+from app.config import settings
 from app.database import get_db
-from app.schemas.user import UserCreate, UserResponse, UserUpdate
+from app.schemas.user import CurrentUser, UserCreate, UserResponse, UserUpdate
 from app.services.user_service import (
     create_user as create_user_service,
+    email_registered,
     get_user as get_user_service,
     get_users as get_users_service,
+    get_user_profiles as get_user_profiles_service,
     update_user as update_user_service,
     delete_user as delete_user_service
 )
+from app.services.feed_service import (
+    follow_user as follow_user_service,
+    unfollow_user as unfollow_user_service
+)
+from app.utils.metrics import InstrumentedRoute
+from app.utils.rate_limit import limit_by_ip
 from app.utils.security import get_current_user
-from app.models.user import User
+from app.utils.pagination import CURSOR_HEADER, Cursor, cursor_param, next_cursor
+from app.utils.response_cache import query_key, response_cache
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+user_adapter = TypeAdapter(UserResponse)
+user_list_adapter = TypeAdapter(List[UserResponse])
 
-router = APIRouter()
+# 注册要做 bcrypt 哈希，按 IP 限流
+limit_registrations = limit_by_ip("register", settings.RATE_LIMIT_REGISTER)
 
 
-@router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/", response_model=UserResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(limit_registrations)]
+)
 async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
-    db_user = await get_user_service(db, email=user.email)
-    if db_user:
+    if await email_registered(db, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="邮箱已被注册"
         )
-    return await create_user_service(db, user)
+    db_user = await create_user_service(db, user)
+    if db_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户名或邮箱已被注册"
+        )
+    return db_user
 
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def read_user(
     user_id: int, 
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    user = await get_user_service(db, user_id=user_id)
-    if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="用户不存在"
-        )
-    return user
+    async def build(headers):
+        user = await get_user_service(db, user_id=user_id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="用户不存在"
+            )
+        return user
+
+    return await response_cache.respond(request, f"user:{user_id}", build, user_adapter)
 
 
 @router.get("/", response_model=List[UserResponse])
 async def read_users(
+    request: Request,
     skip: int = 0, 
     limit: int = 100,
-    current_user: User = Depends(get_current_user),
+    after: Optional[Cursor] = Depends(cursor_param),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    users = await get_users_service(db, skip=skip, limit=limit)
-    return users
+    async def build(headers):
+        list_users = get_user_profiles_service if settings.FAST_JSON_ENABLED else get_users_service
+        users = await list_users(db, skip=skip, limit=limit, after=after)
+        if after is not None or not skip:
+            cursor = next_cursor(users, limit)
+            if cursor:
+                headers[CURSOR_HEADER] = cursor
+        return users
+
+    return await response_cache.respond(request, query_key("users", request), build, user_list_adapter)
 
 
 @router.put("/{user_id}", response_model=UserResponse)
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     if current_user.id != user_id:
@@ -79,7 +117,7 @@ async def update_user(
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     if current_user.id != user_id and not current_user.is_admin:
@@ -94,4 +132,39 @@ async def delete_user(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="用户不存在"
         )
-    return
\ No newline at end of file
+    return
+
+
+@router.post("/{user_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
+async def follow_user(
+    user_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if current_user.id == user_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="不能关注自己"
+        )
+    followed = await follow_user_service(db, current_user.id, user_id)
+    if followed is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="用户不存在"
+        )
+    return
+
+
+@router.delete("/{user_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
+async def unfollow_user(
+    user_id: int,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    removed = await unfollow_user_service(db, current_user.id, user_id)
+    if not removed:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="尚未关注该用户"
+        )
+    return
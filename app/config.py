@@ -1,13 +1,136 @@
 import os
-from typing import List
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+    # 只读副本连接串，逗号分隔；为空时所有查询走主库
+    DATABASE_REPLICA_URLS: str = ""
+    # 连接池（主库与每个副本各一个）
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 300
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg 预编译语句缓存条数，使用 pgbouncer 事务模式时设为 0
+    DB_STATEMENT_CACHE_SIZE: int = 500
+    # 启动时的表结构处理：create 按模型建出缺失的表（本地开发）；verify 只核对 alembic 版本为最新，
+    # 结构变更在部署时执行 alembic upgrade head（生产）
+    DB_SCHEMA_MODE: str = "create"
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
+    # 认证用户缓存：进程内 LRU，可选 Redis 二级缓存供多个 worker 共享
+    AUTH_CACHE_TTL: int = 60
+    AUTH_CACHE_MAX_SIZE: int = 10000
+    AUTH_CACHE_REDIS: bool = False
+    # 密码哈希线程池：并发上限与排队上限，排队满时直接返回 429
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE: int = 32
+    # 点赞计数写缓冲：开启后按间隔批量落库；对账任务修正计数漂移（秒，0 表示关闭，全局只运行一份）
+    COUNTER_BUFFER_ENABLED: bool = False
+    COUNTER_FLUSH_INTERVAL: float = 1.0
+    COUNTER_RECONCILE_INTERVAL: int = 3600
+    # 首页时间线：粉丝数超过阈值的账号不做写扩散，读取时合并
+    FEED_FANOUT_THRESHOLD: int = 1000
+    FEED_MAX_LENGTH: int = 500
+    FEED_TTL: int = 7 * 24 * 3600
+    FEED_REDIS: bool = False
+    # 未开启 FEED_REDIS 时进程内最多保留时间线的用户数
+    FEED_MEMORY_MAX_USERS: int = 10000
+    # 信息流中每个帖子附带的前几条评论（0 表示不带）
+    FEED_COMMENT_PREVIEW: int = 2
+    # 评论楼中楼：按 depth 加载回复时每条评论最多带几条回复，depth 的上限
+    COMMENT_REPLY_PREVIEW: int = 3
+    COMMENT_MAX_DEPTH: int = 3
+    # 实时推送 (WebSocket / SSE)：多 worker 部署时需开启 Redis pub/sub；
+    # 每个连接最多积压的事件数（超出即断开，由客户端重连后补拉）、最多订阅的频道数、SSE 心跳间隔（秒）
+    EVENTS_REDIS: bool = False
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_MAX_CHANNELS: int = 50
+    EVENTS_HEARTBEAT: int = 15
+    # 读接口响应缓存 / ETag；多 worker 部署时需开启 Redis 共享失效信息
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL: int = 300
+    RESPONSE_CACHE_MAX_SIZE: int = 5000
+    RESPONSE_CACHE_REDIS: bool = False
+    # 物品类别分面统计的缓存时间（秒），期间的新增/下架不会立即反映在计数中
+    FACET_CACHE_TTL: int = 60
+    # 以物易物匹配：内存索引的重建间隔（秒，纳入其它 worker 的写入，0 表示不重建）、加载时每批行数、
+    # 三方轮换搜索时两侧各取的候选用户数、每个用户最多登记的求购意向数
+    MATCH_INDEX_REFRESH: int = 300
+    MATCH_LOAD_BATCH: int = 5000
+    MATCH_FANOUT: int = 50
+    MATCH_MAX_WANTS: int = 20
+    # 图片上传：local 存本地磁盘并由 MEDIA_URL 提供访问，s3 为 S3 兼容对象存储
+    STORAGE_BACKEND: str = "local"
+    MEDIA_ROOT: str = "./media"
+    MEDIA_URL: str = "/media"
+    S3_BUCKET: Optional[str] = None
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_PUBLIC_URL: Optional[str] = None
+    IMAGE_MAX_BYTES: int = 10 * 1024 * 1024
+    IMAGE_MAX_PIXELS: int = 40_000_000
+    IMAGE_THUMBNAIL_SIZE: int = 320
+    IMAGE_DISPLAY_SIZE: int = 1600
+    IMAGE_WORKERS: int = 2
+    IMAGE_QUEUE: int = 16
+    # 批量发布：JSON 数组单次条数上限、每条 INSERT 的行数、NDJSON 导入总行数与单行字节数上限
+    BULK_MAX_ITEMS: int = 500
+    BULK_CHUNK_SIZE: int = 200
+    IMPORT_MAX_ROWS: int = 50000
+    IMPORT_MAX_LINE_BYTES: int = 1024 * 1024
+    # 管理员导出：服务端游标每批取回的行数
+    EXPORT_BATCH_SIZE: int = 1000
+    # 后台任务：开启后写扩散与实时推送在主写入提交后写入 jobs 表，由 python -m app.worker 的独立进程执行；
+    # worker 与 Web 进程不共享内存，此时需开启 FEED_REDIS / EVENTS_REDIS。单进程部署可设 JOBS_IN_APP 在 Web 进程内执行。
+    # 每个 worker 的并发数、空闲时的轮询间隔、单个任务超时（秒）、最多执行次数、重试退避（秒）、已完成任务的保留时间（秒）
+    JOBS_ENABLED: bool = False
+    JOBS_IN_APP: bool = False
+    JOBS_CONCURRENCY: int = 16
+    JOBS_POLL_INTERVAL: float = 0.5
+    JOBS_TIMEOUT: float = 60
+    JOBS_MAX_ATTEMPTS: int = 5
+    JOBS_BACKOFF_BASE: float = 2
+    JOBS_BACKOFF_MAX: float = 600
+    JOBS_RETENTION: int = 7 * 24 * 3600
+    # 限流（令牌桶，"次数/second|minute|hour|day"）：多 worker 部署时需开启 Redis 共享计数；
+    # RATE_LIMIT_GLOBAL 为每个 IP 的总请求数，其余为按路由的策略（注册按 IP，发布类接口按用户）
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REDIS: bool = False
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_GLOBAL: str = "600/minute"
+    RATE_LIMIT_REGISTER: str = "10/minute"
+    RATE_LIMIT_WRITE: str = "30/minute"
+    RATE_LIMIT_UPLOAD: str = "20/minute"
+    # 快速序列化：orjson 作为默认响应类（需安装 orjson，未安装时回退到标准库 json），
+    # 帖子/物品/用户列表以列投影字典代替 ORM 对象
+    FAST_JSON_ENABLED: bool = False
+    # 请求指标：/metrics 以 Prometheus 文本格式输出，抓取时需带 Authorization: Bearer <METRICS_TOKEN>；
+    # METRICS_TOKEN 为空时只统计不输出
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+    # 采样分析：设置 PROFILE_TOKEN 后，带 X-Profile: <token> 的请求会被采样，
+    # 耗时超过 PROFILE_SLOW_MS 时把折叠栈写入 PROFILE_DIR
+    PROFILE_TOKEN: Optional[str] = None
+    PROFILE_DIR: str = "./profiles"
+    PROFILE_INTERVAL: float = 0.005
+    PROFILE_SLOW_MS: int = 200
+    # 生产启动 (python -m app.server)：WEB_CONCURRENCY 为 worker 数，0 表示按 CPU 配额与内存自动选择，
+    # 每个 worker 按 WORKER_MEMORY_MB 估算；收到 SIGTERM 后最多等 GRACEFUL_TIMEOUT 秒处理完进行中的请求
+    HOST: str = "0.0.0.0"
+    PORT: int = 8000
+    WEB_CONCURRENCY: int = 0
+    WORKER_MEMORY_MB: int = 256
+    GRACEFUL_TIMEOUT: int = 30
+    PRELOAD_APP: bool = True
+    # 信任其 X-Forwarded-For / X-Forwarded-Proto 的代理地址，逗号分隔，"*" 为全部信任（只能经平台负载均衡访问时使用）；
+    # 未正确设置时限流与日志中的客户端 IP 都是代理的地址，所有用户共用一个限流桶
+    FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    # 兼容旧版根路径接口 (/users/, /exchanges/, /posts/)
+    LEGACY_ROUTES_ENABLED: bool = True
     ALLOWED_ORIGINS: List[str] = [
         os.getenv("FRONTEND_URL", "http://localhost:3000"),
         "http://localhost:3001"
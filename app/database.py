@@ -1,29 +1,194 @@
+import ast
+import functools
+import os
+import random
+import re
+import time
+from typing import Set
+
+from sqlalchemy import Delete, Insert, Update, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.asyncio import async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app.utils.metrics import instrument_engine, record_pool_wait
 
 
 class Base(DeclarativeBase):
     pass
 
 
-# 创建异步引擎
-engine = create_async_engine(
-    settings.DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://"),
-    echo=False,  # 设置为True可查看SQL查询
-    pool_pre_ping=True,
-    pool_recycle=300,
-)
+def async_database_url(url: str) -> str:
+    """把 Render 等平台提供的同步连接串转换为异步驱动"""
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """记录每次从连接池取连接的等待时间"""
+
+    metrics_name = "primary"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.slow_checkouts = 0  # 等待超过 10ms 的次数
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if waited > 0.01:
+                self.slow_checkouts += 1
+            record_pool_wait(self.metrics_name, waited)
+
+
+def _create_engine(url: str, name: str):
+    url = make_url(async_database_url(url))
+    connect_args = {}
+    if url.drivername == "postgresql+asyncpg":
+        # SQLAlchemy 层与 asyncpg 层各有一份预编译语句缓存；走 pgbouncer 事务模式时都需设为 0
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+        connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+    async_engine = create_async_engine(
+        url,
+        echo=False,  # 设置为True可查看SQL查询
+        poolclass=TimedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    instrument_engine(async_engine, name)
+    return async_engine
+
+
+# 创建异步引擎：主库负责写入与默认读取，只读副本分担 replica_read 标记的查询
+engine = _create_engine(settings.DATABASE_URL, "primary")
+replica_engines = [
+    _create_engine(url, f"replica{i}")
+    for i, url in enumerate(url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip())
+]
+
+
+class RoutingSession(Session):
+    """按语句选择主库或只读副本
+
+    会话内一旦发生写入（flush 或 INSERT/UPDATE/DELETE），之后的读取都回到主库，
+    保证同一请求内读到自己刚写入的数据。
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            self.info["wrote"] = True
+            return engine.sync_engine
+        if replica_engines and self.info.get("replica_read") and not self.info.get("wrote"):
+            # 同一会话固定使用一个副本，避免分页等连续查询在不同副本间看到不同进度
+            if "replica" not in self.info:
+                self.info["replica"] = random.choice(replica_engines)
+            return self.info["replica"].sync_engine
+        return engine.sync_engine
+
 
 # 创建异步会话工厂
 async_session = async_sessionmaker(
     engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False
 )
 
 
+def replica_read(func):
+    """标记只读服务函数，其中的查询在会话尚未写入时发往只读副本"""
+    @functools.wraps(func)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        previous = db.info.get("replica_read", False)
+        db.info["replica_read"] = True
+        try:
+            return await func(db, *args, **kwargs)
+        finally:
+            db.info["replica_read"] = previous
+    return wrapper
+
+
+def pool_stats(async_engine) -> dict:
+    pool = async_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checkouts": pool.checkouts,
+        "wait_avg_ms": pool.wait_total / pool.checkouts * 1000 if pool.checkouts else 0.0,
+        "wait_max_ms": pool.wait_max * 1000,
+        "slow_checkouts": pool.slow_checkouts,
+    }
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+
+def migration_heads(directory: str = MIGRATIONS_DIR) -> Set[str]:
+    """最新的迁移版本：直接读取各版本文件中的 revision / down_revision
+
+    启动时不导入 alembic（导入本身约 140ms）；scripts.bench_startup 核对结果与 alembic heads 一致。
+    """
+    revisions, parents = set(), set()
+    versions = os.path.join(directory, "versions")
+    for name in os.listdir(versions):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(versions, name), encoding="utf-8") as f:
+            source = f.read()
+        revisions.add(ast.literal_eval(re.search(r"^revision = (.+)$", source, re.M).group(1)))
+        down = ast.literal_eval(re.search(r"^down_revision = (.+)$", source, re.M).group(1))
+        parents.update(down if isinstance(down, tuple) else [down] if down else [])
+    return revisions - parents
+
+
+async def _check_revision(conn):
+    try:
+        current = set((await conn.execute(text("SELECT version_num FROM alembic_version"))).scalars())
+    except DBAPIError:
+        current = set()
+    expected = migration_heads()
+    if current != expected:
+        raise RuntimeError(
+            f"数据库结构版本 {sorted(current) or '（未迁移）'} 与代码 {sorted(expected)} 不一致，请先执行 alembic upgrade head"
+        )
+
+
+async def prepare_schema(metadata):
+    """启动时处理表结构
+
+    create：按模型建出缺失的表，方便本地开发；已有的表不会加列或补索引。
+    verify：只核对 alembic 版本是否为最新，结构变更在部署时由 alembic upgrade head 完成。
+    """
+    async with engine.begin() as conn:
+        if settings.DB_SCHEMA_MODE == "verify":
+            await _check_revision(conn)
+        elif settings.DB_SCHEMA_MODE == "create":
+            await conn.run_sync(metadata.create_all)
+        else:
+            raise ValueError(f"无效的 DB_SCHEMA_MODE={settings.DB_SCHEMA_MODE!r}，可选 create / verify")
+
+
 async def get_db():
     async with async_session() as session:
-        yield session
\ No newline at end of file
+        yield session
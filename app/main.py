@@ -1,20 +1,65 @@
+import asyncio
+import hmac
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from typing import Optional
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
 
-from app.database import engine
+from app.database import engine, get_db, pool_stats, prepare_schema, replica_engines
 from app.models import Base
-from app.api.v1 import users, posts, exchanges
+from app.api import legacy
+from app.api.v1 import users, posts, exchanges, search, images, admin, events
 from app.config import settings
+from app.utils.pagination import CURSOR_HEADER
+from app.services.counter_service import counter_buffer, run_counter_flusher, run_counter_reconciler
+from app.server import is_primary_worker
+from app.services.match_service import run_match_index_refresher
+from app.services.search_service import check_search_backend
+from app.utils.events import event_hub
+from app.utils.fast_json import FastJSONResponse
+from app.utils.jobs import Worker, queue_stats
+from app.utils.metrics import InstrumentedRoute, MetricsMiddleware, registry
+from app.utils.profiler import SamplingProfiler
+from app.utils.rate_limit import RateLimitMiddleware, rate_limiter
+from app.utils.redis_client import close_redis
+from app.utils.security import principal_cache, require_admin
+from app.utils.response_cache import response_cache
+from app.services.exchange_service import facet_cache
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 启动时创建数据库表
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    for db_engine in (engine, *replica_engines):
+        check_search_backend(db_engine.dialect.name)
+    # 启动时创建数据库表，或只核对迁移版本（DB_SCHEMA_MODE）
+    await prepare_schema(Base.metadata)
+    background = []
+    if settings.COUNTER_BUFFER_ENABLED:
+        background.append(asyncio.create_task(run_counter_flusher(settings.COUNTER_FLUSH_INTERVAL)))
+    if settings.COUNTER_RECONCILE_INTERVAL > 0 and is_primary_worker():
+        background.append(asyncio.create_task(run_counter_reconciler(settings.COUNTER_RECONCILE_INTERVAL)))
+    if settings.MATCH_INDEX_REFRESH > 0:
+        background.append(asyncio.create_task(run_match_index_refresher(settings.MATCH_INDEX_REFRESH)))
+    job_worker = None
+    if settings.JOBS_ENABLED and settings.JOBS_IN_APP:
+        job_worker = Worker()
+        job_task = asyncio.create_task(job_worker.run())
     yield
     # 关闭时的清理操作
+    for task in background:
+        task.cancel()
+    if job_worker is not None:
+        # 执行中的任务做完再退出，来不及的等租约过期后由其它 worker 重新领取
+        job_worker.stop()
+        await job_task
+    await counter_buffer.flush()
+    await event_hub.shutdown()
+    await close_redis()
+    for db_engine in (engine, *replica_engines):
+        await db_engine.dispose()
 
 
 app = FastAPI(
@@ -23,8 +68,14 @@ app = FastAPI(
     lifespan=lifespan,
     openapi_url="/api/v1/openapi.json",
     docs_url="/api/v1/docs",
-    redoc_url="/api/v1/redoc"
+    redoc_url="/api/v1/redoc",
+    default_response_class=FastJSONResponse if settings.FAST_JSON_ENABLED else JSONResponse,
 )
+app.router.route_class = InstrumentedRoute
+
+if settings.RATE_LIMIT_ENABLED:
+    # 位于 CORS 之内，429 响应同样带上跨域头，前端才能读到 Retry-After
+    app.add_middleware(RateLimitMiddleware, spec=settings.RATE_LIMIT_GLOBAL, exempt=("/metrics", settings.MEDIA_URL))
 
 # 配置CORS中间件
 app.add_middleware(
@@ -33,18 +84,87 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[CURSOR_HEADER],
 )
+if settings.METRICS_ENABLED:
+    # 最后添加的在最外层，计时覆盖 CORS 在内的整个请求
+    app.add_middleware(
+        MetricsMiddleware,
+        profiler=SamplingProfiler(
+            settings.PROFILE_TOKEN, settings.PROFILE_DIR, settings.PROFILE_INTERVAL, settings.PROFILE_SLOW_MS / 1000
+        ),
+    )
 
 # 注册路由
-app.include_router(users.router, prefix="/api/v1", tags=["users"])
-app.include_router(posts.router, prefix="/api/v1", tags=["posts"])
-app.include_router(exchanges.router, prefix="/api/v1", tags=["exchanges"])
+app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
+app.include_router(posts.router, prefix="/api/v1/posts", tags=["posts"])
+app.include_router(exchanges.router, prefix="/api/v1/exchanges", tags=["exchanges"])
+app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
+app.include_router(images.router, prefix="/api/v1/images", tags=["images"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["admin"])
+app.include_router(events.router, prefix="/api/v1/events", tags=["events"])
+if settings.LEGACY_ROUTES_ENABLED:
+    app.include_router(legacy.router, tags=["legacy"], deprecated=True)
+
+# 本地存储时由应用直接提供图片文件；生产环境建议交给 Nginx / CDN
+if settings.STORAGE_BACKEND == "local":
+    os.makedirs(settings.MEDIA_ROOT, exist_ok=True)
+    app.mount(settings.MEDIA_URL, StaticFiles(directory=settings.MEDIA_ROOT), name="media")
 
+@app.get("/")
 @app.get("/api/v1/")
 def read_root():
     return {"message": "欢迎使用校园轻社交+资源置换平台API"}
 
 
+# 内部诊断信息，仅管理员可见
+@app.get("/api/v1/stats/cache", dependencies=[Depends(require_admin)])
+def read_cache_stats():
+    return {"auth": principal_cache.stats(), "response": response_cache.stats(), "facets": facet_cache.stats()}
+
+
+@app.get("/api/v1/stats/db", dependencies=[Depends(require_admin)])
+def read_db_stats():
+    return {"primary": pool_stats(engine), "replicas": [pool_stats(replica) for replica in replica_engines]}
+
+
+@app.get("/api/v1/stats/events", dependencies=[Depends(require_admin)])
+def read_event_stats():
+    return event_hub.stats()
+
+
+@app.get("/api/v1/stats/jobs", dependencies=[Depends(require_admin)])
+async def read_job_stats(db: AsyncSession = Depends(get_db)):
+    return await queue_stats(db)
+
+
+@app.get("/api/v1/stats/rate-limit", dependencies=[Depends(require_admin)])
+def read_rate_limit_stats():
+    return rate_limiter.stats()
+
+
+def _pool_gauge(stat):
+    return lambda: [({"pool": db_engine.pool.metrics_name}, stat(db_engine.pool)) for db_engine in (engine, *replica_engines)]
+
+
+registry.gauge("db_pool_checked_out", "已借出的数据库连接数", _pool_gauge(lambda pool: pool.checkedout()))
+registry.gauge("db_pool_overflow", "超出 pool_size 的临时连接数", _pool_gauge(lambda pool: pool.overflow()))
+registry.gauge("events_connections", "当前的推送连接数", lambda: [({}, event_hub.connections)])
+
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics(authorization: Optional[str] = Header(None)):
+    # 与 /api/v1/stats 同样是内部信息：只对带 METRICS_TOKEN 的抓取方开放，未设置时不输出
+    token = settings.METRICS_TOKEN
+    if not settings.METRICS_ENABLED or not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(authorization or "", f"Bearer {token}"):
+        raise HTTPException(status_code=401, detail="无效的指标令牌", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    import sys
+
+    from app.server import main
+    sys.exit(main(app=app))
\ No newline at end of file
@@ -2,7 +2,11 @@ from app.database import Base
 
 # 导入所有模型
 from app.models.user import User
-from app.models.post import Post
+from app.models.post import Post, Comment, PostLike
 from app.models.exchange_item import ExchangeItem
+from app.models.exchange_want import ExchangeWant
+from app.models.follow import Follow
+from app.models.image import Image, PostImage, ExchangeItemImage
+from app.models.job import Job
 
-__all__ = ["Base", "User", "Post", "ExchangeItem"]
\ No newline at end of file
+__all__ = ["Base", "User", "Post", "Comment", "PostLike", "ExchangeItem", "ExchangeWant", "Follow", "Image", "PostImage", "ExchangeItemImage", "Job"]
\ No newline at end of file
@@ -1,11 +1,20 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
+from app.utils.text_search import register_fulltext_index
 
 
 class ExchangeItem(Base):
     __tablename__ = "exchange_items"
+    __table_args__ = (
+        # 物品列表游标分页 (created_at, id)
+        Index("ix_exchange_items_created_at_id", "created_at", "id"),
+        # 按可交换状态 + 类别筛选并按时间翻页；也支撑类别分面统计
+        Index("ix_exchange_items_available_category_created", "is_available", "category", "created_at", "id"),
+        # 某个用户发布的物品
+        Index("ix_exchange_items_owner_id_created", "owner_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -13,10 +22,30 @@ class ExchangeItem(Base):
     description = Column(Text)
     category = Column(String(50))  # 物品类别
     condition = Column(String(20), default="良好")  # 物品状况
-    image_urls = Column(String(1000))  # 图片URL列表，用逗号分隔
+    image_urls = Column(String(1000))  # 已废弃：旧版逗号分隔的图片URL，新图片见 images
     is_available = Column(Boolean, default=True)
+    search_tokens = Column(Text)  # 标题+描述+类别的分词结果，供全文检索
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 关系定义
-    owner = relationship("User", back_populates="exchanges")
\ No newline at end of file
+    owner = relationship("User", back_populates="exchanges", lazy="raise")
+    images = relationship(
+        "Image", secondary="exchange_item_images", order_by="ExchangeItemImage.position", lazy="raise", viewonly=True
+    )
+
+    @property
+    def thumbnail_urls(self):
+        return [image.thumbnail_url for image in self.images]
+
+
+# 市场首页最常见的查询：只看可交换物品、不限类别；部分索引只包含可交换的行，体积更小
+Index(
+    "ix_exchange_items_available_created",
+    ExchangeItem.created_at,
+    ExchangeItem.id,
+    postgresql_where=ExchangeItem.is_available == True,  # noqa: E712
+    sqlite_where=ExchangeItem.is_available == True,  # noqa: E712
+)
+
+register_fulltext_index(ExchangeItem.__table__)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+from app.database import Base
+
+
+class ExchangeWant(Base):
+    """求购意向：用户想换到的物品，按类别和/或关键词描述"""
+    __tablename__ = "exchange_wants"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    category = Column(String(50))  # 为空表示不限类别
+    keywords = Column(String(200))  # 物品标题需包含的全部关键词，为空表示不限
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,48 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from datetime import datetime
+from app.database import Base
+from app.utils.storage import get_storage
+
+
+class Image(Base):
+    __tablename__ = "images"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), unique=True, nullable=False)  # 原图内容哈希，用于去重
+    uploader_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    content_type = Column(String(50), nullable=False)
+    size = Column(Integer, nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    original_key = Column(String(200), nullable=False)
+    display_key = Column(String(200), nullable=False)  # 限制最长边后的 WebP
+    thumbnail_key = Column(String(200), nullable=False)  # 列表页使用的 WebP 缩略图
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    @property
+    def url(self):
+        return get_storage().url(self.original_key)
+
+    @property
+    def webp_url(self):
+        return get_storage().url(self.display_key)
+
+    @property
+    def thumbnail_url(self):
+        return get_storage().url(self.thumbnail_key)
+
+
+class PostImage(Base):
+    __tablename__ = "post_images"
+
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    image_id = Column(Integer, ForeignKey("images.id"), primary_key=True, index=True)
+    position = Column(Integer, nullable=False, default=0)
+
+
+class ExchangeItemImage(Base):
+    __tablename__ = "exchange_item_images"
+
+    exchange_item_id = Column(Integer, ForeignKey("exchange_items.id", ondelete="CASCADE"), primary_key=True)
+    image_id = Column(Integer, ForeignKey("images.id"), primary_key=True, index=True)
+    position = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from datetime import datetime
+from app.database import Base
+
+
+class Job(Base):
+    """后台任务队列，由 python -m app.worker 领取执行"""
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # worker 按 (优先级, 可执行时间) 领取排队中的任务；回收过期租约、清理已完成任务也按状态过滤
+        Index("ix_jobs_status_priority_run_at", "status", "priority", "run_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)  # 注册的处理函数名，如 feed.fan_out
+    payload = Column(Text, nullable=False)  # JSON 参数
+    priority = Column(Integer, nullable=False, default=1)  # 0 high / 1 default / 2 low
+    status = Column(String(10), nullable=False, default="queued")  # queued / running / done / failed
+    idempotency_key = Column(String(200), unique=True)  # 同一个键只登记一次
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # 重试时按退避时间推后
+    locked_until = Column(DateTime)  # 执行中的租约，worker 崩溃后过期重新排队
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
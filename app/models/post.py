@@ -1,35 +1,79 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
+from app.utils.text_search import register_fulltext_index
 
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        # 信息流游标分页 (created_at, id)
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        # 时间线重建与大 V 帖子读时合并
+        Index("ix_posts_author_id_id", "author_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(200), nullable=False)
     content = Column(Text, nullable=False)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    image_urls = Column(String(1000))  # 图片URL列表，用逗号分隔
+    image_urls = Column(String(1000))  # 已废弃：旧版逗号分隔的图片URL，新图片见 images
     likes_count = Column(Integer, default=0)
     comments_count = Column(Integer, default=0)
+    search_tokens = Column(Text)  # 标题+正文的分词结果，供全文检索
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # 关系定义
-    author = relationship("User", back_populates="posts")
-    comments = relationship("Comment", back_populates="post", lazy="selectin")
+    author = relationship("User", back_populates="posts", lazy="raise")
+    images = relationship("Image", secondary="post_images", order_by="PostImage.position", lazy="raise", viewonly=True)
+    comments = relationship("Comment", back_populates="post", lazy="raise")
+
+    # 非映射属性：信息流中由 feed_service 填入的评论预览
+    comment_previews = ()
+
+    @property
+    def thumbnail_urls(self):
+        return [image.thumbnail_url for image in self.images]
+
+
+register_fulltext_index(Post.__table__)
 
 
 class Comment(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # 帖子下的顶层评论 (parent_id IS NULL) 游标分页，也用于信息流评论预览
+        Index("ix_comments_post_id_parent_id_created_at", "post_id", "parent_id", "created_at", "id"),
+        # 某条评论的回复
+        Index("ix_comments_parent_id_created_at", "parent_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    parent_id = Column(Integer, ForeignKey("comments.id"))  # 回复的评论，顶层评论为空
     content = Column(Text, nullable=False)
+    replies_count = Column(Integer, default=0)  # 直接回复数
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # 关系定义
-    post = relationship("Post", back_populates="comments")
\ No newline at end of file
+    post = relationship("Post", back_populates="comments", lazy="raise")
+    author = relationship("User", lazy="raise")
+
+    # 非映射属性：按 depth 加载时由 post_service 填入的部分回复
+    replies = ()
+
+
+class PostLike(Base):
+    __tablename__ = "post_likes"
+    __table_args__ = (
+        # 每个用户对同一帖子只能点赞一次
+        UniqueConstraint("post_id", "user_id", name="uq_post_likes_post_user"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
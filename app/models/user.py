@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -6,6 +6,10 @@ from app.database import Base
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # 用户列表游标分页 (created_at, id)
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String(50), unique=True, index=True, nullable=False)
@@ -16,9 +20,11 @@ class User(Base):
     avatar = Column(String(255))  # 头像URL
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
+    is_admin = Column(Boolean, default=False)
+    followers_count = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # 关系定义
-    posts = relationship("Post", back_populates="author", lazy="selectin")
-    exchanges = relationship("ExchangeItem", back_populates="owner", lazy="selectin")
\ No newline at end of file
+    # 关系定义：默认不加载，需要时在查询中显式指定加载策略
+    posts = relationship("Post", back_populates="author", lazy="raise")
+    exchanges = relationship("ExchangeItem", back_populates="owner", lazy="raise")
\ No newline at end of file
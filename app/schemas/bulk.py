@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import List
+
+
+class BulkCreated(BaseModel):
+    index: int  # 请求数组下标，NDJSON 导入时为行号（从 1 开始）
+    id: int
+
+
+class BulkRowError(BaseModel):
+    index: int
+    detail: str
+
+
+class BulkResult(BaseModel):
+    created: List[BulkCreated] = []
+    errors: List[BulkRowError] = []
@@ -1,6 +1,7 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
+from .image import ImageResponse
 from .user import UserResponse
 
 
@@ -9,11 +10,10 @@ class ExchangeItemBase(BaseModel):
     description: Optional[str] = None
     category: Optional[str] = None
     condition: Optional[str] = "良好"
-    image_urls: Optional[str] = None
 
 
 class ExchangeItemCreate(ExchangeItemBase):
-    pass
+    image_ids: List[int] = []
 
 
 class ExchangeItemUpdate(BaseModel):
@@ -21,7 +21,7 @@ class ExchangeItemUpdate(BaseModel):
     description: Optional[str] = None
     category: Optional[str] = None
     condition: Optional[str] = None
-    image_urls: Optional[str] = None
+    image_ids: Optional[List[int]] = None
     is_available: Optional[bool] = None
 
 
@@ -37,4 +37,22 @@ class ExchangeItemInDB(ExchangeItemBase):
 
 
 class ExchangeItemResponse(ExchangeItemInDB):
-    owner: UserResponse
\ No newline at end of file
+    owner: UserResponse
+    images: List[ImageResponse] = []
+    image_urls: Optional[str] = None  # 旧版数据
+
+
+class ExchangeItemSummary(ExchangeItemInDB):
+    owner: UserResponse
+    thumbnail_urls: List[str] = []
+
+
+class CategoryFacet(BaseModel):
+    category: Optional[str] = None
+    count: int
+
+
+class ExchangeFacets(BaseModel):
+    """可交换物品按类别的数量分布"""
+    total: int
+    categories: List[CategoryFacet] = []
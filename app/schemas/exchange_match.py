@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+
+class ExchangeWantCreate(BaseModel):
+    category: Optional[str] = None
+    keywords: Optional[str] = None
+
+
+class ExchangeWantResponse(ExchangeWantCreate):
+    id: int
+    user_id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class MatchItem(BaseModel):
+    id: int
+    owner_id: int
+    title: str
+    category: Optional[str] = None
+
+
+class SwapStep(BaseModel):
+    giver_id: int  # 交出物品的用户
+    receiver_id: int  # 得到物品的用户
+    item: MatchItem
+
+
+class SwapMatch(BaseModel):
+    """一个交换环：2 为直接互换，3 为三方轮换；steps 从当前用户得到物品的一步开始"""
+    size: int
+    steps: List[SwapStep]
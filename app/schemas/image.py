@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class ImageResponse(BaseModel):
+    id: int
+    url: str
+    webp_url: str
+    thumbnail_url: str
+    content_type: str
+    size: int
+    width: int
+    height: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
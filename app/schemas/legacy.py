@@ -1,26 +1,15 @@
+"""旧版根路径接口 (/users/, /exchanges/, /posts/) 的请求与响应结构，保持与原同步应用一致"""
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional
 from datetime import datetime
 
 
-# 用户相关Schema
-class UserBase(BaseModel):
+class LegacyUserResponse(BaseModel):
+    id: int
     username: str
     email: str
     full_name: Optional[str] = None
     bio: Optional[str] = ""
-
-
-class UserCreate(UserBase):
-    password: str
-
-
-class UserUpdate(UserBase):
-    is_active: Optional[bool] = True
-
-
-class UserResponse(UserBase):
-    id: int
     avatar: Optional[str] = None
     is_active: bool
     created_at: datetime
@@ -30,32 +19,25 @@ class UserResponse(UserBase):
         from_attributes = True
 
 
-# 资源置换相关Schema
-class ExchangeBase(BaseModel):
+class LegacyExchangeCreate(BaseModel):
     title: str
     description: Optional[str] = None
     category: Optional[str] = None
     condition: Optional[str] = "良好"
     image_urls: Optional[str] = None
     is_available: bool = True
-
-
-class ExchangeCreate(ExchangeBase):
     owner_id: int
 
 
-class ExchangeUpdate(BaseModel):
-    title: Optional[str] = None
+class LegacyExchangeResponse(BaseModel):
+    id: int
+    owner_id: int
+    title: str
     description: Optional[str] = None
     category: Optional[str] = None
-    condition: Optional[str] = None
+    condition: Optional[str] = "良好"
     image_urls: Optional[str] = None
-    is_available: Optional[bool] = None
-
-
-class ExchangeResponse(ExchangeBase):
-    id: int
-    owner_id: int
+    is_available: bool = True
     created_at: datetime
     updated_at: datetime
 
@@ -63,26 +45,19 @@ class ExchangeResponse(ExchangeBase):
         from_attributes = True
 
 
-# 社交帖子相关Schema
-class PostBase(BaseModel):
+class LegacyPostCreate(BaseModel):
     title: str
     content: str
     image_urls: Optional[str] = None
-
-
-class PostCreate(PostBase):
     author_id: int
 
 
-class PostUpdate(BaseModel):
-    title: Optional[str] = None
-    content: Optional[str] = None
-    image_urls: Optional[str] = None
-
-
-class PostResponse(PostBase):
+class LegacyPostResponse(BaseModel):
     id: int
     author_id: int
+    title: str
+    content: str
+    image_urls: Optional[str] = None
     likes_count: int
     comments_count: int
     created_at: datetime
@@ -90,23 +65,3 @@ class PostResponse(PostBase):
 
     class Config:
         from_attributes = True
-
-
-# 评论相关Schema
-class CommentBase(BaseModel):
-    content: str
-
-
-class CommentCreate(CommentBase):
-    post_id: int
-    author_id: int
-
-
-class CommentResponse(CommentBase):
-    id: int
-    post_id: int
-    author_id: int
-    created_at: datetime
-
-    class Config:
-        from_attributes = True
\ No newline at end of file
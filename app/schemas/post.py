@@ -1,23 +1,23 @@
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
+from .image import ImageResponse
 from .user import UserResponse
 
 
 class PostBase(BaseModel):
     title: str
     content: str
-    image_urls: Optional[str] = None
 
 
 class PostCreate(PostBase):
-    pass
+    image_ids: List[int] = []  # 先通过 /images/ 上传得到的图片ID，按顺序展示
 
 
 class PostUpdate(BaseModel):
     title: Optional[str] = None
     content: Optional[str] = None
-    image_urls: Optional[str] = None
+    image_ids: Optional[List[int]] = None
 
 
 class PostInDB(PostBase):
@@ -34,6 +34,14 @@ class PostInDB(PostBase):
 
 class PostResponse(PostInDB):
     author: UserResponse
+    images: List[ImageResponse] = []
+    image_urls: Optional[str] = None  # 旧版数据
+
+
+class PostSummary(PostInDB):
+    """列表/信息流条目，只带缩略图"""
+    author: UserResponse
+    thumbnail_urls: List[str] = []
 
 
 class CommentBase(BaseModel):
@@ -41,13 +49,16 @@ class CommentBase(BaseModel):
 
 
 class CommentCreate(CommentBase):
-    post_id: int
+    post_id: Optional[int] = None  # 已废弃：以路径中的帖子ID为准
+    parent_id: Optional[int] = None  # 回复某条评论时填写
 
 
 class CommentInDB(CommentBase):
     id: int
     post_id: int
     author_id: int
+    parent_id: Optional[int] = None
+    replies_count: int = 0
     created_at: datetime
 
     class Config:
@@ -55,4 +66,22 @@ class CommentInDB(CommentBase):
 
 
 class CommentResponse(CommentInDB):
-    author: UserResponse
\ No newline at end of file
+    author: UserResponse
+    # 按 depth 参数加载的前几条回复；完整回复列表用 parent_id 翻页获取
+    replies: List["CommentResponse"] = []
+
+
+class CommentPreview(BaseModel):
+    """信息流中的评论预览，扁平投影"""
+    id: int
+    author_id: int
+    author_username: str
+    content: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class FeedItem(PostSummary):
+    comment_previews: List[CommentPreview] = []
\ No newline at end of file
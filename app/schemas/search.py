@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from datetime import datetime
+
+
+class SearchHit(BaseModel):
+    id: int
+    title: str
+    score: float
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
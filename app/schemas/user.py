@@ -21,6 +21,8 @@ class UserUpdate(BaseModel):
 
 
 class UserInDB(UserBase):
+    # 库中邮箱已在注册时校验过；输出时不再走 EmailStr 校验，它占了列表序列化的大部分耗时
+    email: str
     id: int
     is_active: bool
     is_verified: bool
@@ -35,6 +37,17 @@ class UserResponse(UserInDB):
     pass
 
 
+class CurrentUser(BaseModel):
+    """认证依赖返回的轻量用户投影，不触发任何关系加载"""
+    id: int
+    username: str
+    is_active: bool
+    is_admin: bool = False
+
+    class Config:
+        from_attributes = True
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
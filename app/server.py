@@ -0,0 +1,295 @@
+"""生产环境启动：预加载应用后 fork 出多个 uvicorn worker
+
+用法: python -m app.server [--workers N] [--host 0.0.0.0] [--port 8000] [--no-preload] [--no-access-log]
+
+主进程导入应用、绑定端口后 fork 出 worker，所有 worker 共用同一个监听 socket。fork 前把已导入的对象
+冻结到 GC 永久代（gc.freeze），之后的垃圾回收不再写这些对象，worker 间按写时复制共享这部分内存。
+worker 使用 uvloop 与 httptools（随 uvicorn[standard] 安装，缺失时回退到 asyncio / h11）。
+多个 worker 需要 REDIS_URL 并开启各 *_REDIS 选项（见 unshared_state），否则只启动 1 个 worker。
+worker 异常退出时重新拉起；启动失败（如 DB_SCHEMA_MODE=verify 而数据库未迁移）时全部停止，不反复重启。
+其中一个 worker 为主 worker（is_primary_worker），全局只需运行一份的周期任务（计数对账）只在其中启动。
+
+收到 SIGTERM / SIGINT 后向各 worker 转发 SIGTERM：worker 停止接受新连接，最多等 GRACEFUL_TIMEOUT 秒
+处理完进行中的请求，再执行 lifespan 的关闭流程（停止后台任务、释放数据库连接池）。SSE / WebSocket 长连接
+会保持到超时，客户端随后自动重连。每个 worker 各有一个连接池，数据库连接数上限为
+worker 数 × (DB_POOL_SIZE + DB_MAX_OVERFLOW)。
+"""
+import argparse
+import gc
+import importlib.util
+import logging
+import math
+import os
+import signal
+import sys
+import time
+from typing import Optional, Set
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from app.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+APP = "app.main:app"
+# worker 启动失败（lifespan 启动阶段出错）时的退出码，与 uvicorn 一致
+STARTUP_FAILURE = 3
+# 由主进程写入各 worker 的环境变量，标记其中一个为主 worker
+PRIMARY_ENV = "APP_PRIMARY_WORKER"
+
+
+def is_primary_worker() -> bool:
+    """是否为主 worker：全局只需运行一份的周期任务（计数对账）只在主 worker 中启动
+
+    由 python -m app.server 启动时主进程只指定一个 worker（它退出后由重新拉起的 worker 接替）；
+    直接用 uvicorn 或单进程运行时总是 True。
+    """
+    return os.environ.get(PRIMARY_ENV, "1") == "1"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    """容器的 CPU 配额（核数），没有限制时为 None"""
+    value = _read("/sys/fs/cgroup/cpu.max")  # cgroup v2: "<quota> <period>" 或 "max <period>"
+    if value:
+        quota, _, period = value.partition(" ")
+        return None if quota == "max" else int(quota) / int(period)
+    quota, period = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us"), _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def cpu_limit() -> int:
+    """可用的 CPU 数：进程亲和性与容器 CPU 配额中较小者"""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        count = min(count, max(1, math.ceil(quota)))
+    return count
+
+
+def memory_limit() -> Optional[int]:
+    """可用内存（字节）：容器的内存上限，没有上限时为物理内存"""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        value = _read(path)
+        # cgroup v1 没有上限时是一个接近 2^63 的数
+        if value and value != "max" and int(value) < 1 << 60:
+            return int(value)
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_workers() -> int:
+    """每个 CPU 一个 worker，且总内存按 WORKER_MEMORY_MB 估算不超过上限"""
+    workers = cpu_limit()
+    memory = memory_limit()
+    if memory:
+        workers = min(workers, memory // (settings.WORKER_MEMORY_MB * 1024 * 1024))
+    return max(1, workers)
+
+
+def _installed(module: str, fallback: str) -> str:
+    return module if importlib.util.find_spec(module) else fallback
+
+
+def unshared_state():
+    """多 worker 部署需要开启、当前未开启的共享状态选项
+
+    这些状态默认保存在进程内：响应缓存的失效版本、首页时间线、实时推送的订阅、限流计数与认证缓存，
+    多个 worker 之间互不可见，一个 worker 上的写入不会让其它 worker 的缓存失效。
+    """
+    required = (
+        ("EVENTS_REDIS", True),
+        ("FEED_REDIS", True),
+        ("RESPONSE_CACHE_REDIS", settings.RESPONSE_CACHE_ENABLED),
+        ("RATE_LIMIT_REDIS", settings.RATE_LIMIT_ENABLED),
+        ("AUTH_CACHE_REDIS", settings.AUTH_CACHE_TTL > 0),
+    )
+    return [name for name, used in required if used and not (settings.REDIS_URL and getattr(settings, name))]
+
+
+class Arbiter:
+    """主进程：fork 并看护 worker，转发退出信号"""
+
+    def __init__(self, config: uvicorn.Config, workers: int):
+        self.config = config
+        self.workers = workers
+        self.children: Set[int] = set()
+        self.primary: Optional[int] = None
+        self.stopping = False
+        self.failed = False
+        self.sock = None
+
+    def _worker(self, primary: bool):
+        os.environ[PRIMARY_ENV] = "1" if primary else "0"
+        # 自成进程组：终端的 Ctrl+C 只发给主进程，由主进程统一转发一次（uvicorn 收到第二次信号会强制退出）
+        os.setpgid(0, 0)
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+        code = 1
+        try:
+            server = uvicorn.Server(self.config)
+            server.run(sockets=[self.sock])
+            code = 0 if server.started else STARTUP_FAILURE
+        except SystemExit as e:
+            # uvicorn 在 lifespan 启动失败时以 sys.exit(3) 退出
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            logger.exception("worker %d 异常退出", os.getpid())
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def prepare_schema(self) -> bool:
+        """在一个临时子进程中建表或核对迁移版本
+
+        多个 worker 的 lifespan 同时 create_all 会争相建表而启动失败；先建好之后 worker 里只剩检查。
+        放在子进程中执行，主进程不持有数据库连接，也不导入未预加载的模块。
+        """
+        pid = os.fork()
+        if pid == 0:
+            code = STARTUP_FAILURE
+            try:
+                import asyncio
+
+                from app.database import engine, prepare_schema
+                from app.models import Base
+
+                async def prepare():
+                    try:
+                        await prepare_schema(Base.metadata)
+                    finally:
+                        await engine.dispose()
+
+                asyncio.run(prepare())
+                code = 0
+            except Exception as e:
+                logger.error("数据库表结构检查失败：%s", e)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        return os.waitstatus_to_exitcode(status) == 0
+
+    def spawn(self, primary: bool = False):
+        pid = os.fork()
+        if pid == 0:
+            self._worker(primary)
+        self.children.add(pid)
+        if primary:
+            self.primary = pid
+
+    def _signal(self, signum, frame):
+        self.stopping = True
+
+    def _reap(self):
+        """回收已退出的 worker，返回 [(pid, 退出码)]"""
+        exited = []
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            self.children.discard(pid)
+            exited.append((pid, os.waitstatus_to_exitcode(status)))
+        return exited
+
+    def run(self) -> int:
+        if not self.prepare_schema():
+            return STARTUP_FAILURE
+        self.sock = self.config.bind_socket()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._signal)
+        # 预加载的模块与对象不再参与 GC，worker 中的回收不会改写这些页
+        gc.collect()
+        gc.freeze()
+        logger.info("主进程 %d 启动 %d 个 worker（loop=%s，http=%s）",
+                    os.getpid(), self.workers, self.config.loop, self.config.http)
+        for i in range(self.workers):
+            self.spawn(primary=i == 0)
+        while not self.stopping:
+            for pid, code in self._reap():
+                if code == STARTUP_FAILURE:
+                    logger.error("worker %d 启动失败，停止服务", pid)
+                    self.failed = self.stopping = True
+                    break
+                logger.warning("worker %d 退出（退出码 %d），重新启动", pid, code)
+                self.spawn(primary=pid == self.primary)
+            time.sleep(0.2)
+        self.shutdown()
+        return 1 if self.failed else 0
+
+    def shutdown(self):
+        logger.info("等待 %d 个 worker 处理完进行中的请求", len(self.children))
+        for pid in self.children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        # 排空请求之后还有 lifespan 关闭流程，多留几秒
+        deadline = time.monotonic() + settings.GRACEFUL_TIMEOUT + 10
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            logger.warning("worker %d 未按时退出，强制结束", pid)
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self.sock.close()
+
+
+def main(argv=None, app=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.server")
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_CONCURRENCY, help="0 表示自动选择")
+    parser.add_argument("--no-preload", dest="preload", action="store_false", default=settings.PRELOAD_APP,
+                        help="各 worker 在 fork 之后自行导入应用")
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false", help="不输出访问日志")
+    parser.add_argument("--allow-unshared-state", action="store_true",
+                        help="未开启共享状态时也启动多个 worker，仅用于只读压测")
+    args = parser.parse_args(argv)
+    workers = args.workers or default_workers()
+
+    # 预加载时主进程先导入应用，worker 直接继承；否则把导入字符串交给 uvicorn 在 worker 中加载
+    target = app or (import_from_string(APP) if args.preload else APP)
+    config = uvicorn.Config(
+        target,
+        host=args.host,
+        port=args.port,
+        loop=_installed("uvloop", "asyncio"),
+        http=_installed("httptools", "h11"),
+        lifespan="on",
+        access_log=args.access_log,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        timeout_graceful_shutdown=settings.GRACEFUL_TIMEOUT,
+    )
+    unshared = unshared_state() if workers > 1 else []
+    if unshared and not args.allow_unshared_state:
+        logger.warning("未配置 REDIS_URL 或未开启 %s，worker 之间的缓存失效、时间线、推送与限流互不可见，只启动 1 个 worker",
+                       " / ".join(unshared))
+        workers = 1
+    return Arbiter(config, workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.image import Image
+from app.schemas.bulk import BulkCreated, BulkResult, BulkRowError
+from app.utils.ndjson import InvalidLine
+
+
+class BulkRow(NamedTuple):
+    index: int
+    values: dict
+    image_ids: List[int]
+
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or '-'}: {item['msg']}" for item in error.errors()
+    )
+
+
+def validate_rows(schema: Type[BaseModel], rows: Iterable[Tuple[int, Any]]):
+    """逐行用 Pydantic 模型校验，返回 (通过的 (下标, 模型) 列表, 错误列表)"""
+    valid, errors = [], []
+    for index, raw in rows:
+        try:
+            valid.append((index, schema.model_validate(raw)))
+        except ValidationError as e:
+            errors.append(BulkRowError(index=index, detail=_validation_detail(e)))
+    return valid, errors
+
+
+async def _insert_chunk(db: AsyncSession, model, rows: List[BulkRow], link_model, owner_column: Optional[str]):
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+    result = await db.execute(stmt, [row.values for row in rows])
+    ids = result.scalars().all()
+    links = [
+        {owner_column: row_id, "image_id": image_id, "position": position}
+        for row, row_id in zip(rows, ids)
+        for position, image_id in enumerate(dict.fromkeys(row.image_ids))
+    ]
+    if links:
+        await db.execute(insert(link_model), links)
+    return [BulkCreated(index=row.index, id=row_id) for row, row_id in zip(rows, ids)]
+
+
+async def bulk_insert(
+    db: AsyncSession, model, rows: List[BulkRow], link_model=None, owner_column: Optional[str] = None
+) -> BulkResult:
+    """按块插入，每块一条多行 INSERT ... RETURNING；某块失败时在保存点内逐行重试，定位出错的行"""
+    result = BulkResult()
+    image_ids = {image_id for row in rows for image_id in row.image_ids}
+    if image_ids:
+        found = set((await db.execute(select(Image.id).where(Image.id.in_(image_ids)))).scalars().all())
+        missing = image_ids - found
+        if missing:
+            for row in rows:
+                bad = [image_id for image_id in row.image_ids if image_id in missing]
+                if bad:
+                    result.errors.append(BulkRowError(index=row.index, detail=f"图片不存在: {bad}"))
+            rows = [row for row in rows if not missing.intersection(row.image_ids)]
+
+    chunk_size = settings.BULK_CHUNK_SIZE
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            async with db.begin_nested():
+                result.created.extend(await _insert_chunk(db, model, chunk, link_model, owner_column))
+            continue
+        except DBAPIError:
+            pass
+        for row in chunk:
+            try:
+                async with db.begin_nested():
+                    result.created.extend(await _insert_chunk(db, model, [row], link_model, owner_column))
+            except DBAPIError as e:
+                result.errors.append(BulkRowError(index=row.index, detail=str(e.orig)))
+    return result
+
+
+async def import_ndjson(
+    lines: AsyncIterator[Tuple[int, Any]],
+    create_chunk: Callable[[List[Tuple[int, Any]]], Awaitable[BulkResult]],
+) -> BulkResult:
+    """流式导入：攒够一块就写入并提交，已提交的块不受后续错误影响"""
+    result = BulkResult()
+    chunk: List[Tuple[int, Any]] = []
+    seen = 0
+
+    async def flush():
+        chunk_result = await create_chunk(chunk)
+        result.created.extend(chunk_result.created)
+        result.errors.extend(chunk_result.errors)
+        chunk.clear()
+
+    async for line_no, item in lines:
+        seen += 1
+        if seen > settings.IMPORT_MAX_ROWS:
+            result.errors.append(BulkRowError(index=line_no, detail=f"超过单次导入上限 {settings.IMPORT_MAX_ROWS} 行，后续内容未处理"))
+            break
+        if isinstance(item, InvalidLine):
+            result.errors.append(BulkRowError(index=line_no, detail=item.detail))
+            continue
+        chunk.append((line_no, item))
+        if len(chunk) >= settings.BULK_CHUNK_SIZE:
+            await flush()
+    if chunk:
+        await flush()
+    result.errors.sort(key=lambda error: error.index)
+    return result
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+from sqlalchemy import and_, bindparam, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.post import Comment, Post, PostLike
+from app.utils.jobs import dispatch, job_handler
+from app.utils.response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+COUNTER_COLUMNS = ("likes_count", "comments_count")
+# 对账时每条 UPDATE 修正的帖子数上限
+RECONCILE_BATCH = 1000
+
+
+async def increment_post_counters(db: AsyncSession, post_id: int, **deltas: int) -> Optional[int]:
+    """UPDATE posts SET x = x + n，避免读改写在热门帖子上串行；返回帖子作者 id，帖子不存在时为 None"""
+    values = {name: getattr(Post, name) + delta for name, delta in deltas.items()}
+    stmt = (
+        update(Post)
+        .where(Post.id == post_id)
+        .values(values)
+        .returning(Post.author_id)
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+class CounterBuffer:
+    """合并同一帖子的计数增量，周期性批量写入"""
+
+    def __init__(self):
+        self._pending: Dict[int, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+        self.flushed_batches = 0
+
+    def add(self, post_id: int, column: str, delta: int):
+        self._pending[post_id][column] += delta
+
+    def __len__(self):
+        return len(self._pending)
+
+    def _drain(self) -> Dict[int, Dict[str, int]]:
+        pending, self._pending = self._pending, defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+        return pending
+
+    async def flush(self):
+        pending = self._drain()
+        if not pending:
+            return 0
+        table = Post.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("post_id"))
+            .values(
+                likes_count=table.c.likes_count + bindparam("d_likes"),
+                comments_count=table.c.comments_count + bindparam("d_comments"),
+            )
+        )
+        params = [
+            {"post_id": post_id, "d_likes": deltas["likes_count"], "d_comments": deltas["comments_count"]}
+            for post_id, deltas in pending.items()
+        ]
+        try:
+            async with async_session() as db:
+                await db.execute(stmt, params)
+                await db.commit()
+        except Exception:
+            # 写入失败时把增量放回缓冲，下次重试
+            for post_id, deltas in pending.items():
+                for column, delta in deltas.items():
+                    self.add(post_id, column, delta)
+            raise
+        self.flushed_batches += 1
+        await response_cache.invalidate(*(f"post:{post_id}" for post_id in pending))
+        await response_cache.bump("posts")
+        return len(params)
+
+
+counter_buffer = CounterBuffer()
+
+
+async def reconcile_post_counters(db: AsyncSession, settle: float = 0) -> int:
+    """按 post_likes / comments 实际行数修正漂移的计数，返回修正的帖子数
+
+    settle 大于 0 时先找出计数不一致的帖子，等待 settle 秒再只修正仍不一致的：其它进程缓冲中的点赞增量
+    在此期间落库，不会先被实际行数覆盖、再叠加一次已计入的增量。
+    """
+    likes = select(func.count(PostLike.id)).where(PostLike.post_id == Post.id).scalar_subquery()
+    comments = select(func.count(Comment.id)).where(Comment.post_id == Post.id).scalar_subquery()
+    mismatched = or_(
+        func.coalesce(Post.likes_count, 0) != likes,
+        func.coalesce(Post.comments_count, 0) != comments,
+    )
+    if settle > 0:
+        post_ids = list(await db.scalars(select(Post.id).where(mismatched).order_by(Post.id)))
+        await db.commit()
+        if not post_ids:
+            return 0
+        await asyncio.sleep(settle)
+        batches = [post_ids[i:i + RECONCILE_BATCH] for i in range(0, len(post_ids), RECONCILE_BATCH)]
+    else:
+        batches = [None]
+    fixed = 0
+    for batch in batches:
+        stmt = (
+            update(Post)
+            .where(mismatched if batch is None else and_(Post.id.in_(batch), mismatched))
+            .values(likes_count=likes, comments_count=comments)
+            .execution_options(synchronize_session=False)
+        )
+        fixed += (await db.execute(stmt)).rowcount
+        await db.commit()
+    if fixed:
+        await response_cache.bump("all")
+    return fixed
+
+
+@job_handler("counters.reconcile")
+async def reconcile_counters(db: AsyncSession):
+    settle = settings.COUNTER_FLUSH_INTERVAL * 3 if settings.COUNTER_BUFFER_ENABLED else 0
+    fixed = await reconcile_post_counters(db, settle)
+    if fixed:
+        logger.info("计数对账修正了 %d 个帖子", fixed)
+
+
+async def run_counter_flusher(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await counter_buffer.flush()
+        except Exception:
+            logger.exception("计数缓冲写入失败")
+
+
+async def run_counter_reconciler(interval: float):
+    """定时触发计数对账，只在一个 Web worker 中运行（见 app.server.is_primary_worker）
+
+    按整点对齐的时间段生成幂等键：开启 JOBS_ENABLED 时多个实例在同一时段只登记一个任务，由后台 worker 执行；
+    未开启时就地执行。
+    """
+    while True:
+        await asyncio.sleep(interval - time.time() % interval)
+        try:
+            # 先落库本进程的缓冲，避免对账后再叠加旧增量
+            await counter_buffer.flush()
+            async with async_session() as db:
+                slot = round(time.time() / interval)
+                await dispatch(db, reconcile_counters, {}, key=f"counters:reconcile:{slot}", lane="low")
+        except Exception:
+            logger.exception("计数对账失败")
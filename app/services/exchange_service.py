@@ -1,58 +1,300 @@
+from datetime import datetime
+from sqlalchemy import delete, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload, selectinload
+from app.config import settings
+from app.database import replica_read
 from app.models.exchange_item import ExchangeItem
-from app.schemas.exchange_item import ExchangeItemCreate, ExchangeItemUpdate
+from app.models.image import ExchangeItemImage
+from app.models.user import User
+from app.services.bulk_service import BulkRow, bulk_insert, validate_rows
+from app.services.image_service import link_images, thumbnail_urls
+from app.services.user_service import profile_columns, profile_from_row
+from app.services.match_service import index_item, unindex_item
+from app.schemas.bulk import BulkResult
+from app.schemas.exchange_item import (
+    CategoryFacet, ExchangeFacets, ExchangeItemCreate, ExchangeItemInDB, ExchangeItemUpdate
+)
+from app.utils.cache import TieredCache
+from app.utils.events import publish_events
+from app.utils.jobs import dispatch
+from app.utils.pagination import Cursor, keyset
+from app.utils.response_cache import response_cache
+from app.utils.text_search import search_document
+from typing import Any, List, Optional, Tuple
 
+# 类别分面是全表聚合，按 TTL 缓存，不随每次写入失效
+facet_cache: TieredCache[ExchangeFacets] = TieredCache(
+    "facets:exchanges",
+    ExchangeFacets,
+    maxsize=1,
+    ttl=settings.FACET_CACHE_TTL,
+    use_redis=settings.RESPONSE_CACHE_REDIS,
+)
 
-async def create_exchange_item(db: AsyncSession, exchange_item: ExchangeItemCreate, owner_id: int):
+
+def _event_data(db_item: ExchangeItem) -> dict:
+    return {
+        "id": db_item.id,
+        "owner_id": db_item.owner_id,
+        "title": db_item.title,
+        "category": db_item.category,
+        "condition": db_item.condition,
+        "is_available": db_item.is_available,
+    }
+
+
+async def create_exchange_item(
+    db: AsyncSession,
+    exchange_item: ExchangeItemCreate,
+    owner_id: int,
+    image_urls: Optional[str] = None,
+    is_available: bool = True,
+):
+    # image_urls / is_available 仅供旧版接口写入
     db_item = ExchangeItem(
         title=exchange_item.title,
         description=exchange_item.description,
         category=exchange_item.category,
         condition=exchange_item.condition,
-        image_urls=exchange_item.image_urls,
-        owner_id=owner_id
+        image_urls=image_urls,
+        is_available=is_available,
+        owner_id=owner_id,
+        search_tokens=search_document(exchange_item.title, exchange_item.description, exchange_item.category)
     )
     db.add(db_item)
+    if exchange_item.image_ids:
+        await db.flush()
+        await link_images(db, ExchangeItemImage, "exchange_item_id", db_item.id, exchange_item.image_ids)
     await db.commit()
-    await db.refresh(db_item)
+    await response_cache.bump("exchanges")
+    await db.refresh(db_item, ["owner", "images"])
+    index_item(db_item.id, owner_id, db_item.title, db_item.category, db_item.is_available)
+    events = [("exchanges", "exchange.created", _event_data(db_item))]
+    await dispatch(db, publish_events, {"events": events}, lane="high")
     return db_item
 
 
+async def create_exchange_items(db: AsyncSession, rows: List[Tuple[int, Any]], owner_id: int) -> BulkResult:
+    """批量发布物品：rows 为 (下标, 原始数据)，逐行校验后分块插入，出错的行记入 errors 而不影响其它行"""
+    valid, errors = validate_rows(ExchangeItemCreate, rows)
+    result = await bulk_insert(
+        db,
+        ExchangeItem,
+        [
+            BulkRow(index, {
+                "title": item.title,
+                "description": item.description,
+                "category": item.category,
+                "condition": item.condition,
+                "owner_id": owner_id,
+                "search_tokens": search_document(item.title, item.description, item.category),
+            }, item.image_ids)
+            for index, item in valid
+        ],
+        ExchangeItemImage,
+        "exchange_item_id",
+    )
+    await db.commit()
+    if result.created:
+        await response_cache.bump("exchanges")
+        items = dict(valid)
+        for created in result.created:
+            item = items[created.index]
+            index_item(created.id, owner_id, item.title, item.category)
+        # 批量发布合并为一条事件，避免把订阅者的队列一次塞满
+        events = [("exchanges", "exchange.bulk_created", {
+            "owner_id": owner_id,
+            "ids": [created.id for created in result.created],
+        })]
+        await dispatch(db, publish_events, {"events": events}, lane="high")
+    result.errors = sorted(errors + result.errors, key=lambda error: error.index)
+    return result
+
+
 async def get_exchange_item(db: AsyncSession, exchange_item_id: int):
-    stmt = select(ExchangeItem).where(ExchangeItem.id == exchange_item_id)
+    stmt = (
+        select(ExchangeItem)
+        .options(joinedload(ExchangeItem.owner), selectinload(ExchangeItem.images))
+        .where(ExchangeItem.id == exchange_item_id)
+    )
     result = await db.execute(stmt)
     return result.scalar_one_or_none()
 
 
-async def get_exchange_items(db: AsyncSession, skip: int = 0, limit: int = 100):
-    stmt = select(ExchangeItem).offset(skip).limit(limit).order_by(ExchangeItem.created_at.desc())
+@replica_read
+async def get_exchange_items(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Cursor] = None,
+    with_relations: bool = True,
+    category: Optional[str] = None,
+    condition: Optional[str] = None,
+    is_available: Optional[bool] = None,
+    owner_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+):
+    stmt = _filter_items(
+        select(ExchangeItem), skip, limit, after, category, condition, is_available, owner_id, created_after
+    )
+    if with_relations:
+        stmt = stmt.options(joinedload(ExchangeItem.owner), selectinload(ExchangeItem.images))
     result = await db.execute(stmt)
     return result.scalars().all()
 
 
-async def update_exchange_item(db: AsyncSession, exchange_item_id: int, exchange_item_update: ExchangeItemUpdate):
-    stmt = select(ExchangeItem).where(ExchangeItem.id == exchange_item_id)
-    result = await db.execute(stmt)
-    db_item = result.scalar_one_or_none()
-    
-    if db_item:
-        for var, value in vars(exchange_item_update).items():
-            if value is not None:
-                setattr(db_item, var, value)
-        await db.commit()
-        await db.refresh(db_item)
-        return db_item
-    return None
-
-
-async def delete_exchange_item(db: AsyncSession, exchange_item_id: int):
-    stmt = select(ExchangeItem).where(ExchangeItem.id == exchange_item_id)
+@replica_read
+async def get_exchange_summaries(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[Cursor] = None,
+    category: Optional[str] = None,
+    condition: Optional[str] = None,
+    is_available: Optional[bool] = None,
+    owner_id: Optional[int] = None,
+    created_after: Optional[datetime] = None,
+) -> List[dict]:
+    """get_exchange_items 的列投影版本：按 ExchangeItemSummary 的字段取列拼成字典，不构造 ORM 对象"""
+    fields = tuple(ExchangeItemInDB.model_fields)
+    stmt = (
+        select(*(getattr(ExchangeItem, name) for name in fields), *profile_columns("owner_"))
+        .join(User, User.id == ExchangeItem.owner_id)
+    )
+    stmt = _filter_items(stmt, skip, limit, after, category, condition, is_available, owner_id, created_after)
+    rows = (await db.execute(stmt)).mappings().all()
+    thumbnails = await thumbnail_urls(db, ExchangeItemImage, "exchange_item_id", [row["id"] for row in rows])
+    return [
+        {
+            **{name: row[name] for name in fields},
+            "owner": profile_from_row(row, "owner_"),
+            "thumbnail_urls": thumbnails.get(row["id"], []),
+        }
+        for row in rows
+    ]
+
+
+def _filter_items(stmt, skip, limit, after, category, condition, is_available, owner_id, created_after):
+    # 布尔值渲染为字面量 (= true / = 1)，与部分索引的条件一致，规划器才能选用该索引
+    if is_available is not None:
+        stmt = stmt.where(ExchangeItem.is_available == is_available)
+    if category is not None:
+        stmt = stmt.where(ExchangeItem.category == category)
+    if condition is not None:
+        stmt = stmt.where(ExchangeItem.condition == condition)
+    if owner_id is not None:
+        stmt = stmt.where(ExchangeItem.owner_id == owner_id)
+    if created_after is not None:
+        stmt = stmt.where(ExchangeItem.created_at > created_after)
+    if after is not None or not skip:
+        return keyset(stmt, ExchangeItem, after).limit(limit)
+    return stmt.offset(skip).limit(limit).order_by(ExchangeItem.created_at.desc())
+
+
+@replica_read
+async def get_category_facets(db: AsyncSession) -> ExchangeFacets:
+    """可交换物品按类别计数，走 (is_available, category, ...) 索引的仅索引扫描"""
+    facets = await facet_cache.get("available")
+    if facets is not None:
+        return facets
+    count = func.count().label("count")
+    stmt = (
+        select(ExchangeItem.category, count)
+        .where(ExchangeItem.is_available == True)  # noqa: E712
+        .group_by(ExchangeItem.category)
+        .order_by(count.desc(), ExchangeItem.category)
+    )
+    rows = (await db.execute(stmt)).all()
+    facets = ExchangeFacets(
+        total=sum(row.count for row in rows),
+        categories=[CategoryFacet(category=row.category, count=row.count) for row in rows],
+    )
+    await facet_cache.set("available", facets)
+    return facets
+
+
+SEARCH_FIELDS = ("title", "description", "category")
+
+
+async def _missing_or_forbidden(db: AsyncSession, exchange_item_id: int) -> Optional[bool]:
+    # 带物主条件的写入没有命中时，再区分物品不存在 (None) 与无权限 (False)
+    exists = await db.scalar(select(ExchangeItem.id).where(ExchangeItem.id == exchange_item_id))
+    return None if exists is None else False
+
+
+async def update_exchange_item(
+    db: AsyncSession, exchange_item_id: int, owner_id: int, exchange_item_update: ExchangeItemUpdate
+):
+    """只允许物主修改；物品不存在返回 None，不是物主返回 False"""
+    values = {var: value for var, value in vars(exchange_item_update).items() if value is not None and var != "image_ids"}
+    touched = [field for field in SEARCH_FIELDS if field in values]
+    if len(touched) == len(SEARCH_FIELDS):
+        values["search_tokens"] = search_document(*(values[field] for field in SEARCH_FIELDS))
+    values["updated_at"] = datetime.utcnow()
+    options = [selectinload(ExchangeItem.owner)]
+    if exchange_item_update.image_ids is None:
+        options.append(selectinload(ExchangeItem.images))
+    stmt = (
+        update(ExchangeItem)
+        .where(ExchangeItem.id == exchange_item_id, ExchangeItem.owner_id == owner_id)
+        .values(**values)
+        .returning(ExchangeItem)
+        .options(*options)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
     result = await db.execute(stmt)
     db_item = result.scalar_one_or_none()
-    
-    if db_item:
-        await db.delete(db_item)
-        await db.commit()
-        return True
-    return False
\ No newline at end of file
+    if db_item is None:
+        await db.rollback()
+        return await _missing_or_forbidden(db, exchange_item_id)
+
+    if touched and "search_tokens" not in values:
+        # 只改了部分检索字段，需要结合更新后的其余字段重新分词
+        db_item.search_tokens = search_document(db_item.title, db_item.description, db_item.category)
+    if exchange_item_update.image_ids is not None:
+        await link_images(db, ExchangeItemImage, "exchange_item_id", exchange_item_id, exchange_item_update.image_ids)
+    await db.commit()
+    await response_cache.invalidate(f"exchange:{exchange_item_id}")
+    await response_cache.bump("exchanges")
+    if exchange_item_update.image_ids is not None:
+        await db.refresh(db_item, ["images"])
+    index_item(db_item.id, db_item.owner_id, db_item.title, db_item.category, db_item.is_available)
+    data = _event_data(db_item)
+    events = [(f"exchange:{exchange_item_id}", "exchange.updated", data)]
+    if "is_available" in values:
+        # 上架/下架会改变市场列表，同时通知市场频道
+        events.append(("exchanges", "exchange.updated", data))
+    await dispatch(db, publish_events, {"events": events}, lane="high")
+    return db_item
+
+
+async def delete_exchange_item(db: AsyncSession, exchange_item_id: int, owner_id: int) -> Optional[bool]:
+    """只允许物主删除；成功返回 True，物品不存在返回 None，不是物主返回 False"""
+    owned = (
+        select(ExchangeItem.id)
+        .where(ExchangeItem.id == exchange_item_id, ExchangeItem.owner_id == owner_id)
+        .scalar_subquery()
+    )
+    await db.execute(delete(ExchangeItemImage).where(ExchangeItemImage.exchange_item_id == owned))
+    result = await db.execute(
+        delete(ExchangeItem)
+        .where(ExchangeItem.id == exchange_item_id, ExchangeItem.owner_id == owner_id)
+        .returning(ExchangeItem.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.scalar_one_or_none() is None:
+        await db.rollback()
+        return await _missing_or_forbidden(db, exchange_item_id)
+    await db.commit()
+    await response_cache.invalidate(f"exchange:{exchange_item_id}")
+    await response_cache.bump("exchanges")
+    unindex_item(exchange_item_id)
+    data = {"id": exchange_item_id, "owner_id": owner_id}
+    events = [
+        (f"exchange:{exchange_item_id}", "exchange.deleted", data),
+        ("exchanges", "exchange.deleted", data),
+    ]
+    await dispatch(db, publish_events, {"events": events}, lane="high")
+    return True
\ No newline at end of file
@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database import async_session
+from app.models.exchange_item import ExchangeItem
+from app.models.post import Post
+from app.models.user import User
+
+# 每种导出对应一条扁平投影：只选需要的列，不构造 ORM 对象；按主键排序保证输出稳定
+EXPORTS = {
+    "users": select(
+        User.id, User.username, User.email, User.full_name, User.is_active, User.is_verified,
+        User.is_admin, User.followers_count, User.created_at,
+    ).order_by(User.id),
+    "posts": select(
+        Post.id, Post.title, Post.content, Post.author_id, User.username.label("author_username"),
+        Post.likes_count, Post.comments_count, Post.created_at, Post.updated_at,
+    ).join(User, Post.author_id == User.id).order_by(Post.id),
+    "exchanges": select(
+        ExchangeItem.id, ExchangeItem.title, ExchangeItem.description, ExchangeItem.category,
+        ExchangeItem.condition, ExchangeItem.is_available, ExchangeItem.owner_id,
+        User.username.label("owner_username"), ExchangeItem.created_at, ExchangeItem.updated_at,
+    ).join(User, ExchangeItem.owner_id == User.id).order_by(ExchangeItem.id),
+}
+
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ndjson_chunk(columns: Sequence[str], rows) -> bytes:
+    return "".join(
+        json.dumps({column: _plain(value) for column, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+        for row in rows
+    ).encode()
+
+
+def _csv_chunk(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def export_rows(name: str, fmt: str) -> AsyncIterator[bytes]:
+    """按批产出导出内容
+
+    使用独立会话和服务端游标：开始输出时才取连接，每批 EXPORT_BATCH_SIZE 行编码后立即发出，
+    内存占用与总行数无关；输出结束或客户端断开时连接随会话归还连接池。
+    """
+    stmt = EXPORTS[name]
+    columns = list(stmt.selected_columns.keys())
+    if fmt == "csv":
+        # 带 BOM，Excel 打开中文不乱码
+        yield b"\xef\xbb\xbf" + _csv_chunk([columns])
+    async with async_session() as session:
+        session.info["replica_read"] = True
+        result = await session.stream(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for rows in result.partitions():
+            yield _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(columns, rows)
@@ -0,0 +1,173 @@
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import delete, func, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.config import settings
+from app.models.follow import Follow
+from app.models.post import Comment, Post
+from app.models.user import User
+from app.utils.jobs import job_handler
+from app.utils.timeline import get_timeline_store
+
+logger = logging.getLogger(__name__)
+
+
+async def _change_followers(db: AsyncSession, user_id: int, delta: int):
+    stmt = (
+        update(User)
+        .where(User.id == user_id)
+        .values(followers_count=User.followers_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(stmt)
+
+
+async def follow_user(db: AsyncSession, follower_id: int, followee_id: int) -> Optional[bool]:
+    """被关注用户不存在返回 None，新关注返回 True，重复关注返回 False"""
+    followee_exists = await db.scalar(select(User.id).where(User.id == followee_id))
+    if followee_exists is None:
+        return None
+    db.add(Follow(follower_id=follower_id, followee_id=followee_id))
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        return False
+    await _change_followers(db, followee_id, 1)
+    await db.commit()
+    # 关注关系变化后让时间线失效，下次读取时重建
+    await get_timeline_store().drop(follower_id)
+    return True
+
+
+async def unfollow_user(db: AsyncSession, follower_id: int, followee_id: int) -> bool:
+    stmt = delete(Follow).where(Follow.follower_id == follower_id, Follow.followee_id == followee_id)
+    result = await db.execute(stmt)
+    if result.rowcount == 0:
+        await db.rollback()
+        return False
+    await _change_followers(db, followee_id, -1)
+    await db.commit()
+    await get_timeline_store().drop(follower_id)
+    return True
+
+
+@job_handler("feed.fan_out")
+async def fan_out_posts(db: AsyncSession, post_ids: List[int], author_id: int):
+    """写扩散：把新帖子推送到粉丝（及作者本人）的时间线，大 V 账号跳过
+
+    同一作者的一批新帖子只遍历一次粉丝列表；时间线按帖子 id 去重，任务重试时重复执行无副作用。
+    """
+    if not post_ids:
+        return
+    store = get_timeline_store()
+    try:
+        followers_count = await db.scalar(select(User.followers_count).where(User.id == author_id))
+        if (followers_count or 0) > settings.FEED_FANOUT_THRESHOLD:
+            for post_id in post_ids:
+                await store.push([author_id], post_id)
+            return
+        stmt = select(Follow.follower_id).where(Follow.followee_id == author_id)
+        result = await db.stream_scalars(stmt.execution_options(yield_per=1000))
+        batch = [author_id]
+        async for follower_id in result:
+            batch.append(follower_id)
+            if len(batch) >= 1000:
+                for post_id in post_ids:
+                    await store.push(batch, post_id)
+                batch = []
+        if batch:
+            for post_id in post_ids:
+                await store.push(batch, post_id)
+    except RedisError:
+        # 推送失败只影响时间线新鲜度，粉丝的时间线过期后会重建
+        logger.exception("帖子 %s 写扩散失败", post_ids)
+
+
+async def _recent_post_ids(db: AsyncSession, author_filter, before: Optional[int], limit: int) -> List[int]:
+    stmt = select(Post.id).where(author_filter)
+    if before is not None:
+        stmt = stmt.where(Post.id < before)
+    stmt = stmt.order_by(Post.id.desc()).limit(limit)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+def _timeline_authors(user_id: int):
+    followees = select(Follow.followee_id).where(Follow.follower_id == user_id)
+    return or_(Post.author_id.in_(followees), Post.author_id == user_id)
+
+
+async def get_feed(db: AsyncSession, user_id: int, before: Optional[int] = None, limit: int = 20):
+    store = get_timeline_store()
+    try:
+        if not await store.exists(user_id):
+            post_ids = await _recent_post_ids(db, _timeline_authors(user_id), None, settings.FEED_MAX_LENGTH)
+            await store.replace(user_id, post_ids)
+        post_ids = await store.page(user_id, before, limit)
+    except RedisError:
+        # 时间线存储不可用时退回拉模式
+        post_ids = await _recent_post_ids(db, _timeline_authors(user_id), before, limit)
+
+    # 大 V 的帖子未做写扩散，读取时从 (author_id, id) 索引合并
+    celebrities = select(Follow.followee_id).join(User, User.id == Follow.followee_id).where(
+        Follow.follower_id == user_id,
+        User.followers_count > settings.FEED_FANOUT_THRESHOLD,
+    )
+    celebrity_ids = await _recent_post_ids(db, Post.author_id.in_(celebrities), before, limit)
+    post_ids = sorted(set(post_ids) | set(celebrity_ids), reverse=True)[:limit]
+    if not post_ids:
+        return []
+
+    stmt = select(Post).options(joinedload(Post.author), selectinload(Post.images)).where(Post.id.in_(post_ids))
+    result = await db.execute(stmt)
+    posts = {post.id: post for post in result.scalars().all()}
+    previews = await comment_previews(db, [post.id for post in posts.values() if post.comments_count])
+    for post_id, comments in previews.items():
+        posts[post_id].comment_previews = comments
+    # 已删除的帖子直接跳过
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+
+async def comment_previews(db: AsyncSession, post_ids: List[int]) -> Dict[int, list]:
+    """一批帖子各自最早的 FEED_COMMENT_PREVIEW 条顶层评论，一条窗口函数查询取回"""
+    if not post_ids or settings.FEED_COMMENT_PREVIEW <= 0:
+        return {}
+    ranked = (
+        select(
+            Comment.id,
+            Comment.post_id,
+            Comment.author_id,
+            Comment.content,
+            Comment.created_at,
+            func.row_number().over(
+                partition_by=Comment.post_id, order_by=(Comment.created_at, Comment.id)
+            ).label("position"),
+        )
+        .where(Comment.post_id.in_(post_ids), Comment.parent_id.is_(None))
+        .subquery()
+    )
+    stmt = (
+        select(
+            ranked.c.id,
+            ranked.c.post_id,
+            ranked.c.author_id,
+            User.username.label("author_username"),
+            ranked.c.content,
+            ranked.c.created_at,
+        )
+        .join(User, User.id == ranked.c.author_id)
+        .where(ranked.c.position <= settings.FEED_COMMENT_PREVIEW)
+        .order_by(ranked.c.post_id, ranked.c.position)
+    )
+    previews = defaultdict(list)
+    for row in (await db.execute(stmt)).all():
+        previews[row.post_id].append(row)
+    return previews
@@ -0,0 +1,82 @@
+import os
+from collections import defaultdict
+from typing import Dict, List
+
+from fastapi import UploadFile
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.image import Image
+from app.utils.images import process_and_store_async, receive_upload
+from app.utils.storage import get_storage
+
+
+async def get_image(db: AsyncSession, image_id: int):
+    return await db.get(Image, image_id)
+
+
+async def save_upload(db: AsyncSession, upload: UploadFile, uploader_id: int) -> Image:
+    """保存上传的图片；内容相同的图片只存一份，直接返回已有记录"""
+    path, sha256, size = await receive_upload(upload)
+    try:
+        existing = await db.scalar(select(Image).where(Image.sha256 == sha256))
+        if existing is not None:
+            return existing
+        # 处理期间不占用数据库连接
+        await db.commit()
+        fields = await process_and_store_async(path, sha256)
+    finally:
+        os.remove(path)
+
+    db_image = Image(sha256=sha256, uploader_id=uploader_id, size=size, **fields)
+    db.add(db_image)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # 并发上传了同一张图片，存储键按内容寻址，文件已经一致
+        await db.rollback()
+        return await db.scalar(select(Image).where(Image.sha256 == sha256))
+    return db_image
+
+
+async def missing_image_ids(db: AsyncSession, image_ids: List[int]) -> List[int]:
+    if not image_ids:
+        return []
+    result = await db.execute(select(Image.id).where(Image.id.in_(image_ids)))
+    found = set(result.scalars().all())
+    return [image_id for image_id in image_ids if image_id not in found]
+
+
+async def link_images(db: AsyncSession, link_model, owner_column: str, owner_id: int, image_ids: List[int]):
+    """按顺序替换帖子/物品关联的图片，调用方负责提交事务"""
+    owner = getattr(link_model, owner_column)
+    await db.execute(delete(link_model).where(owner == owner_id))
+    image_ids = list(dict.fromkeys(image_ids))
+    if image_ids:
+        await db.execute(
+            insert(link_model),
+            [
+                {owner_column: owner_id, "image_id": image_id, "position": position}
+                for position, image_id in enumerate(image_ids)
+            ],
+        )
+
+
+async def thumbnail_urls(db: AsyncSession, link_model, fk: str, owner_ids: List[int]) -> Dict[int, List[str]]:
+    """按展示顺序取一批帖子/物品的缩略图地址，供列表投影使用"""
+    if not owner_ids:
+        return {}
+    column = getattr(link_model, fk)
+    stmt = (
+        select(column, Image.thumbnail_key)
+        .join(Image, Image.id == link_model.image_id)
+        .where(column.in_(owner_ids))
+        .order_by(column, link_model.position)
+    )
+    storage = get_storage()
+    urls = defaultdict(list)
+    for owner_id, key in await db.execute(stmt):
+        urls[owner_id].append(storage.url(key))
+    return urls
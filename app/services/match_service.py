@@ -0,0 +1,358 @@
+import asyncio
+import heapq
+import logging
+import sys
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.exchange_item import ExchangeItem
+from app.models.exchange_want import ExchangeWant
+from app.schemas.exchange_match import ExchangeWantCreate, MatchItem, SwapMatch, SwapStep
+from app.utils.text_search import cjk_characters, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class IndexedItem(NamedTuple):
+    id: int
+    owner_id: int
+    category: Optional[str]
+    tokens: FrozenSet[str]
+
+
+class IndexedWant(NamedTuple):
+    id: int
+    user_id: int
+    category: Optional[str]
+    tokens: FrozenSet[str]
+
+
+def _intern(tokens: List[str]) -> FrozenSet[str]:
+    # 词表很小而物品很多，驻留分词结果让各物品共用同一个字符串对象
+    return frozenset(sys.intern(token) for token in tokens)
+
+
+def _item(item_id: int, owner_id: int, title: str, category: Optional[str]) -> IndexedItem:
+    # 只索引标题与类别：描述里顺带提到的词容易误配，也会让索引膨胀数倍；标题本身不保存，返回结果时查库。
+    # 标题按二元组切分，单字关键词（如"书"）无法命中，标题中的汉字也逐个索引
+    tokens = tokenize(title)
+    return IndexedItem(item_id, owner_id, category, _intern([*tokens, *cjk_characters(tokens), *tokenize(category)]))
+
+
+def _want(want_id: int, user_id: int, category: Optional[str], keywords: Optional[str]) -> IndexedWant:
+    return IndexedWant(want_id, user_id, category or None, _intern(tokenize(keywords)))
+
+
+def _satisfies(item: IndexedItem, want: IndexedWant) -> bool:
+    return (want.category is None or want.category == item.category) and want.tokens <= item.tokens
+
+
+class MatchIndex:
+    """可交换物品与求购意向的内存倒排索引
+
+    物品按类别、标题分词建倒排表；求购意向只挂在一个锚点下（任一关键词，没有关键词时为类别），
+    查"谁想要这件物品"时用物品的分词与类别逐个取锚点，再做完整校验。
+    """
+
+    def __init__(self):
+        self.items: Dict[int, IndexedItem] = {}
+        self.by_category: Dict[str, Set[int]] = defaultdict(set)
+        self.by_token: Dict[str, Set[int]] = defaultdict(set)
+        self.by_owner: Dict[int, Set[int]] = defaultdict(set)
+        self.wants: Dict[int, IndexedWant] = {}
+        self.wants_by_user: Dict[int, Set[int]] = defaultdict(set)
+        self.wants_by_anchor: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+
+    def add_item(self, item: IndexedItem):
+        self.remove_item(item.id)
+        self.items[item.id] = item
+        self.by_owner[item.owner_id].add(item.id)
+        if item.category:
+            self.by_category[item.category].add(item.id)
+        for token in item.tokens:
+            self.by_token[token].add(item.id)
+
+    def remove_item(self, item_id: int):
+        item = self.items.pop(item_id, None)
+        if item is None:
+            return
+        _discard(self.by_owner, item.owner_id, item_id)
+        if item.category:
+            _discard(self.by_category, item.category, item_id)
+        for token in item.tokens:
+            _discard(self.by_token, token, item_id)
+
+    @staticmethod
+    def _anchor(want: IndexedWant) -> Optional[Tuple[str, str]]:
+        if want.tokens:
+            return "t", min(want.tokens)
+        if want.category:
+            return "c", want.category
+        return None
+
+    def add_want(self, want: IndexedWant):
+        anchor = self._anchor(want)
+        if anchor is None:
+            return
+        self.remove_want(want.id)
+        self.wants[want.id] = want
+        self.wants_by_user[want.user_id].add(want.id)
+        self.wants_by_anchor[anchor].add(want.id)
+
+    def remove_want(self, want_id: int):
+        want = self.wants.pop(want_id, None)
+        if want is None:
+            return
+        _discard(self.wants_by_user, want.user_id, want_id)
+        _discard(self.wants_by_anchor, self._anchor(want), want_id)
+
+    def items_for(self, want: IndexedWant) -> List[IndexedItem]:
+        """满足求购意向的物品：从最短的倒排表出发逐个校验"""
+        postings = [self.by_token.get(token) for token in want.tokens]
+        if want.category:
+            postings.append(self.by_category.get(want.category))
+        if not postings or not all(postings):
+            return []
+        shortest = min(postings, key=len)
+        return [self.items[item_id] for item_id in shortest if _satisfies(self.items[item_id], want)]
+
+    def wants_for(self, item: IndexedItem) -> List[IndexedWant]:
+        """想要这件物品的求购意向"""
+        anchors = [("t", token) for token in item.tokens]
+        if item.category:
+            anchors.append(("c", item.category))
+        found = []
+        for anchor in anchors:
+            for want_id in self.wants_by_anchor.get(anchor, ()):
+                want = self.wants[want_id]
+                if _satisfies(item, want):
+                    found.append(want)
+        return found
+
+    def offers_to(self, user_id: int) -> Dict[int, IndexedItem]:
+        """用户想要的物品：物主 -> 其中最新的一件"""
+        offers = {}
+        for want_id in self.wants_by_user.get(user_id, ()):
+            for item in self.items_for(self.wants[want_id]):
+                if item.owner_id != user_id:
+                    _keep_newest(offers, item.owner_id, item)
+        return offers
+
+    def demands_on(self, user_id: int) -> Dict[int, IndexedItem]:
+        """别人想要的该用户的物品：想要的人 -> 其中最新的一件"""
+        demands = {}
+        for item_id in self.by_owner.get(user_id, ()):
+            item = self.items[item_id]
+            for want in self.wants_for(item):
+                if want.user_id != user_id:
+                    _keep_newest(demands, want.user_id, item)
+        return demands
+
+    def wanted_from(self, user_id: int, owner_id: int) -> List[IndexedItem]:
+        """owner 的物品中 user 想要的"""
+        items = [self.items[item_id] for item_id in self.by_owner.get(owner_id, ())]
+        wants = [self.wants[want_id] for want_id in self.wants_by_user.get(user_id, ())]
+        return [item for item in items if any(_satisfies(item, want) for want in wants)]
+
+    def propose(self, user_id: int, limit: int, fanout: int) -> List[List[Tuple[int, int, IndexedItem]]]:
+        """交换环，每步为 (交出方, 得到方, 物品)，从当前用户得到物品的一步开始
+
+        先找直接互换；三方轮换 我 <- B <- C <- 我 只在"有我想要的"与"想要我的"两组用户中
+        各取最近发布过相关物品的 fanout 个组合，搜索量有上界。
+        """
+        offers = self.offers_to(user_id)
+        demands = self.demands_on(user_id)
+        if not offers or not demands:
+            return []
+        cycles = [
+            [(other, user_id, offers[other]), (user_id, other, demands[other])]
+            for other in heapq.nlargest(limit, offers.keys() & demands.keys(), key=lambda owner: offers[owner].id)
+        ]
+        if len(cycles) >= limit:
+            return cycles
+
+        givers = heapq.nlargest(fanout, offers, key=lambda owner: offers[owner].id)
+        takers = heapq.nlargest(fanout, demands, key=lambda wanter: demands[wanter].id)
+        for giver in givers:
+            for taker in takers:
+                if taker == giver:
+                    continue
+                middle = self.wanted_from(giver, taker)
+                if not middle:
+                    continue
+                cycles.append([
+                    (giver, user_id, offers[giver]),
+                    (taker, giver, max(middle, key=lambda item: item.id)),
+                    (user_id, taker, demands[taker]),
+                ])
+                if len(cycles) >= limit:
+                    return cycles
+        return cycles
+
+    def stats(self) -> Dict[str, int]:
+        return {"items": len(self.items), "tokens": len(self.by_token), "wants": len(self.wants)}
+
+
+def _discard(index: Dict, key, value: int):
+    members = index.get(key)
+    if members is not None:
+        members.discard(value)
+        if not members:
+            del index[key]
+
+
+def _keep_newest(best: Dict[int, IndexedItem], key: int, item: IndexedItem):
+    current = best.get(key)
+    if current is None or item.id > current.id:
+        best[key] = item
+
+
+# 本 worker 的索引；首次匹配时从数据库加载，之后随本进程的写入增量更新，
+# 并按 MATCH_INDEX_REFRESH 定期重建以纳入其它 worker 的写入
+_index: Optional[MatchIndex] = None
+_journal: Optional[List[Tuple[str, tuple]]] = None
+_load_lock = asyncio.Lock()
+
+
+def _apply(method: str, *args):
+    if _index is not None:
+        getattr(_index, method)(*args)
+    if _journal is not None:
+        # 重建期间的写入记下来，新索引就绪后重放
+        _journal.append((method, args))
+
+
+def index_item(item_id: int, owner_id: int, title: str, category: Optional[str], is_available: bool = True):
+    if is_available:
+        _apply("add_item", _item(item_id, owner_id, title, category))
+    else:
+        _apply("remove_item", item_id)
+
+
+def unindex_item(item_id: int):
+    _apply("remove_item", item_id)
+
+
+async def load_match_index(db: AsyncSession) -> MatchIndex:
+    """从数据库重建索引，分批读取并让出事件循环，完成后整体替换"""
+    global _index, _journal
+    _journal = []
+    try:
+        index = MatchIndex()
+        items = await db.stream(
+            select(ExchangeItem.id, ExchangeItem.owner_id, ExchangeItem.title, ExchangeItem.category)
+            .where(ExchangeItem.is_available == True)  # noqa: E712
+            .execution_options(yield_per=settings.MATCH_LOAD_BATCH)
+        )
+        async for partition in items.partitions():
+            for row in partition:
+                index.add_item(_item(row.id, row.owner_id, row.title, row.category))
+            await asyncio.sleep(0)
+        wants = await db.stream(
+            select(ExchangeWant.id, ExchangeWant.user_id, ExchangeWant.category, ExchangeWant.keywords)
+            .execution_options(yield_per=settings.MATCH_LOAD_BATCH)
+        )
+        async for partition in wants.partitions():
+            for row in partition:
+                index.add_want(_want(row.id, row.user_id, row.category, row.keywords))
+            await asyncio.sleep(0)
+        for method, args in _journal:
+            getattr(index, method)(*args)
+        _index = index
+    finally:
+        _journal = None
+    return index
+
+
+async def get_match_index(db: AsyncSession) -> MatchIndex:
+    if _index is None:
+        async with _load_lock:
+            if _index is None:
+                await load_match_index(db)
+    return _index
+
+
+async def run_match_index_refresher(interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        if _index is None:
+            continue  # 尚未有人使用匹配功能
+        try:
+            async with _load_lock, async_session() as db:
+                db.info["replica_read"] = True
+                index = await load_match_index(db)
+            logger.info("匹配索引已重建: %s", index.stats())
+        except Exception:
+            logger.exception("匹配索引重建失败")
+
+
+async def create_want(db: AsyncSession, want: ExchangeWantCreate, user_id: int) -> ExchangeWant:
+    db_want = ExchangeWant(user_id=user_id, category=want.category, keywords=want.keywords)
+    db.add(db_want)
+    await db.commit()
+    await db.refresh(db_want)
+    _apply("add_want", _want(db_want.id, user_id, db_want.category, db_want.keywords))
+    return db_want
+
+
+async def count_wants(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(select(func.count()).select_from(ExchangeWant).where(ExchangeWant.user_id == user_id))
+
+
+async def get_wants(db: AsyncSession, user_id: int) -> List[ExchangeWant]:
+    result = await db.execute(
+        select(ExchangeWant).where(ExchangeWant.user_id == user_id).order_by(ExchangeWant.id)
+    )
+    return result.scalars().all()
+
+
+async def delete_want(db: AsyncSession, want_id: int, user_id: int) -> bool:
+    result = await db.execute(
+        delete(ExchangeWant)
+        .where(ExchangeWant.id == want_id, ExchangeWant.user_id == user_id)
+        .returning(ExchangeWant.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.scalar_one_or_none() is None:
+        await db.rollback()
+        return False
+    await db.commit()
+    _apply("remove_want", want_id)
+    return True
+
+
+async def find_matches(db: AsyncSession, user_id: int, limit: int = 20) -> List[SwapMatch]:
+    """从内存索引给出交换环，再用一条查询确认涉及的物品仍可交换
+
+    索引可能落后于其它 worker 的写入，确认时已下架或删除的物品会从索引中剔除，相关的环不返回。
+    """
+    index = await get_match_index(db)
+    cycles = index.propose(user_id, limit, settings.MATCH_FANOUT)
+    item_ids = {item.id for cycle in cycles for _, _, item in cycle}
+    if not item_ids:
+        return []
+    # 只按主键取，可交换状态在内存里判断，避免规划器改走 is_available 开头的索引扫描
+    result = await db.execute(
+        select(ExchangeItem.id, ExchangeItem.owner_id, ExchangeItem.title, ExchangeItem.category, ExchangeItem.is_available)
+        .where(ExchangeItem.id.in_(item_ids))
+    )
+    available = {
+        row.id: MatchItem(id=row.id, owner_id=row.owner_id, title=row.title, category=row.category)
+        for row in result
+        if row.is_available
+    }
+    for item_id in item_ids - available.keys():
+        _apply("remove_item", item_id)
+    return [
+        SwapMatch(size=len(cycle), steps=[
+            SwapStep(giver_id=giver_id, receiver_id=receiver_id, item=available[item.id])
+            for giver_id, receiver_id, item in cycle
+        ])
+        for cycle in cycles
+        if all(item.id in available for _, _, item in cycle)
+    ]
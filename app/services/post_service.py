@@ -1,75 +1,333 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.models.post import Post, Comment
-from app.schemas.post import PostCreate, PostUpdate, CommentCreate
-from typing import Optional
+from sqlalchemy.orm import joinedload, selectinload
+from app.config import settings
+from app.database import replica_read
+from app.models.image import PostImage
+from app.models.post import Post, Comment, PostLike
+from app.models.user import User
+from app.services.feed_service import fan_out_posts
+from app.services.counter_service import counter_buffer, increment_post_counters
+from app.services.bulk_service import BulkRow, bulk_insert, validate_rows
+from app.services.image_service import link_images, thumbnail_urls
+from app.services.user_service import profile_columns, profile_from_row
+from app.utils.text_search import search_document
+from app.schemas.bulk import BulkResult
+from app.schemas.post import PostCreate, PostInDB, PostUpdate, CommentCreate
+from app.utils.events import publish_events
+from app.utils.jobs import dispatch
+from app.utils.pagination import Cursor, keyset
+from app.utils.response_cache import response_cache
+from typing import Any, List, Optional, Tuple
 
 
-async def create_post(db: AsyncSession, post: PostCreate, author_id: int):
+async def create_post(db: AsyncSession, post: PostCreate, author_id: int, image_urls: Optional[str] = None):
+    # image_urls 仅供旧版接口写入
     db_post = Post(
         title=post.title,
         content=post.content,
         author_id=author_id,
-        image_urls=post.image_urls
+        image_urls=image_urls,
+        search_tokens=search_document(post.title, post.content)
     )
     db.add(db_post)
+    if post.image_ids:
+        await db.flush()
+        await link_images(db, PostImage, "post_id", db_post.id, post.image_ids)
     await db.commit()
-    await db.refresh(db_post)
+    await response_cache.bump("posts")
+    await dispatch(
+        db, fan_out_posts, {"post_ids": [db_post.id], "author_id": author_id}, key=f"feed.fan_out:{db_post.id}"
+    )
+    await db.refresh(db_post, ["author", "images"])
     return db_post
 
 
+async def create_posts(db: AsyncSession, rows: List[Tuple[int, Any]], author_id: int) -> BulkResult:
+    """批量发帖：rows 为 (下标, 原始数据)，逐行校验后分块插入，出错的行记入 errors 而不影响其它行"""
+    valid, errors = validate_rows(PostCreate, rows)
+    result = await bulk_insert(
+        db,
+        Post,
+        [
+            BulkRow(index, {
+                "title": post.title,
+                "content": post.content,
+                "author_id": author_id,
+                "search_tokens": search_document(post.title, post.content),
+            }, post.image_ids)
+            for index, post in valid
+        ],
+        PostImage,
+        "post_id",
+    )
+    await db.commit()
+    if result.created:
+        await response_cache.bump("posts")
+        post_ids = [created.id for created in result.created]
+        await dispatch(
+            db, fan_out_posts, {"post_ids": post_ids, "author_id": author_id}, key=f"feed.fan_out:{post_ids[0]}"
+        )
+    result.errors = sorted(errors + result.errors, key=lambda error: error.index)
+    return result
+
+
 async def get_post(db: AsyncSession, post_id: int):
-    stmt = select(Post).where(Post.id == post_id)
+    stmt = select(Post).options(joinedload(Post.author), selectinload(Post.images)).where(Post.id == post_id)
     result = await db.execute(stmt)
     return result.scalar_one_or_none()
 
 
-async def get_posts(db: AsyncSession, skip: int = 0, limit: int = 100):
-    stmt = select(Post).offset(skip).limit(limit).order_by(Post.created_at.desc())
+@replica_read
+async def get_posts(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None, with_relations: bool = True
+):
+    stmt = select(Post)
+    if with_relations:
+        stmt = stmt.options(joinedload(Post.author), selectinload(Post.images))
+    if after is not None or not skip:
+        stmt = keyset(stmt, Post, after).limit(limit)
+    else:
+        stmt = stmt.offset(skip).limit(limit).order_by(Post.created_at.desc())
     result = await db.execute(stmt)
     return result.scalars().all()
 
 
-async def update_post(db: AsyncSession, post_id: int, post_update: PostUpdate):
-    stmt = select(Post).where(Post.id == post_id)
-    result = await db.execute(stmt)
-    db_post = result.scalar_one_or_none()
-    
-    if db_post:
-        for var, value in vars(post_update).items():
-            if value is not None:
-                setattr(db_post, var, value)
-        await db.commit()
-        await db.refresh(db_post)
-        return db_post
-    return None
+@replica_read
+async def get_post_summaries(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None
+) -> List[dict]:
+    """get_posts 的列投影版本：按 PostSummary 的字段取列拼成字典，不构造 ORM 对象"""
+    fields = tuple(PostInDB.model_fields)
+    stmt = (
+        select(*(getattr(Post, name) for name in fields), *profile_columns("author_"))
+        .join(User, User.id == Post.author_id)
+    )
+    if after is not None or not skip:
+        stmt = keyset(stmt, Post, after).limit(limit)
+    else:
+        stmt = stmt.offset(skip).limit(limit).order_by(Post.created_at.desc())
+    rows = (await db.execute(stmt)).mappings().all()
+    thumbnails = await thumbnail_urls(db, PostImage, "post_id", [row["id"] for row in rows])
+    return [
+        {
+            **{name: row[name] for name in fields},
+            "author": profile_from_row(row, "author_"),
+            "thumbnail_urls": thumbnails.get(row["id"], []),
+        }
+        for row in rows
+    ]
+
 
+async def _missing_or_forbidden(db: AsyncSession, post_id: int) -> Optional[bool]:
+    # 带作者条件的写入没有命中时，再区分帖子不存在 (None) 与无权限 (False)
+    exists = await db.scalar(select(Post.id).where(Post.id == post_id))
+    return None if exists is None else False
 
-async def delete_post(db: AsyncSession, post_id: int):
-    stmt = select(Post).where(Post.id == post_id)
+
+async def update_post(db: AsyncSession, post_id: int, author_id: int, post_update: PostUpdate):
+    """只允许作者修改；帖子不存在返回 None，不是作者返回 False"""
+    values = {var: value for var, value in vars(post_update).items() if value is not None and var != "image_ids"}
+    if "title" in values and "content" in values:
+        values["search_tokens"] = search_document(values["title"], values["content"])
+    values["updated_at"] = datetime.utcnow()
+    options = [selectinload(Post.author)]
+    if post_update.image_ids is None:
+        options.append(selectinload(Post.images))
+    stmt = (
+        update(Post)
+        .where(Post.id == post_id, Post.author_id == author_id)
+        .values(**values)
+        .returning(Post)
+        .options(*options)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
     result = await db.execute(stmt)
     db_post = result.scalar_one_or_none()
-    
-    if db_post:
-        await db.delete(db_post)
-        await db.commit()
-        return True
-    return False
+    if db_post is None:
+        await db.rollback()
+        return await _missing_or_forbidden(db, post_id)
+
+    if "search_tokens" not in values and ("title" in values or "content" in values):
+        # 只改了标题或正文之一，需要用更新后的另一字段重新分词
+        db_post.search_tokens = search_document(db_post.title, db_post.content)
+    if post_update.image_ids is not None:
+        await link_images(db, PostImage, "post_id", post_id, post_update.image_ids)
+    await db.commit()
+    await response_cache.invalidate(f"post:{post_id}")
+    await response_cache.bump("posts")
+    if post_update.image_ids is not None:
+        await db.refresh(db_post, ["images"])
+    return db_post
 
 
-async def create_comment(db: AsyncSession, comment: CommentCreate, author_id: int):
+async def delete_post(db: AsyncSession, post_id: int, author_id: int) -> Optional[bool]:
+    """只允许作者删除；成功返回 True，帖子不存在返回 None，不是作者返回 False"""
+    owned = select(Post.id).where(Post.id == post_id, Post.author_id == author_id).scalar_subquery()
+    for child in (PostImage, PostLike, Comment):
+        await db.execute(delete(child).where(child.post_id == owned))
+    result = await db.execute(
+        delete(Post)
+        .where(Post.id == post_id, Post.author_id == author_id)
+        .returning(Post.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.scalar_one_or_none() is None:
+        await db.rollback()
+        return await _missing_or_forbidden(db, post_id)
+    await db.commit()
+    await response_cache.invalidate(f"post:{post_id}")
+    await response_cache.bump("posts", f"comments:{post_id}")
+    return True
+
+
+async def create_comment(db: AsyncSession, post_id: int, comment: CommentCreate, author_id: int):
+    """帖子不存在返回 None，回复的评论不存在或不属于该帖子时返回 False"""
+    # 累加评论数的 UPDATE 同时校验帖子存在
+    post_author_id = await increment_post_counters(db, post_id, comments_count=1)
+    if post_author_id is None:
+        await db.rollback()
+        return None
+    parent_author_id = None
+    if comment.parent_id is not None:
+        # 校验父评论与累加回复数合并为一条 UPDATE
+        result = await db.execute(
+            update(Comment)
+            .where(Comment.id == comment.parent_id, Comment.post_id == post_id)
+            .values(replies_count=Comment.replies_count + 1)
+            .returning(Comment.author_id)
+            .execution_options(synchronize_session=False)
+        )
+        parent_author_id = result.scalar_one_or_none()
+        if parent_author_id is None:
+            await db.rollback()
+            return False
     db_comment = Comment(
         content=comment.content,
-        post_id=comment.post_id,
-        author_id=author_id
+        post_id=post_id,
+        parent_id=comment.parent_id,
+        author_id=author_id,
+        replies_count=0,
     )
     db.add(db_comment)
     await db.commit()
-    await db.refresh(db_comment)
+    await response_cache.invalidate(f"post:{post_id}")
+    await response_cache.bump("posts", f"comments:{post_id}")
+    await db.refresh(db_comment, ["author"])
+
+    data = {
+        "post_id": post_id,
+        "comment_id": db_comment.id,
+        "parent_id": db_comment.parent_id,
+        "author_id": author_id,
+        "author_username": db_comment.author.username,
+        "content": db_comment.content[:100],
+    }
+    events = [(f"post:{post_id}", "comment.created", data)]
+    if post_author_id not in (None, author_id):
+        events.append((f"user:{post_author_id}", "comment.created", data))
+    if parent_author_id not in (None, author_id, post_author_id):
+        events.append((f"user:{parent_author_id}", "comment.replied", data))
+    await dispatch(db, publish_events, {"events": events}, key=f"events:comment:{db_comment.id}", lane="high")
     return db_comment
 
 
-async def get_comments(db: AsyncSession, post_id: int):
-    stmt = select(Comment).where(Comment.post_id == post_id).order_by(Comment.created_at.asc())
+async def _load_replies(db: AsyncSession, comments, depth: int):
+    """逐层加载回复，每层一次查询；窗口函数限制每条评论最多带 COMMENT_REPLY_PREVIEW 条"""
+    level = [comment for comment in comments if comment.replies_count]
+    for _ in range(depth):
+        if not level:
+            return
+        ranked = (
+            select(
+                Comment.id,
+                func.row_number().over(
+                    partition_by=Comment.parent_id, order_by=(Comment.created_at, Comment.id)
+                ).label("position"),
+            )
+            .where(Comment.parent_id.in_([comment.id for comment in level]))
+            .subquery()
+        )
+        stmt = (
+            select(Comment)
+            .options(joinedload(Comment.author))
+            .join(ranked, ranked.c.id == Comment.id)
+            .where(ranked.c.position <= settings.COMMENT_REPLY_PREVIEW)
+            .order_by(Comment.created_at, Comment.id)
+        )
+        replies = (await db.execute(stmt)).scalars().all()
+        by_parent = defaultdict(list)
+        for reply in replies:
+            by_parent[reply.parent_id].append(reply)
+        for comment in level:
+            comment.replies = by_parent[comment.id]
+        level = [reply for reply in replies if reply.replies_count]
+
+
+@replica_read
+async def get_comments(
+    db: AsyncSession,
+    post_id: int,
+    limit: int = 20,
+    after: Optional[Cursor] = None,
+    parent_id: Optional[int] = None,
+    depth: int = 0,
+):
+    """按时间正序游标分页；不指定 parent_id 时只取顶层评论，depth 为随评论一起加载的回复层数"""
+    stmt = select(Comment).options(joinedload(Comment.author)).where(Comment.post_id == post_id)
+    if parent_id is None:
+        stmt = stmt.where(Comment.parent_id.is_(None))
+    else:
+        stmt = stmt.where(Comment.parent_id == parent_id)
+    stmt = keyset(stmt, Comment, after, descending=False).limit(limit)
+    comments = (await db.execute(stmt)).scalars().all()
+    await _load_replies(db, comments, min(depth, settings.COMMENT_MAX_DEPTH))
+    return comments
+
+
+async def _change_likes(db: AsyncSession, post_id: int, delta: int):
+    if settings.COUNTER_BUFFER_ENABLED:
+        await db.commit()
+        # 缓冲模式下计数在 flush 后才落库，缓存也在那时失效
+        counter_buffer.add(post_id, "likes_count", delta)
+    else:
+        await increment_post_counters(db, post_id, likes_count=delta)
+        await db.commit()
+        await response_cache.invalidate(f"post:{post_id}")
+        await response_cache.bump("posts")
+
+
+async def like_post(db: AsyncSession, post_id: int, user_id: int) -> Optional[bool]:
+    """帖子不存在返回 None，新点赞返回 True，重复点赞返回 False"""
+    post_author_id = await db.scalar(select(Post.author_id).where(Post.id == post_id))
+    if post_author_id is None:
+        return None
+    db.add(PostLike(post_id=post_id, user_id=user_id))
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        return False
+    await _change_likes(db, post_id, 1)
+    data = {"post_id": post_id, "user_id": user_id}
+    events = [(f"post:{post_id}", "post.liked", data)]
+    if post_author_id != user_id:
+        events.append((f"user:{post_author_id}", "post.liked", data))
+    await dispatch(db, publish_events, {"events": events}, lane="high")
+    return True
+
+
+async def unlike_post(db: AsyncSession, post_id: int, user_id: int) -> bool:
+    stmt = delete(PostLike).where(PostLike.post_id == post_id, PostLike.user_id == user_id)
     result = await db.execute(stmt)
-    return result.scalars().all()
\ No newline at end of file
+    if result.rowcount == 0:
+        await db.rollback()
+        return False
+    await _change_likes(db, post_id, -1)
+    events = [(f"post:{post_id}", "post.unliked", {"post_id": post_id, "user_id": user_id})]
+    await dispatch(db, publish_events, {"events": events}, lane="high")
+    return True
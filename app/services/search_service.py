@@ -0,0 +1,88 @@
+from typing import Optional
+
+from sqlalchemy import DateTime, Float, Integer, String, and_, bindparam, func, literal_column, or_, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.exchange_item import ExchangeItem
+from app.models.post import Post
+from app.utils.pagination import RankCursor
+from app.utils.text_search import fts5_query, fts_table_name, search_document, tsquery
+
+SEARCH_MODELS = {
+    "posts": Post,
+    "exchanges": ExchangeItem,
+}
+
+
+async def _search_postgres(db: AsyncSession, model, q: str, limit: int, after: Optional[RankCursor]):
+    # 表达式须与 register_fulltext_index 建立的 GIN 索引一致
+    vector = func.to_tsvector(literal_column("'simple'"), model.search_tokens)
+    query = func.to_tsquery(literal_column("'simple'"), tsquery(q))
+    score = func.ts_rank(vector, query)
+    stmt = select(model.id, model.title, model.created_at, score.label("score")).where(vector.op("@@")(query))
+    if after is not None:
+        stmt = stmt.where(or_(score < after[0], and_(score == after[0], model.id < after[1])))
+    stmt = stmt.order_by(score.desc(), model.id.desc()).limit(limit)
+    result = await db.execute(stmt)
+    return result.all()
+
+
+async def _search_sqlite(db: AsyncSession, model, q: str, limit: int, after: Optional[RankCursor]):
+    table = model.__tablename__
+    fts = fts_table_name(model.__table__)
+    keyset = "WHERE score < :score OR (score = :score AND id < :id)" if after is not None else ""
+    stmt = text(
+        f"SELECT * FROM ("
+        f"SELECT t.id, t.title, t.created_at, -bm25({fts}) AS score "
+        f"FROM {fts} JOIN {table} AS t ON t.id = {fts}.rowid "
+        f"WHERE {fts} MATCH :match) AS hits "
+        f"{keyset} ORDER BY score DESC, id DESC LIMIT :limit"
+    ).columns(id=Integer, title=String, created_at=DateTime, score=Float)
+    params = {"match": fts5_query(q), "limit": limit}
+    if after is not None:
+        params.update(score=after[0], id=after[1])
+    result = await db.execute(stmt, params)
+    return result.all()
+
+
+_BACKENDS = {
+    "postgresql": _search_postgres,
+    "sqlite": _search_sqlite,
+}
+
+
+def check_search_backend(dialect: str):
+    """启动时调用：全文检索只实现了 PostgreSQL 与 SQLite"""
+    if dialect not in _BACKENDS:
+        raise RuntimeError(f"全文检索不支持 {dialect} 数据库，DATABASE_URL 须为 PostgreSQL 或 SQLite")
+
+
+async def search(db: AsyncSession, target: str, q: str, limit: int = 20, after: Optional[RankCursor] = None):
+    model = SEARCH_MODELS[target]
+    if not tsquery(q):
+        return []
+    # 数据库类型已在启动时由 check_search_backend 校验
+    return await _BACKENDS[db.get_bind().dialect.name](db, model, q, limit, after)
+
+
+async def rebuild_search_tokens(db: AsyncSession, target: str, batch_size: int = 1000) -> int:
+    """为已有数据回填 search_tokens，按主键分批处理"""
+    model = SEARCH_MODELS[target]
+    if model is Post:
+        fields = (Post.title, Post.content)
+    else:
+        fields = (ExchangeItem.title, ExchangeItem.description, ExchangeItem.category)
+    last_id, total = 0, 0
+    while True:
+        stmt = select(model.id, *fields).where(model.id > last_id).order_by(model.id).limit(batch_size)
+        rows = (await db.execute(stmt)).all()
+        if not rows:
+            return total
+        await db.execute(
+            update(model.__table__).where(model.__table__.c.id == bindparam("row_id")),
+            [{"row_id": row[0], "search_tokens": search_document(*row[1:])} for row in rows],
+        )
+        await db.commit()
+        last_id = rows[-1][0]
+        total += len(rows)
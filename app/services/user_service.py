@@ -1,13 +1,29 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from app.database import replica_read
 from app.models.user import User
-from app.schemas.user import UserCreate
-from app.utils.security import hash_password
-from typing import Optional
+from app.schemas.user import UserCreate, UserResponse
+from app.utils.response_cache import response_cache
+from app.utils.security import hash_password_async, invalidate_principal
+from app.utils.pagination import Cursor, keyset
+from typing import List, Optional
+
+# 列表投影中的用户资料字段，与 UserResponse 一致
+PROFILE_FIELDS = tuple(UserResponse.model_fields)
+
+
+async def email_registered(db: AsyncSession, email: str) -> bool:
+    """注册前的查重走主库：副本延迟时刚注册的邮箱可能还查不到"""
+    return await db.scalar(select(User.id).where(User.email == email)) is not None
 
 
 async def create_user(db: AsyncSession, user: UserCreate):
-    hashed_pwd = hash_password(user.password)
+    """用户名或邮箱与已有用户重复（如并发注册越过了查重）时返回 None"""
+    # 哈希耗时较长，先结束邮箱检查开启的只读事务，避免等待期间占用数据库连接
+    if db.in_transaction():
+        await db.commit()
+    hashed_pwd = await hash_password_async(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -16,11 +32,17 @@ async def create_user(db: AsyncSession, user: UserCreate):
         bio=user.bio
     )
     db.add(db_user)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return None
+    await response_cache.bump("users")
     await db.refresh(db_user)
     return db_user
 
 
+@replica_read
 async def get_user(db: AsyncSession, user_id: int = None, email: str = None):
     stmt = select(User)
     if user_id:
@@ -31,12 +53,38 @@ async def get_user(db: AsyncSession, user_id: int = None, email: str = None):
     return result.scalar_one_or_none()
 
 
-async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100):
-    stmt = select(User).offset(skip).limit(limit)
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None):
+    stmt = select(User)
+    if after is not None or not skip:
+        stmt = keyset(stmt, User, after).limit(limit)
+    else:
+        stmt = stmt.offset(skip).limit(limit)
     result = await db.execute(stmt)
     return result.scalars().all()
 
 
+async def get_user_profiles(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None
+) -> List[dict]:
+    """get_users 的列投影版本：只取 UserResponse 所需的列，不构造 ORM 对象"""
+    stmt = select(*profile_columns())
+    if after is not None or not skip:
+        stmt = keyset(stmt, User, after).limit(limit)
+    else:
+        stmt = stmt.offset(skip).limit(limit)
+    result = await db.execute(stmt)
+    return [dict(row) for row in result.mappings()]
+
+
+def profile_columns(prefix: str = ""):
+    """用户资料的列，prefix 用于与帖子/物品的列一起查询时区分同名列"""
+    return [getattr(User, name).label(prefix + name) for name in PROFILE_FIELDS]
+
+
+def profile_from_row(row, prefix: str) -> dict:
+    return {name: row[prefix + name] for name in PROFILE_FIELDS}
+
+
 async def update_user(db: AsyncSession, user_id: int, user_update):
     stmt = select(User).where(User.id == user_id)
     result = await db.execute(stmt)
@@ -47,6 +95,8 @@ async def update_user(db: AsyncSession, user_id: int, user_update):
             if value is not None:
                 setattr(db_user, var, value)
         await db.commit()
+        await invalidate_principal(db_user.username)
+        await response_cache.bump("users")
         await db.refresh(db_user)
         return db_user
     return None
@@ -60,5 +110,7 @@ async def delete_user(db: AsyncSession, user_id: int):
     if db_user:
         await db.delete(db_user)
         await db.commit()
+        await invalidate_principal(db_user.username)
+        await response_cache.bump("users")
         return True
     return False
\ No newline at end of file
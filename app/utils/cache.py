@@ -0,0 +1,128 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+
+from app.utils.redis_client import get_redis
+
+M = TypeVar("M", bound=BaseModel)
+
+# 共享 Redis 时删除只能清掉 Redis 与本进程的副本，其它进程内的副本至多再保留这么久（秒）
+SHARED_LOCAL_TTL = 5
+
+
+class TTLCache:
+    """进程内有界 LRU 缓存，条目按 TTL 过期"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class TieredCache(Generic[M]):
+    """进程内 LRU + 可选 Redis 二级缓存，值为 Pydantic 模型
+
+    Redis 不可用时静默降级为仅进程内缓存。开启 Redis 时进程内副本的 TTL 缩短为 SHARED_LOCAL_TTL，
+    多 worker 部署下其它进程的删除（如用户被停用）很快生效。
+    """
+
+    def __init__(self, namespace: str, model: Type[M], maxsize: int, ttl: int, use_redis: bool = False):
+        self.namespace = namespace
+        self.model = model
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self.local = TTLCache(maxsize, min(ttl, SHARED_LOCAL_TTL) if use_redis else ttl)
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    def _key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _redis(self):
+        return get_redis() if self.use_redis else None
+
+    async def get(self, key) -> Optional[M]:
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        redis = self._redis()
+        if redis is None:
+            return None
+        try:
+            raw = await redis.get(self._key(key))
+        except RedisError:
+            return None
+        if raw is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        value = self.model.model_validate_json(raw)
+        self.local.set(key, value)
+        return value
+
+    async def set(self, key, value: M):
+        self.local.set(key, value)
+        redis = self._redis()
+        if redis is not None:
+            try:
+                await redis.set(self._key(key), value.model_dump_json(), ex=self.ttl)
+            except RedisError:
+                pass
+
+    async def delete(self, key):
+        self.local.delete(key)
+        redis = self._redis()
+        if redis is not None:
+            try:
+                await redis.delete(self._key(key))
+            except RedisError:
+                pass
+
+    def stats(self) -> Dict[str, float]:
+        stats = self.local.stats()
+        stats["redis_hits"] = self.redis_hits
+        stats["redis_misses"] = self.redis_misses
+        return stats
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import logging
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.utils.jobs import job_handler
+from app.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# 可订阅的频道：帖子动态、物品状态、物品市场、个人通知
+CHANNEL_PATTERN = re.compile(r"^(post:\d+|exchange:\d+|exchanges|user:\d+)$")
+
+# 队列溢出后投递给连接的哨兵，连接收到后通知客户端并断开
+OVERFLOW = object()
+
+
+class Subscription:
+    """一个客户端连接的订阅，持有有界队列
+
+    推送方只做 put_nowait，不会被慢客户端拖住；队列满时丢弃积压并标记溢出，
+    由连接通知客户端断开重连后通过 REST 接口补齐数据。
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.channels: Set[str] = set()
+        self.overflowed = False
+
+    def deliver(self, message: str) -> bool:
+        if self.overflowed:
+            return False
+        if not self.queue.full():
+            self.queue.put_nowait(message)
+            return True
+        self.overflowed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(OVERFLOW)
+        return False
+
+
+class MemoryEventBackend:
+    """进程内广播，仅用于测试与单进程部署"""
+
+    def __init__(self, hub: "EventHub"):
+        self.hub = hub
+
+    async def publish(self, messages: Iterable[Tuple[str, str]]):
+        for channel, message in messages:
+            self.hub.dispatch(channel, message)
+
+    async def listen(self, channel: str):
+        pass
+
+    async def unlisten(self, channel: str):
+        pass
+
+    async def close(self):
+        pass
+
+
+class RedisEventBackend:
+    """经 Redis pub/sub 在 worker 之间广播
+
+    每个 worker 只占用一条订阅连接：本地有连接关注某频道时才向 Redis 订阅，
+    最后一个连接离开后退订。订阅连接断开时按当前关注的频道重建，期间的事件会丢失。
+    """
+
+    PREFIX = "ev:"
+    # 常驻订阅，保证订阅连接始终处于订阅状态
+    IDLE_CHANNEL = "ev:_"
+
+    def __init__(self, hub: "EventHub", redis):
+        self.hub = hub
+        self.redis = redis
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def publish(self, messages: Iterable[Tuple[str, str]]):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for channel, message in messages:
+                pipe.publish(self.PREFIX + channel, message)
+            await pipe.execute()
+
+    async def _read(self):
+        while True:
+            try:
+                if self._pubsub is None:
+                    self._pubsub = self.redis.pubsub()
+                    await self._pubsub.subscribe(
+                        self.IDLE_CHANNEL, *(self.PREFIX + channel for channel in self.hub.channels())
+                    )
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except RedisError:
+                logger.exception("事件订阅连接断开，1 秒后重连")
+                await self._drop_pubsub()
+                await asyncio.sleep(1)
+                continue
+            if message is not None and message["type"] == "message":
+                self.hub.dispatch(message["channel"][len(self.PREFIX):], message["data"])
+
+    async def _drop_pubsub(self):
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            try:
+                await pubsub.close()
+            except RedisError:
+                pass
+
+    async def listen(self, channel: str):
+        if self._reader is None:
+            # 读取任务建立订阅连接时会订阅所有已关注的频道
+            self._reader = asyncio.create_task(self._read())
+        elif self._pubsub is not None:
+            try:
+                await self._pubsub.subscribe(self.PREFIX + channel)
+            except RedisError:
+                logger.exception("订阅频道 %s 失败", channel)
+
+    async def unlisten(self, channel: str):
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.unsubscribe(self.PREFIX + channel)
+            except RedisError:
+                logger.exception("退订频道 %s 失败", channel)
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        await self._drop_pubsub()
+
+
+class EventHub:
+    """本 worker 内的订阅表：频道 -> 订阅该频道的连接"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._backend = None
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    def _get_backend(self):
+        redis = get_redis() if settings.EVENTS_REDIS else None
+        if redis is None:
+            if not isinstance(self._backend, MemoryEventBackend):
+                self._backend = MemoryEventBackend(self)
+        elif not isinstance(self._backend, RedisEventBackend) or self._backend.redis is not redis:
+            self._backend = RedisEventBackend(self, redis)
+        return self._backend
+
+    def channels(self):
+        return list(self._subscribers)
+
+    def dispatch(self, channel: str, message: str):
+        for subscription in list(self._subscribers.get(channel, ())):
+            overflowed = subscription.overflowed
+            if subscription.deliver(message):
+                self.delivered += 1
+            elif not overflowed:
+                self.overflows += 1
+
+    async def publish(self, events: Iterable[Tuple[str, str, dict]]):
+        """发布 (频道, 事件类型, 数据)；推送只是提示，失败时记录日志，不影响业务写入"""
+        now = datetime.utcnow().isoformat()
+        messages = [
+            (channel, json.dumps({"type": event_type, "channel": channel, "data": data, "ts": now}, ensure_ascii=False))
+            for channel, event_type, data in events
+        ]
+        if not messages:
+            return
+        try:
+            await self._get_backend().publish(messages)
+            self.published += len(messages)
+        except RedisError:
+            logger.exception("事件发布失败")
+
+    def open(self) -> Subscription:
+        self.connections += 1
+        return Subscription(self.queue_size)
+
+    async def subscribe(self, subscription: Subscription, channels: Iterable[str]):
+        backend = self._get_backend()
+        for channel in channels:
+            if channel in subscription.channels:
+                continue
+            subscription.channels.add(channel)
+            first = not self._subscribers[channel]
+            self._subscribers[channel].add(subscription)
+            if first:
+                await backend.listen(channel)
+
+    async def unsubscribe(self, subscription: Subscription, channels: Iterable[str]):
+        backend = self._get_backend()
+        for channel in list(channels):
+            if channel not in subscription.channels:
+                continue
+            subscription.channels.discard(channel)
+            subscribers = self._subscribers.get(channel)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[channel]
+                await backend.unlisten(channel)
+
+    async def close(self, subscription: Subscription):
+        self.connections -= 1
+        await self.unsubscribe(subscription, subscription.channels)
+
+    async def shutdown(self):
+        if self._backend is not None:
+            await self._backend.close()
+            self._backend = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connections": self.connections,
+            "channels": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+        }
+
+
+event_hub = EventHub(settings.EVENTS_QUEUE_SIZE)
+
+
+@job_handler("events.publish")
+async def publish_events(db, events):
+    """后台任务：发布 [(频道, 类型, 数据), ...]
+
+    由独立 worker 进程执行时，需要开启 EVENTS_REDIS 才能送达各 Web 进程上的订阅者。
+    """
+    await event_hub.publish(events)
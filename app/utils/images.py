@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils.storage import CHUNK_SIZE, get_storage
+
+ALLOWED_FORMATS = {
+    "JPEG": ("image/jpeg", "jpg"),
+    "PNG": ("image/png", "png"),
+    "WEBP": ("image/webp", "webp"),
+    "GIF": ("image/gif", "gif"),
+}
+
+# 缩放/编码是 CPU 密集操作（Pillow 计算期间会释放 GIL），放到独立线程池执行
+_image_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS,
+    thread_name_prefix="image-process",
+)
+_image_slots = asyncio.Semaphore(settings.IMAGE_WORKERS + settings.IMAGE_QUEUE)
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class ImageTooLarge(InvalidImage):
+    pass
+
+
+async def receive_upload(upload: UploadFile) -> Tuple[str, str, int]:
+    """分块写入临时文件并同时计算 sha256，返回 (临时文件路径, 哈希, 字节数)"""
+    fd, path = tempfile.mkstemp(prefix="upload-")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await upload.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.IMAGE_MAX_BYTES:
+                    raise ImageTooLarge("图片过大")
+                digest.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    if size == 0:
+        os.remove(path)
+        raise InvalidImage("图片为空")
+    return path, digest.hexdigest(), size
+
+
+def _encode_webp(image: PILImage.Image, max_edge: int, quality: int) -> bytes:
+    resized = image.copy()
+    resized.thumbnail((max_edge, max_edge))
+    buffer = io.BytesIO()
+    resized.save(buffer, "WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def process_and_store(path: str, sha256: str) -> Dict[str, object]:
+    """校验图片、生成展示图与缩略图并写入存储，返回 Image 模型所需字段"""
+    try:
+        source = PILImage.open(path)
+    except UnidentifiedImageError:
+        raise InvalidImage("不支持的图片格式")
+    except PILImage.DecompressionBombError:
+        # 超过 Pillow 上限两倍时 open() 直接抛出，与下面的尺寸检查同样处理
+        raise ImageTooLarge("图片分辨率过高")
+    with source:
+        if source.format not in ALLOWED_FORMATS:
+            raise InvalidImage("不支持的图片格式")
+        # 只读取了文件头，先按尺寸拦截解压炸弹
+        if source.width * source.height > settings.IMAGE_MAX_PIXELS:
+            raise ImageTooLarge("图片分辨率过高")
+        content_type, extension = ALLOWED_FORMATS[source.format]
+        try:
+            image = ImageOps.exif_transpose(source)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+            display = _encode_webp(image, settings.IMAGE_DISPLAY_SIZE, quality=82)
+            thumbnail = _encode_webp(image, settings.IMAGE_THUMBNAIL_SIZE, quality=75)
+        except (OSError, SyntaxError):
+            raise InvalidImage("图片文件已损坏")
+        width, height = image.size
+
+    prefix = f"images/{sha256[:2]}/{sha256}"
+    keys = {
+        "original_key": f"{prefix}/original.{extension}",
+        "display_key": f"{prefix}/display.webp",
+        "thumbnail_key": f"{prefix}/thumb.webp",
+    }
+    storage = get_storage()
+    storage.put_file(keys["original_key"], path, content_type)
+    storage.put_bytes(keys["display_key"], display, "image/webp")
+    storage.put_bytes(keys["thumbnail_key"], thumbnail, "image/webp")
+    return {"content_type": content_type, "width": width, "height": height, **keys}
+
+
+async def process_and_store_async(path: str, sha256: str) -> Dict[str, object]:
+    if _image_slots.locked():
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="服务繁忙，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+    async with _image_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_image_executor, process_and_store, path, sha256)
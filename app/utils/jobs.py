@@ -0,0 +1,272 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.job import Job
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 优先级队列，靠前的先执行；worker 可以只处理其中几条，给延迟敏感的任务留出专用进程
+LANES = ("high", "default", "low")
+# 队列统计是 jobs 表的分组聚合，缓存几秒，反复查看或被监控抓取时不逐次扫表
+QUEUE_STATS_TTL = 5
+
+Handler = Callable[..., Awaitable[None]]
+_handlers: Dict[str, Handler] = {}
+
+
+def job_handler(name: str):
+    """注册任务处理函数：async def handler(db, **payload)，payload 需可 JSON 序列化；
+    name 写入 jobs 表，worker 据此找到处理函数，改名前要等队列中的旧任务执行完
+
+    任务可能因重试或 worker 崩溃被执行多次，处理函数应当是幂等的。
+    """
+    def register(func: Handler) -> Handler:
+        func.job_name = name
+        _handlers[name] = func
+        return func
+    return register
+
+
+async def dispatch(
+    db: AsyncSession,
+    handler: Handler,
+    payload: dict,
+    *,
+    key: Optional[str] = None,
+    lane: str = "default",
+    delay: float = 0,
+):
+    """提交主写入之后调用，触发一个慢副作用
+
+    开启 JOBS_ENABLED 时把任务写入 jobs 表（单独的短事务）后立即返回，由 worker 异步执行、失败重试；
+    未开启时就地执行，与改造前的同步调用一致。handler 须经 job_handler 注册；key 为幂等键，同一个键只登记一次。
+    """
+    if not settings.JOBS_ENABLED:
+        await handler(db, **payload)
+        return
+    stmt = insert(Job).values(
+        name=handler.job_name,
+        payload=json.dumps(payload, ensure_ascii=False),
+        priority=LANES.index(lane),
+        idempotency_key=key,
+        max_attempts=settings.JOBS_MAX_ATTEMPTS,
+        run_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
+    try:
+        await db.execute(stmt)
+        await db.commit()
+    except IntegrityError:
+        # 同一幂等键的任务已经登记过
+        await db.rollback()
+
+
+def backoff(attempts: int) -> float:
+    """第 n 次失败后的等待秒数：指数增长并加随机抖动，避免大量任务同时重试"""
+    delay = min(settings.JOBS_BACKOFF_MAX, settings.JOBS_BACKOFF_BASE * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def claim_jobs(db: AsyncSession, priorities: Iterable[int], limit: int, lease: float) -> List:
+    """领取至多 limit 个到期的任务并加上租约
+
+    PostgreSQL 上用 FOR UPDATE SKIP LOCKED，多个 worker 并发领取互不阻塞；
+    SQLite 的写入本身串行，单条 UPDATE 即是原子的。
+    """
+    now = datetime.utcnow()
+    due = (
+        select(Job.id)
+        .where(Job.status == "queued", Job.priority.in_(list(priorities)), Job.run_at <= now)
+        .order_by(Job.priority, Job.run_at, Job.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(Job)
+        .where(Job.id.in_(due.scalar_subquery()))
+        .values(status="running", attempts=Job.attempts + 1, locked_until=now + timedelta(seconds=lease))
+        .returning(Job.id, Job.name, Job.payload, Job.attempts, Job.max_attempts, Job.priority)
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await db.execute(stmt)).all()
+    await db.commit()
+    return sorted(rows, key=lambda row: (row.priority, row.id))
+
+
+_stats_cache = TTLCache(maxsize=1, ttl=QUEUE_STATS_TTL)
+
+
+async def queue_stats(db: AsyncSession) -> Dict[str, Dict[str, int]]:
+    """各队列按状态的任务数，至多 QUEUE_STATS_TTL 秒前的结果"""
+    stats = _stats_cache.get("queues")
+    if stats is not None:
+        return stats
+    stmt = select(Job.priority, Job.status, func.count()).group_by(Job.priority, Job.status)
+    stats = {lane: {} for lane in LANES}
+    for priority, status, count in await db.execute(stmt):
+        stats[LANES[priority]][status] = count
+    _stats_cache.set("queues", stats)
+    return stats
+
+
+class Worker:
+    """在一个进程内并发执行任务
+
+    空闲槽位有多少就领取多少；成功的任务攒成一批标记完成。执行超时或抛出异常的任务按指数退避重新排队，
+    超过最大次数后标记为 failed 并保留错误信息。定期把租约过期（worker 崩溃或被杀）的任务放回队列，
+    并清理超过保留期的已完成任务。
+    """
+
+    def __init__(
+        self,
+        lanes: Iterable[str] = LANES,
+        concurrency: int = settings.JOBS_CONCURRENCY,
+        poll_interval: float = settings.JOBS_POLL_INTERVAL,
+        timeout: float = settings.JOBS_TIMEOUT,
+    ):
+        self.priorities = sorted(LANES.index(lane) for lane in lanes)
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        # 租约要比单个任务的超时长，正常执行的任务不会被别的 worker 重复领取
+        self.lease = timeout * 2 + poll_interval
+        self._running: Set[asyncio.Task] = set()
+        self._done: List[int] = []
+        self._stopping = asyncio.Event()
+        self.succeeded = 0
+        self.retried = 0
+        self.failed = 0
+
+    def stop(self):
+        self._stopping.set()
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def run(self):
+        last_maintenance = 0.0
+        while not self._stopping.is_set():
+            claimed = []
+            free = self.concurrency - len(self._running)
+            try:
+                if time.monotonic() - last_maintenance > self.lease:
+                    await self.maintain()
+                    last_maintenance = time.monotonic()
+                await self._flush_done()
+                if free > 0:
+                    async with async_session() as db:
+                        claimed = await claim_jobs(db, self.priorities, free, self.lease)
+            except Exception:
+                logger.exception("领取任务失败")
+            for row in claimed:
+                task = asyncio.create_task(self._execute(row))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            if len(claimed) < free or not self._running:
+                # 队列已取空（或出错），等下一轮轮询
+                await self._sleep(self.poll_interval)
+            else:
+                await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+        if self._running:
+            await asyncio.wait(self._running, timeout=self.timeout)
+        await self._flush_done()
+
+    async def _execute(self, row):
+        handler = _handlers.get(row.name)
+        try:
+            if handler is None:
+                raise LookupError(f"未注册的任务 {row.name}")
+            async with async_session() as db:
+                await asyncio.wait_for(handler(db, **json.loads(row.payload)), self.timeout)
+        except Exception as exc:
+            await self._fail(row, exc)
+        else:
+            self._done.append(row.id)
+
+    async def _flush_done(self):
+        if not self._done:
+            return
+        done, self._done = self._done, []
+        stmt = (
+            update(Job)
+            .where(Job.id.in_(done))
+            .values(status="done", finished_at=datetime.utcnow(), locked_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            async with async_session() as db:
+                await db.execute(stmt)
+                await db.commit()
+        except Exception:
+            self._done.extend(done)
+            raise
+        self.succeeded += len(done)
+
+    async def _fail(self, row, exc: Exception):
+        error = f"{type(exc).__name__}: {exc}"
+        now = datetime.utcnow()
+        if row.attempts >= row.max_attempts or isinstance(exc, LookupError):
+            values = {"status": "failed", "finished_at": now}
+            self.failed += 1
+            logger.error("任务 %s#%d 第 %d 次执行失败，不再重试: %s", row.name, row.id, row.attempts, error)
+        else:
+            values = {"status": "queued", "run_at": now + timedelta(seconds=backoff(row.attempts))}
+            self.retried += 1
+            logger.warning("任务 %s#%d 第 %d 次执行失败，稍后重试: %s", row.name, row.id, row.attempts, error)
+        stmt = (
+            update(Job)
+            .where(Job.id == row.id)
+            .values(locked_until=None, last_error=error[:2000], **values)
+            .execution_options(synchronize_session=False)
+        )
+        try:
+            async with async_session() as db:
+                await db.execute(stmt)
+                await db.commit()
+        except Exception:
+            # 状态没写回时租约到期后会被重新领取
+            logger.exception("记录任务 %s#%d 的失败状态出错", row.name, row.id)
+
+    async def maintain(self):
+        now = datetime.utcnow()
+        async with async_session() as db:
+            expired = await db.execute(
+                update(Job)
+                .where(Job.status == "running", Job.locked_until < now)
+                .values(
+                    status=case((Job.attempts >= Job.max_attempts, "failed"), else_="queued"),
+                    locked_until=None,
+                    last_error="租约过期（worker 退出或任务超时）",
+                )
+                .execution_options(synchronize_session=False)
+            )
+            pruned = await db.execute(
+                delete(Job)
+                .where(Job.status == "done", Job.finished_at < now - timedelta(seconds=settings.JOBS_RETENTION))
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        if expired.rowcount or pruned.rowcount:
+            logger.info("回收 %d 个租约过期的任务，清理 %d 个已完成任务", expired.rowcount, pruned.rowcount)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "running": len(self._running),
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
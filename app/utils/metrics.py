@@ -0,0 +1,314 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+# 秒；覆盖缓存命中 (<5ms) 到慢请求 (>1s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class RequestStats:
+    """单个请求内累计的数据库耗时、查询数、取连接等待与序列化耗时"""
+
+    __slots__ = ("route", "db_time", "queries", "pool_wait", "serialize_time", "endpoint_done")
+
+    def __init__(self):
+        self.route: Optional[str] = None
+        self.db_time = 0.0
+        self.queries = 0
+        self.pool_wait = 0.0
+        self.serialize_time = 0.0
+        self.endpoint_done: Optional[float] = None
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class _Family:
+    def __init__(self, name: str, kind: str, help_text: str):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+
+
+class HistogramFamily(_Family):
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, "histogram", help_text)
+        self.buckets = buckets
+        self.series: Dict[Labels, Histogram] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        histogram = self.series.get(key)
+        if histogram is None:
+            histogram = self.series[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def samples(self):
+        for labels, histogram in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), histogram.counts):
+                cumulative += count
+                yield "_bucket", (*labels, ("le", _format_value(bound))), cumulative
+            yield "_sum", labels, histogram.sum
+            yield "_count", labels, cumulative
+
+
+class CounterFamily(_Family):
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, "counter", help_text)
+        self.series: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        self.series[key] = self.series.get(key, 0) + amount
+
+    def samples(self):
+        for labels, value in self.series.items():
+            yield "", labels, value
+
+
+class GaugeFamily(_Family):
+    """抓取时调用 collect 取当前值，返回 [(标签, 值), ...]"""
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        super().__init__(name, "gauge", help_text)
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect():
+            yield "", tuple(sorted(labels.items())), value
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """进程内指标，按 Prometheus 文本格式输出；多 worker 部署时每个 worker 各自计数"""
+
+    def __init__(self):
+        self.families: List[_Family] = []
+        self._lock = threading.Lock()
+
+    def register(self, family):
+        with self._lock:
+            self.families.append(family)
+        return family
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> HistogramFamily:
+        return self.register(HistogramFamily(name, help_text, buckets))
+
+    def counter(self, name: str, help_text: str) -> CounterFamily:
+        return self.register(CounterFamily(name, help_text))
+
+    def gauge(self, name: str, help_text: str, collect) -> GaugeFamily:
+        return self.register(GaugeFamily(name, help_text, collect))
+
+    def render(self) -> str:
+        lines = []
+        for family in self.families:
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for suffix, labels, value in family.samples():
+                if labels:
+                    rendered = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels)
+                    lines.append(f"{family.name}{suffix}{{{rendered}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{family.name}{suffix} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter("http_requests_total", "已处理的 HTTP 请求数")
+http_duration = registry.histogram("http_request_duration_seconds", "请求总耗时（至响应发送完毕）")
+http_db_time = registry.histogram("http_request_db_seconds", "请求内执行 SQL 的累计耗时")
+http_serialize_time = registry.histogram("http_request_serialization_seconds", "请求内响应序列化的累计耗时")
+http_pool_wait = registry.histogram("http_request_pool_wait_seconds", "请求内等待数据库连接的累计耗时")
+http_queries = registry.histogram("http_request_db_queries", "每个请求执行的 SQL 条数", COUNT_BUCKETS)
+db_queries = registry.counter("db_queries_total", "执行的 SQL 条数")
+db_pool_wait = registry.histogram("db_pool_wait_seconds", "从连接池取连接的等待时间")
+
+
+def instrument_engine(async_engine, name: str):
+    """在引擎上统计 SQL 耗时与取连接等待，计入当前请求"""
+    sync_engine = async_engine.sync_engine
+    async_engine.pool.metrics_name = name
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_queries.inc(pool=name)
+        stats = _current.get()
+        if stats is not None:
+            stats.db_time += elapsed
+            stats.queries += 1
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(context):
+        # 出错的语句没有 after_cursor_execute，丢弃对应的起始时间
+        if context.connection is not None:
+            starts = context.connection.info.get("query_start")
+            if starts:
+                starts.pop()
+
+
+def record_pool_wait(name: str, waited: float):
+    db_pool_wait.observe(waited, pool=name)
+    stats = _current.get()
+    if stats is not None:
+        stats.pool_wait += waited
+
+
+@contextmanager
+def serializing():
+    """把代码块的耗时计入当前请求的序列化时间（用于在路由函数内自行序列化的接口）"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.serialize_time += time.perf_counter() - start
+
+
+class InstrumentedRoute(APIRoute):
+    """记录路由模板作为指标标签，并把路由函数返回之后的响应校验与序列化计入序列化时间"""
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if call is not None and not getattr(call, "_instrumented", False):
+            self.dependant.call = _mark_endpoint_done(call)
+        handler = super().get_route_handler()
+        path_format = self.path_format
+
+        async def instrumented_handler(request):
+            stats = _current.get()
+            if stats is not None:
+                stats.route = _route_label(request.scope["path"], path_format)
+            response = await handler(request)
+            if stats is not None and stats.endpoint_done is not None:
+                stats.serialize_time += time.perf_counter() - stats.endpoint_done
+                stats.endpoint_done = None
+            return response
+
+        return instrumented_handler
+
+
+def _route_label(path: str, path_format: str) -> str:
+    """完整的路由模板，如 /api/v1/posts/{post_id}
+
+    较新的 FastAPI 在 include_router 时不再复制路由，路由上的模板不含前缀，
+    这里按模板的段数从实际路径中取回前缀；旧版模板已含前缀，取到的前缀为空。
+    """
+    extra = path.count("/") - path_format.count("/")
+    if extra <= 0:
+        return path_format
+    return "/".join(path.split("/")[:extra + 1]) + path_format
+
+
+def _mark_endpoint_done(call):
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def endpoint(*args, **kwargs):
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                _done()
+    else:
+        @functools.wraps(call)
+        def endpoint(*args, **kwargs):
+            try:
+                return call(*args, **kwargs)
+            finally:
+                _done()
+    endpoint._instrumented = True
+    return endpoint
+
+
+def _done():
+    stats = _current.get()
+    if stats is not None:
+        stats.endpoint_done = time.perf_counter()
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件：为每个 HTTP 请求建立 RequestStats，结束时写入各直方图
+
+    不使用 BaseHTTPMiddleware，避免额外的任务切换与流式响应被缓冲。
+    """
+
+    def __init__(self, app, profiler=None):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _current.set(stats)
+        status_code = 500
+        profile = self.profiler.start(scope) if self.profiler is not None else None
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            method = scope["method"]
+            # 未匹配任何接口（404）或静态文件等非 API 路由，不用原始路径做标签以免序列数失控
+            route = stats.route or ("unmatched" if status_code == 404 else "other")
+            http_requests.inc(method=method, route=route, status=str(status_code))
+            http_duration.observe(elapsed, method=method, route=route)
+            http_db_time.observe(stats.db_time, method=method, route=route)
+            http_serialize_time.observe(stats.serialize_time, method=method, route=route)
+            http_pool_wait.observe(stats.pool_wait, method=method, route=route)
+            http_queries.observe(stats.queries, method=method, route=route)
+            if profile is not None:
+                self.profiler.finish(profile, f"{method} {route}", elapsed, stats)
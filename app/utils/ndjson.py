@@ -0,0 +1,56 @@
+import json
+from typing import Any, AsyncIterator, List, Tuple
+
+from app.config import settings
+
+
+class InvalidLine:
+    """无法解析的行，携带错误信息，由调用方记为该行的错误"""
+
+    def __init__(self, detail: str):
+        self.detail = detail
+
+
+def _parse(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return InvalidLine(f"JSON 格式错误: {e}")
+
+
+async def iter_ndjson(
+    stream: AsyncIterator[bytes], max_line_bytes: int = settings.IMPORT_MAX_LINE_BYTES
+) -> AsyncIterator[Tuple[int, Any]]:
+    """逐行解析请求体，产出 (行号, 对象或 InvalidLine)，跳过空行
+
+    未结束的行先按块收集，遇到换行再拼接；某一行超过 max_line_bytes 时产出 InvalidLine 并停止读取，
+    内存占用不超过一行的上限加一个数据块。
+    """
+    pending: List[bytes] = []  # 当前行已收到、尚未遇到换行的部分
+    pending_size = 0
+    line_no = 0
+
+    def too_long():
+        return line_no + 1, InvalidLine(f"单行超过 {max_line_bytes} 字节，后续内容未处理")
+
+    async for chunk in stream:
+        *lines, rest = chunk.split(b"\n")
+        if lines and pending:
+            lines[0] = b"".join(pending) + lines[0]
+            pending, pending_size = [], 0
+        for line in lines:
+            if len(line) > max_line_bytes:
+                yield too_long()
+                return
+            line_no += 1
+            if line.strip():
+                yield line_no, _parse(line)
+        if rest:
+            pending.append(rest)
+            pending_size += len(rest)
+            if pending_size > max_line_bytes:
+                yield too_long()
+                return
+    line = b"".join(pending)
+    if line.strip():
+        yield line_no + 1, _parse(line)
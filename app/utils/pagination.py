@@ -0,0 +1,95 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+
+# 游标为 (created_at, id) 的不透明编码，默认按 created_at DESC, id DESC 翻页（评论为升序）
+Cursor = Tuple[datetime, int]
+
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+# 搜索结果按 (score, id) 降序翻页
+RankCursor = Tuple[float, int]
+
+
+def _pack(values) -> str:
+    raw = json.dumps(values, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _unpack(cursor: str):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()))
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    return _pack([created_at.isoformat(), row_id])
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    try:
+        created_at, row_id = _unpack(cursor)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def encode_rank_cursor(score: float, row_id: int) -> str:
+    return _pack([score, row_id])
+
+
+def decode_rank_cursor(cursor: str) -> RankCursor:
+    try:
+        score, row_id = _unpack(cursor)
+        return float(score), int(row_id)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def _invalid_cursor():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="无效的分页游标"
+    )
+
+
+def cursor_param(cursor: Optional[str] = None) -> Optional[Cursor]:
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise _invalid_cursor()
+
+
+def rank_cursor_param(cursor: Optional[str] = None) -> Optional[RankCursor]:
+    if cursor is None:
+        return None
+    try:
+        return decode_rank_cursor(cursor)
+    except ValueError:
+        raise _invalid_cursor()
+
+
+def keyset(stmt, model, after: Optional[Cursor], descending: bool = True):
+    # 走 (created_at, id) 复合索引，深翻页与第一页代价相同
+    if descending:
+        if after is not None:
+            stmt = stmt.where(tuple_(model.created_at, model.id) < after)
+        return stmt.order_by(model.created_at.desc(), model.id.desc())
+    if after is not None:
+        stmt = stmt.where(tuple_(model.created_at, model.id) > after)
+    return stmt.order_by(model.created_at.asc(), model.id.asc())
+
+
+def next_cursor(rows: Sequence, limit: int) -> Optional[str]:
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    if isinstance(last, dict):  # 列投影返回的字典
+        return encode_cursor(last["created_at"], last["id"])
+    return encode_cursor(last.created_at, last.id)
@@ -0,0 +1,118 @@
+import asyncio
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+
+
+def _frame_name(code) -> str:
+    # 折叠栈格式以 ";" 分隔帧、以最后一个空格分隔计数
+    filename = code.co_filename
+    marker = os.sep + "site-packages" + os.sep
+    if marker in filename:
+        filename = filename.split(marker, 1)[1]
+    elif filename.startswith(os.getcwd()):
+        filename = os.path.relpath(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _thread_stack(frame) -> list:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_stack(coro) -> list:
+    """沿 cr_await 链取出挂起中协程的调用栈（最外层在前）"""
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_name(frame.f_code))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return stack
+
+
+class Profile:
+    def __init__(self, task: asyncio.Task, loop, thread_id: int):
+        self.task = task
+        self.loop = loop
+        self.thread_id = thread_id
+        self.samples: Counter = Counter()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+
+class SamplingProfiler:
+    """按请求头开启的采样分析器
+
+    请求带 X-Profile: <PROFILE_TOKEN> 时，后台线程按固定间隔采样事件循环线程：
+    该请求的任务正在运行时记录线程调用栈 (on-CPU)，挂起时记录其 await 链并标记为 [await] (off-CPU，
+    通常是在等数据库或 Redis)。请求耗时超过阈值才把结果以折叠栈格式写入 PROFILE_DIR，
+    可直接交给 flamegraph.pl 或 speedscope。同一时刻只分析一个请求。
+    """
+
+    def __init__(self, token: Optional[str], directory: str, interval: float, slow_seconds: float):
+        self.token = token.encode() if token else None
+        self.directory = directory
+        self.interval = interval
+        self.slow_seconds = slow_seconds
+        self._active = threading.Lock()
+
+    def start(self, scope) -> Optional[Profile]:
+        if self.token is None:
+            return None
+        supplied = dict(scope["headers"]).get(PROFILE_HEADER)
+        if supplied is None or not hmac.compare_digest(supplied, self.token):
+            return None
+        if not self._active.acquire(blocking=False):
+            return None
+        task = asyncio.current_task()
+        profile = Profile(task, asyncio.get_running_loop(), threading.get_ident())
+        profile.thread = threading.Thread(target=self._sample, args=(profile,), name="profiler", daemon=True)
+        profile.thread.start()
+        return profile
+
+    def _sample(self, profile: Profile):
+        # 事件循环正在执行的任务；取不到时（其它 Python 实现）一律按 on-CPU 采样
+        current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+        while not profile.stopped.wait(self.interval):
+            running = current_tasks.get(profile.loop) if current_tasks is not None else profile.task
+            if running is profile.task:
+                frame = sys._current_frames().get(profile.thread_id)
+                stack = _thread_stack(frame) if frame is not None else []
+            else:
+                stack = ["[await]", *_await_stack(profile.task.get_coro())]
+            if stack:
+                profile.samples[";".join(stack)] += 1
+
+    def finish(self, profile: Profile, label: str, elapsed: float, stats) -> Optional[str]:
+        profile.stopped.set()
+        profile.thread.join()
+        self._active.release()
+        if elapsed < self.slow_seconds or not profile.samples:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        safe_label = "".join(char if char.isalnum() else "_" for char in label).strip("_")
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_label}-{int(elapsed * 1000)}ms.folded")
+        with open(path, "w") as output:
+            for stack, count in profile.samples.most_common():
+                output.write(f"{stack} {count}\n")
+        logger.warning(
+            "慢请求 %s 耗时 %.0fms（SQL %d 条 %.0fms，序列化 %.0fms，等待连接 %.0fms），采样已写入 %s",
+            label, elapsed * 1000, stats.queries, stats.db_time * 1000,
+            stats.serialize_time * 1000, stats.pool_wait * 1000, path,
+        )
+        return path
@@ -0,0 +1,229 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Tuple
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.schemas.user import CurrentUser
+from app.utils.metrics import registry
+from app.utils.redis_client import get_redis
+from app.utils.security import get_current_user
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+rate_limited = registry.counter("rate_limited_total", "被限流拒绝的请求数")
+
+
+class Policy(NamedTuple):
+    """令牌桶：容量 burst，每秒补充 rate 个令牌"""
+    name: str
+    rate: float
+    burst: int
+
+
+def parse_policy(name: str, spec: str) -> Policy:
+    """"10/minute" 表示每分钟 10 次，允许一次性用完"""
+    count, _, period = spec.partition("/")
+    try:
+        count, seconds = int(count), _PERIODS[period.strip()]
+    except (KeyError, ValueError):
+        raise ValueError(f"无效的限流配置 {name}={spec!r}，格式为 次数/second|minute|hour|day")
+    return Policy(name, count / seconds, count)
+
+
+class MemoryBuckets:
+    """进程内令牌桶，按最近使用淘汰；被淘汰的桶下次按满桶重新开始"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def take(self, key: str, policy: Policy) -> float:
+        """取一个令牌；成功返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [float(policy.burst), now]
+            if len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(policy.burst, bucket[0] + (now - bucket[1]) * policy.rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / policy.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RedisBuckets:
+    """Redis 中的令牌桶，多个 worker 共享；Lua 脚本保证读取、补充与扣减是原子的
+
+    时间取 Redis 服务器的 TIME，不受各 worker 时钟偏差影响。每个桶是一个哈希 rl:{策略}:{标识}，
+    桶补满所需的时间后自动过期。
+    """
+
+    SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1])
+if tokens == nil then
+    tokens = burst
+else
+    tokens = math.min(burst, tokens + math.max(0, now - tonumber(state[2])) * rate)
+end
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("PEXPIRE", KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(wait)
+"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.script = redis.register_script(self.SCRIPT)
+
+    async def take(self, key: str, policy: Policy) -> float:
+        return float(await self.script(keys=[f"rl:{key}"], args=[policy.rate, policy.burst]))
+
+
+class RateLimiter:
+    """限流入口：配置了 RATE_LIMIT_REDIS 时用 Redis 共享计数，Redis 不可用时退回进程内令牌桶"""
+
+    def __init__(self, enabled: bool, use_redis: bool, maxsize: int):
+        self.enabled = enabled
+        self.use_redis = use_redis
+        self.memory = MemoryBuckets(maxsize)
+        self._redis_buckets = None
+        self.allowed = 0
+        self.rejected = 0
+        self.redis_errors = 0
+
+    def _redis(self):
+        redis = get_redis() if self.use_redis else None
+        if redis is None:
+            return None
+        if self._redis_buckets is None or self._redis_buckets.redis is not redis:
+            self._redis_buckets = RedisBuckets(redis)
+        return self._redis_buckets
+
+    async def hit(self, policy: Policy, identity: str) -> float:
+        """记一次请求；放行返回 0，否则返回建议的 Retry-After 秒数"""
+        if not self.enabled:
+            return 0.0
+        key = f"{policy.name}:{identity}"
+        buckets = self._redis()
+        wait = None
+        if buckets is not None:
+            try:
+                wait = await buckets.take(key, policy)
+            except RedisError:
+                self.redis_errors += 1
+        if wait is None:
+            wait = self.memory.take(key, policy)
+        if wait > 0:
+            self.rejected += 1
+            rate_limited.inc(policy=policy.name)
+        else:
+            self.allowed += 1
+        return wait
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "redis_errors": self.redis_errors,
+            "local_buckets": len(self.memory),
+        }
+
+
+rate_limiter = RateLimiter(
+    enabled=settings.RATE_LIMIT_ENABLED,
+    use_redis=settings.RATE_LIMIT_REDIS,
+    maxsize=settings.RATE_LIMIT_MAX_KEYS,
+)
+
+TOO_MANY_REQUESTS = "请求过于频繁，请稍后重试"
+
+
+def _retry_after(wait: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(wait)))}
+
+
+def client_ip(scope) -> str:
+    # 部署在反向代理后时由 uvicorn 按 FORWARDED_ALLOW_IPS 信任代理，把 X-Forwarded-For 中的真实地址写入 client
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def limit_by_ip(name: str, spec: str):
+    """路由依赖：按客户端 IP 限流，用于注册等未登录即可调用的接口"""
+    policy = parse_policy(name, spec)
+
+    async def dependency(request: Request):
+        wait = await rate_limiter.hit(policy, client_ip(request.scope))
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=TOO_MANY_REQUESTS,
+                headers=_retry_after(wait),
+            )
+
+    return dependency
+
+
+def limit_by_user(name: str, spec: str):
+    """路由依赖：按登录用户限流；与路由本身的 get_current_user 共用同一次认证"""
+    policy = parse_policy(name, spec)
+
+    async def dependency(current_user: CurrentUser = Depends(get_current_user)):
+        wait = await rate_limiter.hit(policy, str(current_user.id))
+        if wait > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=TOO_MANY_REQUESTS,
+                headers=_retry_after(wait),
+            )
+
+    return dependency
+
+
+class RateLimitMiddleware:
+    """纯 ASGI 中间件：所有 HTTP 请求共用的按 IP 总量限流，挡住单个客户端的刷接口行为
+
+    细粒度的按路由、按用户策略见 limit_by_ip / limit_by_user。
+    """
+
+    def __init__(self, app, spec: str, exempt: Tuple[str, ...] = ()):
+        self.app = app
+        self.policy = parse_policy("ip", spec)
+        self.exempt = exempt
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt):
+            await self.app(scope, receive, send)
+            return
+        wait = await rate_limiter.hit(self.policy, client_ip(scope))
+        if wait > 0:
+            response = JSONResponse(
+                {"detail": TOO_MANY_REQUESTS},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers=_retry_after(wait),
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
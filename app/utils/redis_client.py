@@ -0,0 +1,24 @@
+from typing import Optional
+
+from redis import asyncio as aioredis
+
+from app.config import settings
+
+_client: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> Optional[aioredis.Redis]:
+    """未配置 REDIS_URL 时返回 None，调用方退回进程内实现"""
+    global _client
+    if settings.REDIS_URL is None:
+        return None
+    if _client is None:
+        _client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
+
+
+async def close_redis():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,164 @@
+import hashlib
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from redis.exceptions import RedisError
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.metrics import serializing
+from app.utils.redis_client import get_redis
+
+# 每个缓存条目都依赖的代数：帖子/物品中嵌套了作者信息，用户资料变化时一并失效
+DEFAULT_DEPS = ("all", "users")
+
+
+def query_key(prefix: str, request: Request) -> str:
+    return prefix + "?" + "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+class ResponseCache:
+    """按路由与查询参数缓存 JSON 响应，并支持 If-None-Match 条件请求
+
+    - 校验器 (key -> ETag) 与失效代数 (generation) 可放在 Redis 中供多 worker 共享；
+    - 响应体按 ETag 存放在进程内，ETag 由响应内容计算，同一 ETag 的内容不会变化，无需失效。
+    """
+
+    def __init__(self, maxsize: int, ttl: int, enabled: bool = True, use_redis: bool = False):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.use_redis = use_redis
+        self.bodies = TTLCache(maxsize, ttl)
+        self._validators = TTLCache(maxsize, ttl)
+        self._generations: Dict[str, int] = {}
+        self.not_modified = 0
+        self.served = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def _redis(self):
+        return get_redis() if self.use_redis else None
+
+    async def _generation_tag(self, deps: Iterable[str]) -> str:
+        deps = list(deps)
+        redis = self._redis()
+        if redis is not None:
+            try:
+                values = await redis.mget([f"rc:g:{name}" for name in deps])
+                return ".".join(value or "0" for value in values)
+            except RedisError:
+                pass
+        return ".".join(str(self._generations.get(name, 0)) for name in deps)
+
+    async def _get_validator(self, key: str) -> Optional[str]:
+        redis = self._redis()
+        if redis is not None:
+            try:
+                return await redis.get(f"rc:v:{key}")
+            except RedisError:
+                return None
+        return self._validators.get(key)
+
+    async def _set_validator(self, key: str, etag: str):
+        redis = self._redis()
+        if redis is not None:
+            try:
+                await redis.set(f"rc:v:{key}", etag, ex=self.ttl)
+                return
+            except RedisError:
+                pass
+        self._validators.set(key, etag)
+
+    async def invalidate(self, *keys: str):
+        """精确失效单个资源，如 post:1"""
+        await self.bump(*(f"key:{key}" for key in keys))
+
+    async def bump(self, *names: str):
+        """让依赖某个代数的所有条目失效，如列表页依赖 posts"""
+        for name in names:
+            self._generations[name] = self._generations.get(name, 0) + 1
+        redis = self._redis()
+        if redis is not None:
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for name in names:
+                        pipe.incr(f"rc:g:{name}")
+                    await pipe.execute()
+            except RedisError:
+                pass
+
+    async def respond(
+        self,
+        request: Request,
+        key: str,
+        build: Callable[[Dict[str, str]], Awaitable[object]],
+        adapter: TypeAdapter,
+        deps: Tuple[str, ...] = (),
+    ) -> Response:
+        if not self.enabled:
+            headers: Dict[str, str] = {}
+            payload = await build(headers)
+            with serializing():
+                body = adapter.dump_json(adapter.validate_python(payload, from_attributes=True))
+            return Response(body, media_type="application/json", headers=headers)
+
+        deps = DEFAULT_DEPS + deps + (f"key:{key}",)
+        full_key = f"{key}@{await self._generation_tag(deps)}"
+        if_none_match = request.headers.get("if-none-match")
+
+        etag = await self._get_validator(full_key)
+        if etag is not None:
+            cached = self.bodies.get(etag)
+            if _matches(if_none_match, etag):
+                self.not_modified += 1
+                self.bytes_saved += len(cached[0]) if cached else 0
+                return Response(status_code=304, headers=self._headers(etag, cached[1] if cached else {}))
+            if cached is not None:
+                self.served += 1
+                return Response(cached[0], media_type="application/json", headers=self._headers(etag, cached[1]))
+
+        self.misses += 1
+        headers: Dict[str, str] = {}
+        payload = await build(headers)
+        with serializing():
+            body = adapter.dump_json(adapter.validate_python(payload, from_attributes=True))
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.bodies.set(etag, (body, headers))
+        await self._set_validator(full_key, etag)
+        if _matches(if_none_match, etag):
+            self.not_modified += 1
+            self.bytes_saved += len(body)
+            return Response(status_code=304, headers=self._headers(etag, headers))
+        return Response(body, media_type="application/json", headers=self._headers(etag, headers))
+
+    @staticmethod
+    def _headers(etag: str, extra: Dict[str, str]) -> Dict[str, str]:
+        return {"ETag": etag, "Cache-Control": "private, no-cache", **extra}
+
+    def stats(self) -> Dict[str, float]:
+        total = self.not_modified + self.served + self.misses
+        return {
+            "not_modified": self.not_modified,
+            "served_from_cache": self.served,
+            "misses": self.misses,
+            "hit_rate": (self.not_modified + self.served) / total if total else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+response_cache = ResponseCache(
+    maxsize=settings.RESPONSE_CACHE_MAX_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    enabled=settings.RESPONSE_CACHE_ENABLED,
+    use_redis=settings.RESPONSE_CACHE_REDIS,
+)
@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
@@ -11,11 +13,29 @@ from sqlalchemy import select  # 添加缺失的导入
 from app.config import settings
 from app.database import get_db
 from app.models.user import User
-from app.schemas.user import TokenData
+from app.schemas.user import CurrentUser, TokenData
+from app.utils.cache import TieredCache
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# 已认证用户缓存，按 JWT 的 sub（用户名）索引
+principal_cache: TieredCache[CurrentUser] = TieredCache(
+    "auth:user",
+    CurrentUser,
+    maxsize=settings.AUTH_CACHE_MAX_SIZE,
+    ttl=settings.AUTH_CACHE_TTL,
+    use_redis=settings.AUTH_CACHE_REDIS,
+)
+
+# bcrypt 计算会阻塞事件循环，放到独立线程池中执行
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_hash_slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE)
+
+
 def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -24,6 +44,26 @@ def hash_password(password: str):
     return pwd_context.hash(password)
 
 
+async def _run_in_hash_pool(func, *args):
+    if _hash_slots.locked():
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="服务繁忙，请稍后重试",
+            headers={"Retry-After": "1"},
+        )
+    async with _hash_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str):
+    return await _run_in_hash_pool(hash_password, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -38,7 +78,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db)
-):
+) -> CurrentUser:
+    return await authenticate_token(credentials.credentials, db)
+
+
+async def authenticate_token(token: str, db: AsyncSession) -> CurrentUser:
+    """校验 JWT 并返回对应用户；WebSocket / SSE 等无法使用依赖注入的入口直接调用"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无法验证凭据",
@@ -46,7 +91,7 @@ async def get_current_user(
     )
     try:
         payload = jwt.decode(
-            credentials.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
         username: str = payload.get("sub")
         if username is None:
@@ -54,9 +99,25 @@ async def get_current_user(
         token_data = TokenData(username=username)
     except InvalidTokenError:
         raise credentials_exception
-    stmt = select(User).where(User.username == token_data.username)
+    user = await principal_cache.get(token_data.username)
+    if user is not None:
+        return user
+    # 只查询认证所需的列，不构造 ORM 对象
+    stmt = select(User.id, User.username, User.is_active, User.is_admin).where(User.username == token_data.username)
     result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-    if user is None:
+    row = result.first()
+    if row is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    user = CurrentUser.model_validate(row)
+    await principal_cache.set(user.username, user)
+    return user
+
+
+async def require_admin(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="需要管理员权限")
+    return current_user
+
+
+async def invalidate_principal(username: str):
+    await principal_cache.delete(username)
\ No newline at end of file
@@ -0,0 +1,85 @@
+import re
+from typing import Iterable, List
+
+from sqlalchemy import DDL, Table, event
+
+# 中日韩统一表意文字
+_CJK = "㐀-䶿一-鿿豈-﫿"
+_TOKEN_RE = re.compile(rf"[{_CJK}]+|(?:(?![{_CJK}])[^\W_])+")
+
+
+def _is_cjk(char: str) -> bool:
+    return bool(re.match(rf"[{_CJK}]", char))
+
+
+def tokenize(*parts: str) -> List[str]:
+    """中文按二元组 (bigram) 切分，其余按单词切分并转小写"""
+    tokens = []
+    for part in parts:
+        if not part:
+            continue
+        for match in _TOKEN_RE.finditer(part.lower()):
+            run = match.group()
+            if _is_cjk(run[0]) and len(run) > 1:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+            else:
+                tokens.append(run)
+    return tokens
+
+
+def cjk_characters(tokens: Iterable[str]) -> List[str]:
+    """中文词元拆成的单个汉字，供只有一个汉字的关键词匹配二元组"""
+    return [char for token in tokens if _is_cjk(token[0]) for char in token]
+
+
+def search_document(*parts: str) -> str:
+    return " ".join(tokenize(*parts))
+
+
+def fts5_query(q: str) -> str:
+    # 单个汉字无法命中二元组，改用前缀匹配
+    terms = []
+    for token in dict.fromkeys(tokenize(q)):
+        if len(token) == 1 and _is_cjk(token):
+            terms.append(f'"{token}"*')
+        else:
+            terms.append(f'"{token}"')
+    return " ".join(terms)
+
+
+def tsquery(q: str) -> str:
+    terms = []
+    for token in dict.fromkeys(tokenize(q)):
+        if len(token) == 1 and _is_cjk(token):
+            terms.append(f"{token}:*")
+        else:
+            terms.append(token)
+    return " & ".join(terms)
+
+
+def fts_table_name(table: Table) -> str:
+    return f"{table.name}_fts"
+
+
+def register_fulltext_index(table: Table, column: str = "search_tokens"):
+    """为 table.column 建立全文索引：Postgres 使用 GIN 表达式索引，SQLite 使用 FTS5 外部内容表"""
+    name = table.name
+    fts = fts_table_name(table)
+    event.listen(table, "after_create", DDL(
+        f"CREATE INDEX IF NOT EXISTS ix_{name}_{column}_gin "
+        f"ON {name} USING gin (to_tsvector('simple', {column}))"
+    ).execute_if(dialect="postgresql"))
+    sqlite_ddl = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({column}, content='{name}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {name} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END",
+        # 只在检索字段变化时重建，点赞等计数更新不触发
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {column} ON {name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+        f"INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END",
+    ]
+    for statement in sqlite_ddl:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    event.listen(table, "before_drop", DDL(f"DROP TABLE IF EXISTS {fts}").execute_if(dialect="sqlite"))
@@ -0,0 +1,135 @@
+import bisect
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.redis_client import get_redis
+
+
+class MemoryTimelineStore:
+    """进程内时间线存储，仅用于测试与单进程部署
+
+    与 Redis 实现一致，时间线在 ttl 秒没有读取后过期；另外最多保留 max_users 个用户，超出时淘汰最久未读的。
+    """
+
+    def __init__(self, max_length: int, ttl: float, max_users: int):
+        self.max_length = max_length
+        self.ttl = ttl
+        self.max_users = max_users
+        self._timelines: "OrderedDict[int, Tuple[float, List[int]]]" = OrderedDict()
+
+    def _get(self, user_id: int) -> Optional[List[int]]:
+        entry = self._timelines.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._timelines[user_id]
+            return None
+        return entry[1]
+
+    def _touch(self, user_id: int, timeline: List[int]):
+        self._timelines[user_id] = (time.monotonic() + self.ttl, timeline)
+        self._timelines.move_to_end(user_id)
+        while len(self._timelines) > self.max_users:
+            self._timelines.popitem(last=False)
+
+    async def exists(self, user_id: int) -> bool:
+        return self._get(user_id) is not None
+
+    async def replace(self, user_id: int, post_ids: Iterable[int]):
+        self._touch(user_id, sorted(post_ids)[-self.max_length:])
+
+    async def push(self, user_ids: Iterable[int], post_id: int):
+        for user_id in user_ids:
+            timeline = self._get(user_id)
+            # 不活跃用户没有时间线，下次读取时再重建
+            if timeline is None:
+                continue
+            index = bisect.bisect_left(timeline, post_id)
+            if index < len(timeline) and timeline[index] == post_id:
+                continue  # 写扩散任务重试时不重复插入
+            timeline.insert(index, post_id)
+            del timeline[:-self.max_length]
+
+    async def page(self, user_id: int, before: Optional[int], limit: int) -> List[int]:
+        timeline = self._get(user_id)
+        if timeline is None:
+            return []
+        self._touch(user_id, timeline)
+        end = bisect.bisect_left(timeline, before) if before is not None else len(timeline)
+        return timeline[max(0, end - limit):end][::-1]
+
+    async def drop(self, user_id: int):
+        self._timelines.pop(user_id, None)
+
+
+class RedisTimelineStore:
+    """每个用户一个有序集合 feed:{user_id}，分值为帖子 id
+
+    重建时写入哨兵成员 0，使空时间线也能与“未构建”区分开；超出长度时哨兵最先被裁掉。
+    """
+
+    # 只推送给已有时间线的用户，不活跃用户的键已过期，下次读取时重建
+    PUSH_SCRIPT = """
+    for _, key in ipairs(KEYS) do
+        if redis.call('EXISTS', key) == 1 then
+            redis.call('ZADD', key, ARGV[1], ARGV[1])
+            redis.call('ZREMRANGEBYRANK', key, 0, -(tonumber(ARGV[2]) + 1))
+        end
+    end
+    return 0
+    """
+
+    def __init__(self, redis, max_length: int, ttl: int):
+        self.redis = redis
+        self.max_length = max_length
+        self.ttl = ttl
+        self._push_script = redis.register_script(self.PUSH_SCRIPT)
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"feed:{user_id}"
+
+    async def exists(self, user_id: int) -> bool:
+        return bool(await self.redis.exists(self._key(user_id)))
+
+    async def replace(self, user_id: int, post_ids: Iterable[int]):
+        key = self._key(user_id)
+        mapping = {str(post_id): post_id for post_id in post_ids}
+        mapping["0"] = 0
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            pipe.zadd(key, mapping)
+            pipe.zremrangebyrank(key, 0, -(self.max_length + 1))
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+
+    async def push(self, user_ids: Iterable[int], post_id: int):
+        keys = [self._key(user_id) for user_id in user_ids]
+        for start in range(0, len(keys), 500):
+            await self._push_script(keys=keys[start:start + 500], args=[post_id, self.max_length])
+
+    async def page(self, user_id: int, before: Optional[int], limit: int) -> List[int]:
+        key = self._key(user_id)
+        max_score = f"({before}" if before is not None else "+inf"
+        members = await self.redis.zrevrangebyscore(key, max_score, "(0", start=0, num=limit)
+        await self.redis.expire(key, self.ttl)
+        return [int(member) for member in members]
+
+    async def drop(self, user_id: int):
+        await self.redis.delete(self._key(user_id))
+
+
+_memory_store = MemoryTimelineStore(settings.FEED_MAX_LENGTH, settings.FEED_TTL, settings.FEED_MEMORY_MAX_USERS)
+_redis_store: Optional[RedisTimelineStore] = None
+
+
+def get_timeline_store():
+    global _redis_store
+    redis = get_redis() if settings.FEED_REDIS else None
+    if redis is None:
+        return _memory_store
+    if _redis_store is None or _redis_store.redis is not redis:
+        _redis_store = RedisTimelineStore(redis, settings.FEED_MAX_LENGTH, settings.FEED_TTL)
+    return _redis_store
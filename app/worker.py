@@ -0,0 +1,83 @@
+"""后台任务 worker 进程
+
+用法: python -m app.worker [--lanes high,default,low] [--concurrency 16] [--processes 1]
+
+领取 jobs 表中的任务执行，需与 Web 进程使用同一个 DATABASE_URL。--lanes 限定处理的优先级队列，
+可以单独为 high 队列（实时推送）起几个进程，避免被大批写扩散任务拖慢；--processes 大于 1 时
+启动多个子进程，收到 SIGTERM / SIGINT 后各自处理完手头的任务再退出。
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import subprocess
+import sys
+
+from app.config import settings
+from app.database import engine, prepare_schema, replica_engines
+from app.models import Base
+from app.utils.jobs import LANES, Worker
+from app.utils.redis_client import close_redis
+
+# 导入以注册任务处理函数
+import app.services.counter_service  # noqa: F401
+import app.services.feed_service  # noqa: F401
+import app.utils.events  # noqa: F401
+
+logger = logging.getLogger("app.worker")
+
+
+async def _run(lanes, concurrency: int):
+    await prepare_schema(Base.metadata)
+    if settings.REDIS_URL is None or not (settings.FEED_REDIS and settings.EVENTS_REDIS):
+        logger.warning("未开启 FEED_REDIS / EVENTS_REDIS：独立 worker 中的写扩散与推送不会被 Web 进程看到")
+    worker = Worker(lanes, concurrency=concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    logger.info("worker 已启动，队列 %s，并发 %d", ",".join(lanes), concurrency)
+    try:
+        await worker.run()
+    finally:
+        logger.info("worker 退出：%s", worker.stats())
+        await close_redis()
+        for db_engine in (engine, *replica_engines):
+            await db_engine.dispose()
+
+
+def _supervise(argv, processes: int) -> int:
+    """启动多个单进程 worker，转发退出信号并等待全部结束"""
+    children = [
+        subprocess.Popen([sys.executable, "-m", "app.worker", *argv, "--processes", "1"])
+        for _ in range(processes)
+    ]
+
+    def forward(signum, frame):
+        for child in children:
+            if child.poll() is None:
+                child.send_signal(signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    return max(child.wait() for child in children)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.worker")
+    parser.add_argument("--lanes", default=",".join(LANES))
+    parser.add_argument("--concurrency", type=int, default=settings.JOBS_CONCURRENCY)
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args(argv)
+    lanes = [lane.strip() for lane in args.lanes.split(",") if lane.strip()]
+    unknown = set(lanes) - set(LANES)
+    if unknown or not lanes:
+        parser.error(f"未知的队列 {sorted(unknown)}，可选 {', '.join(LANES)}")
+    if args.processes > 1:
+        return _supervise(["--lanes", ",".join(lanes), "--concurrency", str(args.concurrency)], args.processes)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s")
+    asyncio.run(_run(lanes, args.concurrency))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.database import async_database_url
+from app.models import Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # 全文索引不在模型元数据中（见 app.utils.text_search），autogenerate 时忽略：
+    # SQLite 的 FTS5 虚拟表及其影子表，Postgres 的 GIN 表达式索引
+    if type_ == "table" and reflected and compare_to is None and "_fts" in name:
+        return False
+    if type_ == "index" and name and name.endswith("_gin"):
+        return False
+    return True
+
+
+def _configure(**kwargs):
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=include_object,
+        # 每个版本单独一个事务，CONCURRENTLY 建索引的 autocommit_block 不影响其它版本
+        transaction_per_migration=True,
+        **kwargs,
+    )
+
+
+def run_migrations_offline():
+    """alembic upgrade --sql：只输出 SQL，不连接数据库"""
+    _configure(url=async_database_url(settings.DATABASE_URL), literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run_migrations(connection):
+    # SQLite 不支持 ALTER 约束，改表时由 batch 模式重建
+    _configure(connection=connection, render_as_batch=connection.dialect.name == "sqlite")
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_migrations_online():
+    engine = create_async_engine(async_database_url(settings.DATABASE_URL), poolclass=pool.NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(_run_migrations)
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
@@ -0,0 +1,91 @@
+"""迁移脚本共用的辅助函数
+
+此前表结构由启动时的 create_all 维护，已有数据库停在哪个版本不确定；这里的建表、加列、建索引
+遇到已存在的对象直接跳过，任何已有数据库都可以直接 alembic upgrade head，无需先 stamp。
+PostgreSQL 上给已有表建索引使用 CREATE INDEX CONCURRENTLY，建索引期间不阻塞写入。
+"""
+from alembic import context, op
+from sqlalchemy import inspect, text
+
+
+def is_postgresql() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def _inspector():
+    # --sql 离线模式下无法查询数据库，按全新数据库输出完整 SQL
+    return None if context.is_offline_mode() else inspect(op.get_bind())
+
+
+def has_table(table: str) -> bool:
+    inspector = _inspector()
+    return inspector is not None and inspector.has_table(table)
+
+
+def has_column(table: str, column: str) -> bool:
+    inspector = _inspector()
+    return inspector is not None and column in {c["name"] for c in inspector.get_columns(table)}
+
+
+def has_index(table: str, name: str) -> bool:
+    inspector = _inspector()
+    return inspector is not None and name in {index["name"] for index in inspector.get_indexes(table)}
+
+
+def create_table(table: str, *columns, **kwargs) -> bool:
+    """表已存在时跳过，返回是否新建"""
+    if has_table(table):
+        return False
+    op.create_table(table, *columns, **kwargs)
+    return True
+
+
+def add_column(table: str, column):
+    if has_column(table, column.name):
+        return
+    if column.foreign_keys:
+        # SQLite 加外键列需要 batch 模式
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(column)
+    else:
+        op.add_column(table, column)
+
+
+def _pg_index_valid(name: str):
+    """索引不存在返回 None；CONCURRENTLY 建到一半失败会留下 indisvalid = false 的索引"""
+    if context.is_offline_mode():
+        return None
+    return op.get_bind().scalar(
+        text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+        ),
+        {"name": name},
+    )
+
+
+def create_index(name: str, table: str, columns, **kwargs):
+    """给已有表在线建索引；已存在的有效索引跳过，上次中断留下的无效索引删除后重建"""
+    if not is_postgresql():
+        if not has_index(table, name):
+            op.create_index(name, table, columns, **kwargs)
+        return
+    valid = _pg_index_valid(name)
+    if valid:
+        return
+    # CONCURRENTLY 不能在事务中执行
+    with op.get_context().autocommit_block():
+        if valid is False:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        op.create_index(name, table, columns, postgresql_concurrently=True, **kwargs)
+
+
+def drop_index(name: str, table: str):
+    if not is_postgresql():
+        if has_index(table, name):
+            op.drop_index(name, table_name=table)
+        return
+    if _pg_index_valid(name) is None:
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,81 @@
+"""初始表结构：用户、帖子、评论、交换物品
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+与最早由 create_all 建出的结构一致，已存在的表跳过。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_table
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("username", sa.String(50), nullable=False),
+        sa.Column("email", sa.String(100), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("full_name", sa.String(100)),
+        sa.Column("bio", sa.String(500)),
+        sa.Column("avatar", sa.String(255)),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("is_verified", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    ):
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if create_table(
+        "posts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("image_urls", sa.String(1000)),
+        sa.Column("likes_count", sa.Integer()),
+        sa.Column("comments_count", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    ):
+        op.create_index("ix_posts_id", "posts", ["id"])
+
+    if create_table(
+        "comments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("post_id", sa.Integer(), sa.ForeignKey("posts.id"), nullable=False),
+        sa.Column("author_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    ):
+        op.create_index("ix_comments_id", "comments", ["id"])
+
+    if create_table(
+        "exchange_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("title", sa.String(200), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("category", sa.String(50)),
+        sa.Column("condition", sa.String(20)),
+        sa.Column("image_urls", sa.String(1000)),
+        sa.Column("is_available", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+    ):
+        op.create_index("ix_exchange_items_id", "exchange_items", ["id"])
+
+
+def downgrade():
+    for table in ("exchange_items", "comments", "posts", "users"):
+        op.drop_table(table)
@@ -0,0 +1,124 @@
+"""初始版本之后新增的表与列
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+点赞、关注、图片、求购意向、后台任务各表；用户的管理员标记与粉丝数，评论的楼中楼，帖子与物品的检索分词。
+给已有行加的计数列带 server_default 回填为 0；检索分词需要在升级后执行 python -m scripts.reindex_search 回填。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import add_column, create_table
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column("users", sa.Column("is_admin", sa.Boolean(), server_default=sa.false()))
+    add_column("users", sa.Column("followers_count", sa.Integer(), server_default="0"))
+    add_column("posts", sa.Column("search_tokens", sa.Text()))
+    add_column("exchange_items", sa.Column("search_tokens", sa.Text()))
+    add_column(
+        "comments", sa.Column("parent_id", sa.Integer(), sa.ForeignKey("comments.id", name="comments_parent_id_fkey"))
+    )
+    add_column("comments", sa.Column("replies_count", sa.Integer(), server_default="0"))
+
+    if create_table(
+        "post_likes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("post_id", sa.Integer(), sa.ForeignKey("posts.id"), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+        sa.UniqueConstraint("post_id", "user_id", name="uq_post_likes_post_user"),
+    ):
+        op.create_index("ix_post_likes_id", "post_likes", ["id"])
+        op.create_index("ix_post_likes_user_id", "post_likes", ["user_id"])
+
+    if create_table(
+        "follows",
+        sa.Column("follower_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("followee_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("created_at", sa.DateTime()),
+    ):
+        op.create_index("ix_follows_followee_id", "follows", ["followee_id"])
+
+    if create_table(
+        "images",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("sha256", sa.String(64), nullable=False, unique=True),
+        sa.Column("uploader_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("content_type", sa.String(50), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=False),
+        sa.Column("height", sa.Integer(), nullable=False),
+        sa.Column("original_key", sa.String(200), nullable=False),
+        sa.Column("display_key", sa.String(200), nullable=False),
+        sa.Column("thumbnail_key", sa.String(200), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    ):
+        op.create_index("ix_images_id", "images", ["id"])
+
+    if create_table(
+        "post_images",
+        sa.Column("post_id", sa.Integer(), sa.ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("image_id", sa.Integer(), sa.ForeignKey("images.id"), primary_key=True),
+        sa.Column("position", sa.Integer(), nullable=False),
+    ):
+        op.create_index("ix_post_images_image_id", "post_images", ["image_id"])
+
+    if create_table(
+        "exchange_item_images",
+        sa.Column(
+            "exchange_item_id", sa.Integer(), sa.ForeignKey("exchange_items.id", ondelete="CASCADE"), primary_key=True
+        ),
+        sa.Column("image_id", sa.Integer(), sa.ForeignKey("images.id"), primary_key=True),
+        sa.Column("position", sa.Integer(), nullable=False),
+    ):
+        op.create_index("ix_exchange_item_images_image_id", "exchange_item_images", ["image_id"])
+
+    if create_table(
+        "exchange_wants",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("category", sa.String(50)),
+        sa.Column("keywords", sa.String(200)),
+        sa.Column("created_at", sa.DateTime()),
+    ):
+        op.create_index("ix_exchange_wants_id", "exchange_wants", ["id"])
+        op.create_index("ix_exchange_wants_user_id", "exchange_wants", ["user_id"])
+
+    if create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(10), nullable=False),
+        sa.Column("idempotency_key", sa.String(200), unique=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("run_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_until", sa.DateTime()),
+        sa.Column("last_error", sa.Text()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("finished_at", sa.DateTime()),
+    ):
+        op.create_index("ix_jobs_id", "jobs", ["id"])
+        op.create_index("ix_jobs_status_priority_run_at", "jobs", ["status", "priority", "run_at", "id"])
+
+
+def downgrade():
+    for table in ("jobs", "exchange_wants", "exchange_item_images", "post_images", "images", "follows", "post_likes"):
+        op.drop_table(table)
+    with op.batch_alter_table("comments") as batch:
+        batch.drop_column("replies_count")
+        batch.drop_column("parent_id")
+    op.drop_column("exchange_items", "search_tokens")
+    op.drop_column("posts", "search_tokens")
+    op.drop_column("users", "followers_count")
+    op.drop_column("users", "is_admin")
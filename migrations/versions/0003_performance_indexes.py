@@ -0,0 +1,95 @@
+"""列表分页、筛选与全文检索用的索引
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+create_all 只在建表时建索引，已有的表一直没有这些索引。PostgreSQL 上逐个 CREATE INDEX CONCURRENTLY，
+大表建索引期间照常读写；中途失败重跑本迁移即可，留下的无效索引会先删除再重建。
+全文检索：PostgreSQL 为 GIN 表达式索引，SQLite 为 FTS5 外部内容表及同步触发器（与 app.utils.text_search 一致）。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from migrations.helpers import create_index, drop_index, has_table, is_postgresql
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_users_created_at_id", "users", ["created_at", "id"], {}),
+    ("ix_posts_created_at_id", "posts", ["created_at", "id"], {}),
+    ("ix_posts_author_id_id", "posts", ["author_id", "id"], {}),
+    ("ix_comments_post_id_parent_id_created_at", "comments", ["post_id", "parent_id", "created_at", "id"], {}),
+    ("ix_comments_parent_id_created_at", "comments", ["parent_id", "created_at", "id"], {}),
+    ("ix_exchange_items_created_at_id", "exchange_items", ["created_at", "id"], {}),
+    (
+        "ix_exchange_items_available_category_created",
+        "exchange_items",
+        ["is_available", "category", "created_at", "id"],
+        {},
+    ),
+    ("ix_exchange_items_owner_id_created", "exchange_items", ["owner_id", "created_at", "id"], {}),
+    (
+        "ix_exchange_items_available_created",
+        "exchange_items",
+        ["created_at", "id"],
+        {
+            "postgresql_where": sa.text("is_available = true"),
+            "sqlite_where": sa.text("is_available = 1"),
+        },
+    ),
+]
+
+FULLTEXT_TABLES = ("posts", "exchange_items")
+
+
+def _create_sqlite_fts(table: str):
+    fts = f"{table}_fts"
+    if has_table(fts):
+        return
+    op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5(search_tokens, content='{table}', content_rowid='id')")
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, search_tokens) VALUES (new.id, new.search_tokens); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, search_tokens) VALUES ('delete', old.id, old.search_tokens); END"
+    )
+    op.execute(
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF search_tokens ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, search_tokens) VALUES ('delete', old.id, old.search_tokens); "
+        f"INSERT INTO {fts}(rowid, search_tokens) VALUES (new.id, new.search_tokens); END"
+    )
+    # 为已有的行建立索引
+    op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    for name, table, columns, kwargs in INDEXES:
+        create_index(name, table, columns, **kwargs)
+    for table in FULLTEXT_TABLES:
+        if is_postgresql():
+            create_index(
+                f"ix_{table}_search_tokens_gin",
+                table,
+                [sa.text("to_tsvector('simple', search_tokens)")],
+                postgresql_using="gin",
+            )
+        else:
+            _create_sqlite_fts(table)
+
+
+def downgrade():
+    for table in FULLTEXT_TABLES:
+        if is_postgresql():
+            drop_index(f"ix_{table}_search_tokens_gin", table)
+        else:
+            for suffix in ("ai", "ad", "au"):
+                op.execute(f"DROP TRIGGER IF EXISTS {table}_fts_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {table}_fts")
+    for name, table, _, _ in reversed(INDEXES):
+        drop_index(name, table)
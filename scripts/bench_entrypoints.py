@@ -0,0 +1,137 @@
+"""旧版根路径接口在不同入口下的吞吐对比。
+
+用法: python -m scripts.bench_entrypoints [目标 ...] [--concurrency 64] [--duration 10]
+
+目标格式为 "模块:应用[@目录]"，默认只测 app.main:app。对比原同步应用时，
+先把旧提交检出到单独目录再作为目标传入，例如：
+    git worktree add /tmp/legacy <旧提交>
+    python -m scripts.bench_entrypoints main:app@/tmp/legacy app.main:app
+每个目标以独立的 uvicorn 进程（单 worker）启动，共用同一份预先写入数据的数据库，
+压测 GET /posts/、/users/{id}、/exchanges/ 三个旧版接口，输出每秒请求数与 p50/p99 延迟。
+默认使用临时 SQLite；设置 DATABASE_URL=postgresql://... 可对 PostgreSQL 压测（会清空其中的表）。
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# 两个入口都接受同步风格的连接串
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_entrypoints.db')}")
+os.environ["COUNTER_RECONCILE_INTERVAL"] = "0"
+# 请求全部来自本机同一个 IP，关闭限流
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+from app.models import Base  # noqa: E402
+
+PATHS = ("/posts/?limit=20", "/users/1", "/exchanges/?limit=20")
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _seed():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://seed") as client:
+            await client.post("/users/", json={"username": "bench", "email": "bench@example.com", "password": "secret"})
+            for i in range(200):
+                await client.post("/posts/", json={"title": f"帖子{i}", "content": "内容" * 50, "author_id": 1})
+            for i in range(100):
+                await client.post("/exchanges/", json={"title": f"物品{i}", "description": "描述", "owner_id": 1})
+
+
+async def _wait_ready(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("服务进程启动失败")
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("服务启动超时")
+
+
+async def _load(base_url, concurrency, duration):
+    latencies = []
+    errors = 0
+    paths = itertools.cycle(PATHS)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        deadline = time.monotonic() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(next(paths))
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return len(latencies) / elapsed, statistics.median(latencies), _percentile(latencies, 99), errors
+
+
+async def _bench(target, concurrency, duration):
+    spec, _, app_dir = target.partition("@")
+    port = _free_port()
+    command = [sys.executable, "-m", "uvicorn", spec, "--port", str(port), "--log-level", "warning"]
+    if app_dir:
+        command += ["--app-dir", app_dir]
+    process = subprocess.Popen(command, cwd=app_dir or None, env=os.environ.copy())
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        await _wait_ready(base_url, process)
+        await _load(base_url, concurrency, 1)  # 预热
+        return await _load(base_url, concurrency, duration)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("targets", nargs="*", default=["app.main:app"])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args(argv)
+
+    await _seed()
+    print(f"{'target':<40} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for target in args.targets:
+        rps, p50, p99, errors = await _bench(target, args.concurrency, args.duration)
+        print(f"{target:<40} {rps:>8.1f} {p50:>8.2f} {p99:>8.2f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,228 @@
+"""实时推送的长连接容量与扇出延迟压测。
+
+用法: python -m scripts.bench_events [--connections 2000] [--protocol ws|sse] [--events 50]
+
+以独立的 uvicorn 进程（单 worker）启动应用，建立指定数量的 WebSocket 或 SSE 连接，
+全部订阅同一个帖子频道，统计：
+  - 建立连接前后服务进程的 RSS，折算每个连接的内存占用；
+  - 逐次点赞/取消点赞该帖子，每个事件从发出写请求到所有连接收到的扇出延迟 (p50/p99)
+    以及每秒送达的消息数。
+客户端与服务端在同一台机器上运行，CPU 较少时客户端本身可能成为瓶颈。
+默认使用临时 SQLite；设置 DATABASE_URL=postgresql://... 可对 PostgreSQL 压测（会清空其中的表）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_events.db')}")
+os.environ["COUNTER_RECONCILE_INTERVAL"] = "0"
+# 请求全部来自本机同一个 IP，关闭限流
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from sqlalchemy import update  # noqa: E402
+import websockets  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.utils.security import create_access_token  # noqa: E402
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_kib(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS"):
+                return int(line.split()[1])
+    return 0
+
+
+def _raise_nofile(needed):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, needed), hard))
+
+
+async def _seed():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://seed") as client:
+            for name in ("author", "liker"):
+                await client.post(
+                    "/api/v1/users/", json={"username": name, "email": f"{name}@example.com", "password": "secret"}
+                )
+            # author 读取仅管理员可见的 /api/v1/stats/events
+            async with engine.begin() as conn:
+                await conn.execute(update(User).where(User.username == "author").values(is_admin=True))
+            headers = {"Authorization": f"Bearer {create_access_token({'sub': 'author'})}"}
+            response = await client.post("/api/v1/posts/", json={"title": "压测", "content": "内容"}, headers=headers)
+            return response.json()["id"]
+
+
+async def _wait_ready(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError("服务进程启动失败")
+            try:
+                if (await client.get("/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("服务启动超时")
+
+
+class _Receiver:
+    """记录每个事件的送达次数与最后一次送达时间"""
+
+    def __init__(self):
+        self.received = {}
+        self.last_at = {}
+        self.ready = 0
+
+    def on_message(self, text):
+        message = json.loads(text)
+        if message.get("type") == "subscribed":
+            self.ready += 1
+            return
+        key = message.get("ts")
+        self.received[key] = self.received.get(key, 0) + 1
+        self.last_at[key] = time.perf_counter()
+
+
+async def _ws_client(port, query, receiver):
+    async with websockets.connect(f"ws://127.0.0.1:{port}/api/v1/events/ws?{query}", max_size=None) as ws:
+        async for text in ws:
+            receiver.on_message(text)
+
+
+async def _sse_client(port, query, receiver):
+    # 轻量 SSE 客户端：直接读 socket，避免 HTTP 客户端在大量长连接下的额外开销
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /api/v1/events/stream?{query} HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if line.startswith(b"retry:"):
+                receiver.ready += 1
+            elif line.startswith(b"data: "):
+                receiver.on_message(line[6:].decode())
+    finally:
+        writer.close()
+
+
+async def _run(args, post_id):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    receiver = _Receiver()
+    clients = []
+    try:
+        await _wait_ready(base_url, process)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            await client.get(f"/api/v1/posts/{post_id}")  # 预热
+            baseline = _rss_kib(process.pid)
+
+            token = create_access_token({"sub": "liker"})
+            query = f"token={token}&channels=post:{post_id}"
+            connect = _ws_client if args.protocol == "ws" else _sse_client
+            started = time.perf_counter()
+            # 分批建连，每批全部完成订阅后再开始下一批，避免握手排队超时
+            for offset in range(0, args.connections, 200):
+                clients.extend(
+                    asyncio.create_task(connect(port, query, receiver))
+                    for _ in range(min(200, args.connections - offset))
+                )
+                while receiver.ready < len(clients):
+                    failed = next((task for task in clients if task.done()), None)
+                    if failed is not None:
+                        raise RuntimeError(f"连接失败: {failed.exception()!r}")
+                    await asyncio.sleep(0.05)
+            connect_seconds = time.perf_counter() - started
+            await asyncio.sleep(1)
+            connected = _rss_kib(process.pid)
+
+            headers = {"Authorization": f"Bearer {token}"}
+            latencies = []
+            fanout_started = time.perf_counter()
+            for i in range(args.events):
+                sent = time.perf_counter()
+                if i % 2 == 0:
+                    await client.post(f"/api/v1/posts/{post_id}/like", headers=headers)
+                else:
+                    await client.delete(f"/api/v1/posts/{post_id}/like", headers=headers)
+                # 等待本次事件送达所有连接
+                deadline = time.monotonic() + 30
+                while time.monotonic() < deadline:
+                    done = [key for key, count in receiver.received.items() if count >= args.connections]
+                    if len(done) > i:
+                        break
+                    await asyncio.sleep(0.001)
+                else:
+                    raise RuntimeError("事件未能在 30 秒内送达所有连接")
+                latest = max(receiver.last_at.values())
+                latencies.append((latest - sent) * 1000)
+            fanout_seconds = time.perf_counter() - fanout_started
+            admin = {"Authorization": f"Bearer {create_access_token({'sub': 'author'})}"}
+            stats = (await client.get("/api/v1/stats/events", headers=admin)).json()
+    finally:
+        for task in clients:
+            task.cancel()
+        await asyncio.gather(*clients, return_exceptions=True)
+        process.terminate()
+        process.wait()
+
+    delivered = sum(receiver.received.values())
+    print(f"protocol: {args.protocol}, connections: {args.connections}, events: {args.events}")
+    print(f"建立连接      {connect_seconds:.1f}s")
+    print(f"服务端 RSS    {baseline / 1024:.1f} MiB -> {connected / 1024:.1f} MiB，"
+          f"每连接约 {(connected - baseline) / args.connections:.1f} KiB")
+    print(f"扇出延迟      p50 {statistics.median(latencies):.1f} ms  p99 {_percentile(latencies, 99):.1f} ms")
+    print(f"送达          {delivered} 条，{delivered / fanout_seconds:.0f} 条/秒")
+    print(f"服务端统计    {stats}")
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--protocol", choices=("ws", "sse"), default="ws")
+    parser.add_argument("--events", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    _raise_nofile(args.connections * 2 + 256)
+    post_id = await _seed()
+    await _run(args, post_id)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
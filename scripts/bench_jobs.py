@@ -0,0 +1,184 @@
+"""后台任务队列的基准与行为核对。
+
+用法: python -m scripts.bench_jobs [--jobs 2000] [--followers 5000] [--concurrency 16]
+
+统计：
+  - dispatch 登记一个任务的耗时（写入 jobs 表的短事务）；
+  - 单个 worker 执行空任务的吞吐（jobs/s），以及 high 队列在 low 队列积压时的等待时间；
+  - create_post 在作者有 followers 个粉丝时，就地写扩散与交给队列两种方式的请求耗时。
+并核对：同一幂等键只登记一次、失败任务按退避重试后成功、超过最大次数后标记为 failed。
+默认使用临时 SQLite；设置 DATABASE_URL=postgresql://... 可对 PostgreSQL 测试（会清空其中的表）。
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_jobs.db')}")
+
+from sqlalchemy import delete, func, insert, select, update  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import async_session, engine  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.models.follow import Follow  # noqa: E402
+from app.models.job import Job  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.post import PostCreate  # noqa: E402
+from app.services import post_service  # noqa: E402
+from app.utils.jobs import Worker, dispatch, job_handler  # noqa: E402
+
+_finished = {}
+_flaky_calls = {}
+
+
+@job_handler("bench.noop")
+async def _noop(db, n: int):
+    _finished[n] = time.perf_counter()
+
+
+@job_handler("bench.flaky")
+async def _flaky(db, n: int, fail_times: int):
+    _flaky_calls[n] = _flaky_calls.get(n, 0) + 1
+    if _flaky_calls[n] <= fail_times:
+        raise RuntimeError(f"第 {_flaky_calls[n]} 次故意失败")
+
+
+async def _seed(followers: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"username": f"u{i}", "email": f"u{i}@example.com", "hashed_password": "x"}
+            for i in range(followers + 1)
+        ])
+        await conn.execute(insert(Follow), [
+            {"follower_id": i, "followee_id": 1} for i in range(2, followers + 2)
+        ])
+        await conn.execute(update(User).where(User.id == 1).values(followers_count=followers))
+
+
+async def _clear_jobs():
+    async with async_session() as db:
+        await db.execute(delete(Job))
+        await db.commit()
+
+
+async def _drain(worker: Worker, until, timeout: float = 120):
+    task = asyncio.create_task(worker.run())
+    deadline = time.perf_counter() + timeout
+    while not until() and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    worker.stop()
+    await task
+
+
+def _ms(samples):
+    return statistics.median(samples) * 1000, statistics.quantiles(samples, n=100)[98] * 1000
+
+
+async def _bench_dispatch(jobs: int, concurrency: int):
+    samples = []
+    for n in range(jobs):
+        async with async_session() as db:
+            start = time.perf_counter()
+            await dispatch(db, _noop, {"n": n}, lane="low")
+            samples.append(time.perf_counter() - start)
+    p50, p99 = _ms(samples)
+    print(f"dispatch          p50 {p50:.2f}ms  p99 {p99:.2f}ms")
+
+    # low 队列积压时插入一个 high 任务，看它要等多久才被执行
+    async with async_session() as db:
+        urgent_at = time.perf_counter()
+        await dispatch(db, _noop, {"n": -1}, lane="high")
+    worker = Worker(concurrency=concurrency, poll_interval=0.05)
+    start = time.perf_counter()
+    await _drain(worker, lambda: len(_finished) > jobs)
+    elapsed = time.perf_counter() - start
+    print(f"worker 吞吐       {worker.succeeded / elapsed:.0f} jobs/s（{worker.succeeded} 个空任务，并发 {concurrency}）")
+    print(f"high 队列等待     {(_finished[-1] - urgent_at) * 1000:.1f}ms（low 队列积压 {jobs} 个）")
+    return worker.succeeded == jobs + 1
+
+
+async def _bench_create_post(followers: int, rounds: int):
+    results = {}
+    for label, enabled in (("就地写扩散", False), ("交给队列", True)):
+        settings.JOBS_ENABLED = enabled
+        samples = []
+        for i in range(rounds):
+            async with async_session() as db:
+                start = time.perf_counter()
+                await post_service.create_post(db, PostCreate(title=f"t{i}", content="c"), author_id=1)
+                samples.append(time.perf_counter() - start)
+        results[label] = _ms(samples)
+        print(f"create_post {label}  p50 {results[label][0]:.2f}ms  p99 {results[label][1]:.2f}ms（{followers} 个粉丝）")
+    settings.JOBS_ENABLED = True
+    await _clear_jobs()
+
+
+async def _check_idempotency() -> bool:
+    async with async_session() as db:
+        for _ in range(3):
+            await dispatch(db, _noop, {"n": 0}, key="bench:dedupe")
+        count = await db.scalar(select(func.count()).select_from(Job).where(Job.idempotency_key == "bench:dedupe"))
+    ok = count == 1
+    print(f"{'OK  ' if ok else 'FAIL'} 同一幂等键登记 3 次，jobs 表中 {count} 条")
+    await _clear_jobs()
+    return ok
+
+
+async def _check_retry() -> bool:
+    settings.JOBS_BACKOFF_BASE = 0.05
+    async with async_session() as db:
+        await dispatch(db, _flaky, {"n": 1, "fail_times": 2})
+        await dispatch(db, _flaky, {"n": 2, "fail_times": 99})
+    worker = Worker(concurrency=4, poll_interval=0.02)
+
+    async def settled():
+        async with async_session() as db:
+            return await db.scalar(select(func.count()).select_from(Job).where(Job.status.in_(("done", "failed"))))
+
+    task = asyncio.create_task(worker.run())
+    deadline = time.perf_counter() + 30
+    while await settled() < 2 and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    worker.stop()
+    await task
+    async with async_session() as db:
+        rows = {job.payload: job for job in (await db.execute(select(Job))).scalars()}
+    recovered = next(job for payload, job in rows.items() if '"n": 1' in payload)
+    exhausted = next(job for payload, job in rows.items() if '"n": 2' in payload)
+    ok = recovered.status == "done" and recovered.attempts == 3
+    print(f"{'OK  ' if ok else 'FAIL'} 失败 2 次的任务第 {recovered.attempts} 次执行后状态 {recovered.status}")
+    ok2 = exhausted.status == "failed" and exhausted.attempts == settings.JOBS_MAX_ATTEMPTS and exhausted.last_error
+    print(f"{'OK  ' if ok2 else 'FAIL'} 一直失败的任务执行 {exhausted.attempts} 次后状态 {exhausted.status}")
+    await _clear_jobs()
+    return ok and bool(ok2)
+
+
+async def run(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--followers", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    # 写扩散要全部走数据库遍历粉丝，不走大 V 的跳过分支
+    settings.FEED_FANOUT_THRESHOLD = max(settings.FEED_FANOUT_THRESHOLD, args.followers)
+    await _seed(args.followers)
+    print(f"dialect: {engine.dialect.name}")
+    await _bench_create_post(args.followers, args.rounds)
+    failed = not await _bench_dispatch(args.jobs, args.concurrency)
+    await _clear_jobs()
+    failed |= not await _check_idempotency()
+    failed |= not await _check_retry()
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
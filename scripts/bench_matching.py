@@ -0,0 +1,159 @@
+"""以物易物匹配引擎压测：10 万条在架物品下的索引构建与匹配延迟。
+
+用法: python -m scripts.bench_matching [--items 100000] [--users 20000] [--samples 1000]
+
+写入一批物品与求购意向后，统计：
+  - 从数据库全量加载匹配索引的耗时与进程 RSS 增量；
+  - 对随机用户计算交换环（纯内存）、不限条数时的完整三方搜索，以及 find_matches（含一次可交换状态校验查询）的 p50/p99；
+  - 增量更新索引（上架/下架一件物品）的单次耗时。
+默认使用临时 SQLite；设置 DATABASE_URL=postgresql://... 可对 PostgreSQL 压测（会清空其中的表）。
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_matching.db')}")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import async_session, engine  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.models.exchange_item import ExchangeItem  # noqa: E402
+from app.models.exchange_want import ExchangeWant  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services import match_service  # noqa: E402
+
+CATALOG = {
+    "书籍": ["高等数学", "线性代数", "大学英语", "考研真题", "小说", "编程入门", "托福词汇", "专业课笔记"],
+    "电子产品": ["耳机", "键盘", "鼠标", "显示器", "平板", "充电宝", "移动硬盘", "路由器"],
+    "衣物": ["羽绒服", "卫衣", "运动鞋", "牛仔裤", "毛衣", "西装", "围巾", "雨衣"],
+    "运动器材": ["羽毛球拍", "篮球", "瑜伽垫", "哑铃", "跳绳", "乒乓球拍", "足球", "护膝"],
+    "生活用品": ["台灯", "收纳箱", "电风扇", "晾衣架", "保温杯", "床垫", "插线板", "雨伞"],
+    "文具": ["钢笔", "计算器", "笔记本", "绘图板", "荧光笔", "文件夹", "尺子", "书立"],
+    "乐器": ["吉他", "尤克里里", "电子琴", "口琴", "小提琴", "竹笛", "架子鼓", "节拍器"],
+    "自行车": ["山地自行车", "公路自行车", "折叠自行车", "车锁", "头盔", "车灯", "打气筒", "车筐"],
+    "化妆品": ["口红", "粉底", "面膜", "香水", "眼影", "防晒霜", "卸妆水", "护手霜"],
+    "其他": ["电影票", "健身卡", "绿植", "手办", "拼图", "桌游", "相机", "行李箱"],
+}
+MODIFIERS = ["二手", "全新", "九成新", "闲置", "毕业甩卖", "几乎没用", "入门款", "专业款"]
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _rss_mib():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def _seed(items, users, rng):
+    categories = list(CATALOG)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        for offset in range(0, users, 5000):
+            await conn.execute(insert(User), [
+                {"username": f"u{i}", "email": f"u{i}@example.com", "hashed_password": "x"}
+                for i in range(offset, min(users, offset + 5000))
+            ])
+        for offset in range(0, items, 5000):
+            rows = []
+            for _ in range(offset, min(items, offset + 5000)):
+                category = rng.choice(categories)
+                rows.append({
+                    "owner_id": rng.randint(1, users),
+                    "title": f"{rng.choice(MODIFIERS)}{rng.choice(CATALOG[category])}",
+                    "category": category,
+                    "is_available": rng.random() < 0.8,
+                })
+            await conn.execute(insert(ExchangeItem), rows)
+        # 每个用户 1~2 条求购意向，大多按物品名，少数只限类别
+        wants = []
+        for user_id in range(1, users + 1):
+            for _ in range(rng.randint(1, 2)):
+                category = rng.choice(categories)
+                if rng.random() < 0.1:
+                    wants.append({"user_id": user_id, "category": category, "keywords": None})
+                else:
+                    wants.append({"user_id": user_id, "category": None, "keywords": rng.choice(CATALOG[category])})
+        for offset in range(0, len(wants), 5000):
+            await conn.execute(insert(ExchangeWant), wants[offset:offset + 5000])
+
+
+async def run(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--samples", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    await _seed(args.items, args.users, rng)
+
+    gc.collect()
+    rss = _rss_mib()
+    started = time.perf_counter()
+    async with async_session() as db:
+        index = await match_service.load_match_index(db)
+    load_seconds = time.perf_counter() - started
+    gc.collect()
+    print(f"dialect: {engine.dialect.name}, items: {args.items}, users: {args.users}")
+    print(f"加载索引      {load_seconds:.2f}s，RSS +{_rss_mib() - rss:.0f} MiB，{index.stats()}")
+
+    users = [rng.randint(1, args.users) for _ in range(args.samples)]
+    latencies, found = [], 0
+    for user_id in users:
+        started = time.perf_counter()
+        cycles = index.propose(user_id, 20, settings.MATCH_FANOUT)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += bool(cycles)
+    print(f"交换环(内存)  p50 {statistics.median(latencies):.2f} ms  p99 {_percentile(latencies, 99):.2f} ms  "
+          f"max {max(latencies):.2f} ms，{found}/{len(users)} 个用户有匹配")
+
+    # 不限条数时直接互换填不满，三方轮换搜索走满 fanout x fanout 的上界
+    latencies, three_way = [], 0
+    for user_id in users[:200]:
+        started = time.perf_counter()
+        cycles = index.propose(user_id, 10 ** 6, settings.MATCH_FANOUT)
+        latencies.append((time.perf_counter() - started) * 1000)
+        three_way += sum(len(cycle) == 3 for cycle in cycles)
+    print(f"完整三方搜索  p50 {statistics.median(latencies):.2f} ms  p99 {_percentile(latencies, 99):.2f} ms，"
+          f"共 {three_way} 个三方轮换")
+
+    latencies, sizes = [], {2: 0, 3: 0}
+    async with async_session() as db:
+        for user_id in users[:200]:
+            started = time.perf_counter()
+            matches = await match_service.find_matches(db, user_id)
+            latencies.append((time.perf_counter() - started) * 1000)
+            for match in matches:
+                sizes[match.size] += 1
+    print(f"find_matches  p50 {statistics.median(latencies):.2f} ms  p99 {_percentile(latencies, 99):.2f} ms，"
+          f"直接互换 {sizes[2]} / 三方轮换 {sizes[3]}")
+
+    item_ids = rng.sample(list(index.items), min(10000, len(index.items)))
+    started = time.perf_counter()
+    for item_id in item_ids:
+        item = index.items[item_id]
+        index.remove_item(item_id)
+        index.add_item(item)
+    per_update = (time.perf_counter() - started) / (2 * len(item_ids)) * 1e6
+    print(f"增量更新      {per_update:.1f} µs/次")
+    await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
@@ -0,0 +1,92 @@
+"""注册高峰期间 GET /posts/ 的延迟基准。
+
+用法: python -m scripts.bench_registration [--registrations 40] [--reads 200]
+分别以“事件循环内同步哈希”（旧实现）与“线程池哈希”两种方式运行，
+输出读请求的 p50/p99 延迟。使用临时 SQLite 数据库（需要 aiosqlite）。
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench_registration.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file}"
+# 基准本身不应被退避逻辑拒绝
+os.environ.setdefault("PASSWORD_HASH_QUEUE", "1000")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+from app.services import user_service  # noqa: E402
+from app.utils import security  # noqa: E402
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _sqlite_wal(dbapi_connection, connection_record):
+    # 并发注册写入时避免 SQLite 读写锁冲突
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+
+async def _inline_hash(password: str):
+    return security.hash_password(password)
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _run(mode: str, registrations: int, reads: int, offset: int):
+    user_service.hash_password_async = _inline_hash if mode == "inline" else security.hash_password_async
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = {"Authorization": f"Bearer {security.create_access_token({'sub': 'reader'})}"}
+        latencies = []
+
+        async def register(i):
+            await client.post("/api/v1/users/", json={
+                "username": f"{mode}{offset + i}", "email": f"{mode}{offset + i}@example.com", "password": "secret"})
+
+        async def read():
+            for _ in range(reads):
+                start = time.perf_counter()
+                await client.get("/api/v1/posts/?limit=20", headers=headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(read(), *(register(i) for i in range(registrations)))
+    return statistics.median(latencies), _percentile(latencies, 99)
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--registrations", type=int, default=40)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.post("/api/v1/users/", json={
+                "username": "reader", "email": "reader@example.com", "password": "secret"})
+            headers = {"Authorization": f"Bearer {security.create_access_token({'sub': 'reader'})}"}
+            for i in range(20):
+                await client.post("/api/v1/posts/", json={"title": f"t{i}", "content": "c"}, headers=headers)
+
+        print(f"{'mode':<8} {'p50 ms':>8} {'p99 ms':>8}")
+        for offset, mode in enumerate(("inline", "pool")):
+            p50, p99 = await _run(mode, args.registrations, args.reads, offset * args.registrations)
+            print(f"{mode:<8} {p50:>8.2f} {p99:>8.2f}")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,101 @@
+"""全文检索基准：FTS 索引查询 vs ILIKE 全表扫描。
+
+用法: python -m scripts.bench_search [--rows 1000000] [--database-url URL]
+默认使用临时 SQLite 数据库（需要 aiosqlite）；传入 postgresql+asyncpg:// 地址可测 GIN 索引。
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+_parser = argparse.ArgumentParser()
+_parser.add_argument("--rows", type=int, default=100000)
+_parser.add_argument("--database-url")
+_parser.add_argument("--queries", type=int, default=20)
+_args = _parser.parse_args()
+os.environ["DATABASE_URL"] = _args.database_url or "sqlite+aiosqlite:///" + os.path.join(
+    tempfile.mkdtemp(), "bench_search.db")
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.database import async_session, engine  # noqa: E402
+from app.models import Base, Post, User  # noqa: E402
+from app.services.search_service import search  # noqa: E402
+from app.utils.text_search import search_document  # noqa: E402
+
+# 随机生成的双字/三字词表，按 Zipf 分布抽样，模拟真实语料中少数高频词、大量低频词
+_vocab_rng = random.Random(7)
+WORDS = list(dict.fromkeys(
+    "".join(chr(_vocab_rng.randint(0x4e00, 0x9fa5)) for _ in range(_vocab_rng.choice((2, 3))))
+    for _ in range(20000)
+))
+_CUM_WEIGHTS = []
+_total = 0.0
+for _rank in range(len(WORDS)):
+    _total += 1.0 / (_rank + 1)
+    _CUM_WEIGHTS.append(_total)
+# 不同词频的查询词：高频 / 中频 / 低频 / 两词组合
+QUERIES = [WORDS[3], WORDS[300], WORDS[5000], WORDS[15000], f"{WORDS[50]} {WORDS[800]}"]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    picked = rng.choices(WORDS, cum_weights=_CUM_WEIGHTS, k=words)
+    return "".join(word + ("" if rng.random() < 0.6 else " ") for word in picked)
+
+
+async def _seed(rows: int):
+    rng = random.Random(42)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"id": 1, "username": "bench", "email": "bench@example.com",
+                                           "hashed_password": "x"}])
+    chunk = 10000
+    for start in range(0, rows, chunk):
+        batch = []
+        for _ in range(min(chunk, rows - start)):
+            title = _sentence(rng, 3)
+            content = _sentence(rng, 12)
+            batch.append({"title": title, "content": content, "author_id": 1,
+                          "search_tokens": search_document(title, content)})
+        async with engine.begin() as conn:
+            await conn.execute(insert(Post), batch)
+
+
+async def _timed(func, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+async def main():
+    start = time.perf_counter()
+    await _seed(_args.rows)
+    print(f"seeded {_args.rows} posts in {time.perf_counter() - start:.1f}s")
+    print(f"{'query':<16} {'matches':>8} {'fts ms':>10} {'ilike ms':>10}")
+    async with async_session() as db:
+        for q in QUERIES:
+            async def fts():
+                await search(db, "posts", q, limit=20)
+
+            async def ilike():
+                terms = [Post.content.ilike(f"%{term}%") | Post.title.ilike(f"%{term}%") for term in q.split()]
+                stmt = select(Post.id, Post.title).where(*terms).order_by(Post.created_at.desc()).limit(20)
+                await db.execute(stmt)
+
+            fts_ms = await _timed(fts, _args.queries)
+            ilike_ms = await _timed(ilike, max(1, _args.queries // 4))
+            matches = len(await search(db, "posts", q, limit=_args.rows))
+            print(f"{q:<16} {matches:>8} {fts_ms:>10.2f} {ilike_ms:>10.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,136 @@
+"""列表接口序列化开销的微基准：逐个接口对比 ORM 路径与快速路径。
+
+用法: python -m scripts.bench_serialization [--limit 100] [--rounds 200]
+
+对 /api/v1/posts/、/api/v1/exchanges/、/api/v1/users/ 的一页数据，分阶段统计中位耗时：
+  - 取数：服务函数查询（ORM 对象 + 预加载关系，或列投影字典）；
+  - 校验：TypeAdapter.validate_python（from_attributes）；
+  - 编码：FastAPI response_model 的做法（dump_python(mode="json") 后由响应类编码，
+    分别用标准库 json 与 orjson），以及响应缓存使用的 TypeAdapter.dump_json。
+同时核对两条路径输出的 JSON 内容一致。不经过 HTTP，只测服务层与序列化本身；
+默认使用临时 SQLite；设置 DATABASE_URL=postgresql://... 可对 PostgreSQL 测试（会清空其中的表）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_serialization.db')}")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import async_session, engine  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.models.exchange_item import ExchangeItem  # noqa: E402
+from app.models.image import ExchangeItemImage, Image, PostImage  # noqa: E402
+from app.models.post import Post  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.exchange_item import ExchangeItemSummary  # noqa: E402
+from app.schemas.post import PostSummary  # noqa: E402
+from app.schemas.user import UserResponse  # noqa: E402
+from app.services import exchange_service, post_service, user_service  # noqa: E402
+from app.utils.fast_json import FastJSONResponse, orjson  # noqa: E402
+
+ENDPOINTS = [
+    ("GET /posts/", List[PostSummary], post_service.get_posts, post_service.get_post_summaries),
+    ("GET /exchanges/", List[ExchangeItemSummary], exchange_service.get_exchange_items,
+     exchange_service.get_exchange_summaries),
+    ("GET /users/", List[UserResponse], user_service.get_users, user_service.get_user_profiles),
+]
+
+
+async def _seed(rng: random.Random, rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"username": f"u{i}", "email": f"u{i}@example.com", "hashed_password": "x",
+             "full_name": f"用户{i}", "bio": "校园二手交易爱好者"}
+            for i in range(rows)
+        ])
+        await conn.execute(insert(Image), [
+            {"sha256": f"{i:064x}", "uploader_id": 1, "content_type": "image/webp", "size": 1, "width": 1,
+             "height": 1, "original_key": f"{i}/orig", "display_key": f"{i}/display.webp",
+             "thumbnail_key": f"{i}/thumb.webp"}
+            for i in range(rows)
+        ])
+        await conn.execute(insert(Post), [
+            {"title": f"帖子标题{i}", "content": "今天在图书馆捡到一本高等数学，失主请联系。" * 5,
+             "author_id": rng.randint(1, rows), "likes_count": rng.randint(0, 50), "comments_count": 0}
+            for i in range(rows)
+        ])
+        await conn.execute(insert(ExchangeItem), [
+            {"title": f"九成新物品{i}", "description": "自用闲置，可小刀。", "category": "书籍",
+             "condition": "良好", "owner_id": rng.randint(1, rows), "is_available": True}
+            for i in range(rows)
+        ])
+        # 每个帖子/物品 0~3 张图
+        for link_model, fk in ((PostImage, "post_id"), (ExchangeItemImage, "exchange_item_id")):
+            links = []
+            for owner_id in range(1, rows + 1):
+                for position, image_id in enumerate(rng.sample(range(1, rows + 1), rng.randint(0, 3))):
+                    links.append({fk: owner_id, "image_id": image_id, "position": position})
+            await conn.execute(insert(link_model), links)
+
+
+def _median_ms(func, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+async def _median_fetch_ms(fetch, limit: int, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        async with async_session() as db:
+            start = time.perf_counter()
+            rows = await fetch(db, limit=limit)
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), rows
+
+
+async def run(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    await _seed(random.Random(0), args.rows)
+    print(f"dialect: {engine.dialect.name}, 每页 {args.limit} 条, orjson: {'已安装' if orjson else '未安装'}")
+    print(f"{'接口':<16} {'取数':>9} {'校验':>9} {'json':>9} {'orjson':>9} {'dump_json':>10} {'合计':>9}  路径")
+    failed = False
+    for label, schema, orm_fetch, projected_fetch in ENDPOINTS:
+        adapter = TypeAdapter(schema)
+        bodies = []
+        for path, fetch in (("ORM", orm_fetch), ("列投影", projected_fetch)):
+            fetch_ms, rows = await _median_fetch_ms(fetch, args.limit, args.rounds)
+            validate_ms, value = _median_ms(lambda: adapter.validate_python(rows, from_attributes=True), args.rounds)
+            json_ms, _ = _median_ms(lambda: JSONResponse(adapter.dump_python(value, mode="json")).body, args.rounds)
+            orjson_ms, _ = _median_ms(
+                lambda: FastJSONResponse(adapter.dump_python(value, mode="json")).body, args.rounds)
+            dump_ms, body = _median_ms(lambda: adapter.dump_json(value), args.rounds)
+            total = fetch_ms + validate_ms + min(orjson_ms, dump_ms)
+            print(f"{label:<16} {fetch_ms:>7.2f}ms {validate_ms:>7.2f}ms {json_ms:>7.2f}ms {orjson_ms:>7.2f}ms "
+                  f"{dump_ms:>8.2f}ms {total:>7.2f}ms  {path}")
+            bodies.append(body)
+        if json.loads(bodies[0]) != json.loads(bodies[1]):
+            print(f"FAIL {label}: 列投影与 ORM 路径的输出不一致")
+            failed = True
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
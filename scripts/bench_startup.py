@@ -0,0 +1,107 @@
+"""冷启动耗时：对比启动时 create_all 与只核对迁移版本（DB_SCHEMA_MODE=create / verify）。
+
+用法: python -m scripts.bench_startup [--rounds 10]
+
+先用 alembic upgrade head 把数据库迁移到最新（记录全新数据库的迁移耗时），再分别以两种模式
+启动 rounds 个新进程，统计中位耗时：
+  - 导入：import app.main；
+  - 启动：lifespan 启动阶段（表结构处理 + 后台任务），及其中执行的 SQL 条数；
+  - 进程：从启动子进程到应用就绪的总耗时。
+SQL 条数在远程数据库上直接决定启动耗时（每条一次网络往返）。verify 模式下数据库未迁移到最新时应拒绝启动，
+脚本同时核对这一点。默认使用临时 SQLite；设置 DATABASE_URL=postgresql://... 可对 PostgreSQL 测试（会清空其中的表）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_startup.db')}")
+
+
+async def _child():
+    start = time.perf_counter()
+    from sqlalchemy import event
+
+    from app.database import engine
+    from app.main import app, lifespan
+    imported = time.perf_counter()
+    statements = []
+    event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    async with lifespan(app):
+        ready = time.perf_counter()
+    print(json.dumps({
+        "import": imported - start,
+        "startup": ready - imported,
+        "statements": len(statements),
+    }))
+
+
+def _alembic(*args) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "alembic", *args], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def _boot(mode: str):
+    env = dict(os.environ, DB_SCHEMA_MODE=mode)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "scripts.bench_startup", "--child"], env=env, capture_output=True, text=True
+    )
+    total = time.perf_counter() - start
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    return dict(json.loads(result.stdout.strip().splitlines()[-1]), total=total), None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        asyncio.run(_child())
+        return 0
+
+    # 放在这里导入，子进程不加载 alembic，不影响导入耗时
+    from alembic.script import ScriptDirectory
+
+    from app.database import MIGRATIONS_DIR, migration_heads
+
+    heads = set(ScriptDirectory(MIGRATIONS_DIR).get_heads())
+    ok = migration_heads() == heads
+    print(f"{'OK  ' if ok else 'FAIL'} 启动时读取的最新版本 {sorted(migration_heads())} 与 alembic heads {sorted(heads)} 一致")
+    failed = not ok
+
+    _alembic("downgrade", "base")
+    print(f"全新数据库 alembic upgrade head: {_alembic('upgrade', 'head') * 1000:.0f}ms（含进程启动）")
+    print(f"{'模式':<8} {'导入':>9} {'启动':>9} {'SQL':>5} {'进程':>9}")
+    for mode in ("create", "verify"):
+        runs = []
+        for _ in range(args.rounds):
+            run, error = _boot(mode)
+            if run is None:
+                print(f"FAIL {mode} 模式启动失败: {error}")
+                return 1
+            runs.append(run)
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{mode:<8} {median['import'] * 1000:>7.0f}ms {median['startup'] * 1000:>7.1f}ms "
+              f"{median['statements']:>5.0f} {median['total'] * 1000:>7.0f}ms")
+
+    # 回退一个版本后 verify 模式应拒绝启动
+    _alembic("downgrade", "-1")
+    run, error = _boot("verify")
+    ok = run is None and "alembic upgrade head" in error
+    print(f"{'OK  ' if ok else 'FAIL'} 数据库落后于代码时 verify 模式拒绝启动")
+    failed |= not ok
+    _alembic("upgrade", "head")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""多 worker 扩展性：python -m app.server 以 1 到 N 个 worker 运行时的吞吐、延迟与内存，以及退出时是否排空请求。
+
+用法: python -m scripts.bench_workers [--workers 1,2,4] [--clients 2] [--concurrency 16] [--duration 15]
+                                      [--warmup 3] [--scale 10k]
+
+对每个 worker 数启动一次 python -m app.server，由 --clients 个 scripts.loadtest 进程（browse 配比，只读）
+并发压测，汇总总 RPS、各客户端 p50/p95 的最大值，并给出相对 1 个 worker 的加速比与效率 rps(N) / (N × rps(1))。
+压测结束时从 /proc 读取主进程与各 worker 的 PSS（共享页按进程数分摊）和私有内存；最大的 worker 数再以
+--no-preload 运行一次，对比预加载后写时复制共享的内存。最后在导出请求进行中向主进程发送 SIGTERM，
+检查这些请求都完整返回、主进程以 0 退出。
+
+默认 worker 数为 1、2、4… 直到本机可用的 CPU 数。压测客户端与服务端在同一台机器上争抢 CPU，worker 数
+接近核数时吞吐会被客户端限制，准确的扩展曲线应在另一台机器上压测（scripts.loadtest --target http://...）。
+压测只读，服务以 --allow-unshared-state 启动，不要求 Redis。
+未设置 DATABASE_URL 时使用临时 SQLite 并生成 --scale 的数据；设置了 DATABASE_URL 时只有给出 --scale 才重新生成
+（会清空其中的表）。SQLite 的写锁会限制多进程，PostgreSQL 上的结果更接近生产。
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 请求全部来自本机同一个 IP，关闭限流
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("MEDIA_ROOT", tempfile.mkdtemp())
+_temp_db = "DATABASE_URL" not in os.environ
+if _temp_db:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.models.post import Post  # noqa: E402
+from app.server import cpu_limit  # noqa: E402
+from app.utils.security import create_access_token  # noqa: E402
+from scripts.seed_data import parse_scale, seed  # noqa: E402
+
+DRAIN_REQUESTS = 8
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _default_workers() -> List[int]:
+    limit = cpu_limit()
+    counts = [1]
+    while counts[-1] * 2 < limit:
+        counts.append(counts[-1] * 2)
+    return counts + [limit] if limit > 1 else counts
+
+
+def start_server(workers: int, preload: bool = True) -> Tuple[subprocess.Popen, str]:
+    port = _free_port()
+    command = [sys.executable, "-m", "app.server", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--no-access-log", "--allow-unshared-state"]
+    if not preload:
+        command.append("--no-preload")
+    process = subprocess.Popen(command, env=dict(os.environ), stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + 60
+    with httpx.Client(base_url=url) as client:
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise SystemExit(f"app.server 已退出，状态 {process.returncode}")
+            try:
+                if client.get("/").status_code == 200:
+                    return process, url
+            except httpx.TransportError:
+                pass
+            time.sleep(0.2)
+    process.kill()
+    raise SystemExit("等待 app.server 启动超时")
+
+
+def stop_server(process: subprocess.Popen) -> int:
+    process.send_signal(signal.SIGTERM)
+    return process.wait(timeout=settings.GRACEFUL_TIMEOUT + 15)
+
+
+def _children(pid: int) -> List[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # 第 4 个字段为父进程号；进程名在括号中，可能含空格
+                ppid = int(f.read().rpartition(")")[2].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def _smaps(pid: int) -> Dict[str, int]:
+    """/proc/<pid>/smaps_rollup 中的各项（kB）"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if rest.strip().endswith("kB"):
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values
+
+
+def memory(master: int) -> Optional[dict]:
+    """主进程与各 worker 的 PSS 总和、每个 worker 的平均私有内存（MB）"""
+    workers = [_smaps(pid) for pid in _children(master)]
+    processes = [_smaps(master)] + workers
+    if not all(processes):
+        return None
+    private = [m.get("Private_Clean", 0) + m.get("Private_Dirty", 0) for m in workers]
+    return {
+        "pss_mb": round(sum(m.get("Pss", 0) for m in processes) / 1024, 1),
+        "private_mb": round(sum(private) / max(1, len(private)) / 1024, 1),
+    }
+
+
+def run_clients(url: str, workers: int, args) -> dict:
+    """并发运行 --clients 个 scripts.loadtest 进程，汇总它们的结果"""
+    directory = tempfile.mkdtemp()
+    processes = []
+    for i in range(args.clients):
+        path = os.path.join(directory, f"client{i}.json")
+        command = [sys.executable, "-m", "scripts.loadtest", "--target", url, "--mix", "browse",
+                   "--concurrency", str(args.concurrency), "--duration", str(args.duration),
+                   "--warmup", str(args.warmup), "--workers", str(workers), "--seed", str(i), "--save", path]
+        processes.append((path, subprocess.Popen(command, env=dict(os.environ), stdout=subprocess.DEVNULL)))
+    summaries = []
+    for path, process in processes:
+        process.wait()
+        with open(path, encoding="utf-8") as f:
+            summaries.append(json.load(f)["summary"])
+    return {
+        "rps": round(sum(s["rps"] for s in summaries), 1),
+        "p50_ms": max(s["p50_ms"] or 0 for s in summaries),
+        "p95_ms": max(s["p95_ms"] or 0 for s in summaries),
+        "errors": sum(route["errors"] for s in summaries for route in s["routes"].values()),
+    }
+
+
+def bench(workers: int, args, preload: bool = True) -> dict:
+    process, url = start_server(workers, preload)
+    try:
+        result = run_clients(url, workers, args)
+        result["memory"] = memory(process.pid)
+    finally:
+        result_code = stop_server(process)
+    result["exit_code"] = result_code
+    return result
+
+
+async def _posts_count() -> int:
+    async with engine.connect() as conn:
+        return (await conn.execute(select(func.count()).select_from(Post))).scalar_one()
+
+
+async def drain_check(workers: int) -> List[str]:
+    """导出进行中发送 SIGTERM：已开始的请求应完整返回，主进程以 0 退出"""
+    expected = await _posts_count()
+    process, url = start_server(workers)
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'u1'})}"}
+    started = [asyncio.Event() for _ in range(DRAIN_REQUESTS)]
+
+    async def export(client: httpx.AsyncClient, i: int):
+        lines = 0
+        async with client.stream("GET", "/api/v1/admin/export/posts", headers=headers) as response:
+            async for chunk in response.aiter_bytes():
+                started[i].set()
+                lines += chunk.count(b"\n")
+        started[i].set()
+        return response.status_code, lines
+
+    limits = httpx.Limits(max_connections=DRAIN_REQUESTS)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        tasks = [asyncio.create_task(export(client, i)) for i in range(DRAIN_REQUESTS)]
+        await asyncio.gather(*(event.wait() for event in started))
+        in_flight = sum(not task.done() for task in tasks)
+        process.send_signal(signal.SIGTERM)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    code = process.wait(timeout=settings.GRACEFUL_TIMEOUT + 15)
+
+    failures = []
+    for i, result in enumerate(results):
+        if isinstance(result, BaseException):
+            failures.append(f"导出请求 {i} 中断：{result!r}")
+        elif result != (200, expected):
+            failures.append(f"导出请求 {i} 返回 {result[0]}，{result[1]} 行（应为 {expected} 行）")
+    if code != 0:
+        failures.append(f"主进程退出码 {code}")
+    print(f"排空检查：SIGTERM 时 {in_flight}/{DRAIN_REQUESTS} 个导出请求进行中，主进程退出码 {code}")
+    return failures
+
+
+def _format_memory(value: Optional[dict]) -> str:
+    return f"{value['pss_mb']:>8.1f}MB {value['private_mb']:>8.1f}MB" if value else f"{'-':>10} {'-':>10}"
+
+
+async def run(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", help="逗号分隔的 worker 数，默认 1、2、4… 直到可用 CPU 数")
+    parser.add_argument("--clients", type=int, default=2, help="压测客户端进程数")
+    parser.add_argument("--concurrency", type=int, default=16, help="每个客户端的并发数")
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--scale", help="重新生成数据：10k / 1m / 10m，或直接给出帖子数")
+    args = parser.parse_args(argv)
+    counts = [int(n) for n in args.workers.split(",")] if args.workers else _default_workers()
+
+    scale = args.scale or ("10k" if _temp_db else None)
+    if scale:
+        start = time.perf_counter()
+        rows = await seed(parse_scale(scale), 0)
+        print(f"生成数据 {sum(rows.values())} 行，用时 {time.perf_counter() - start:.1f}s")
+    await engine.dispose()
+
+    print(f"{engine.dialect.name}，可用 CPU {cpu_limit()}，{args.clients} 个客户端 × 并发 {args.concurrency}，"
+          f"每轮 {args.duration}s")
+    print(f"{'worker':>6} {'RPS':>9} {'加速比':>6} {'效率':>6} {'p50':>8} {'p95':>8} {'错误':>5} "
+          f"{'PSS 总计':>10} {'worker 私有':>10}")
+    failures = []
+    results = {}
+    for workers in counts:
+        result = results[workers] = bench(workers, args)
+        first = results[counts[0]]["rps"]
+        speedup = result["rps"] / first if first else 0
+        efficiency = speedup * counts[0] / workers
+        print(f"{workers:>6} {result['rps']:>9.1f} {speedup:>7.2f}x {efficiency:>7.0%} {result['p50_ms']:>6.1f}ms "
+              f"{result['p95_ms']:>6.1f}ms {result['errors']:>5} {_format_memory(result['memory'])}")
+        if result["errors"]:
+            failures.append(f"{workers} 个 worker 时出现 {result['errors']} 个错误响应")
+        if result["exit_code"] != 0:
+            failures.append(f"{workers} 个 worker 时主进程退出码 {result['exit_code']}")
+
+    widest = counts[-1]
+    unshared = bench(widest, args, preload=False)
+    print(f"{widest} 个 worker 不预加载：{unshared['rps']:.1f} req/s，PSS 总计 / worker 私有 "
+          f"{_format_memory(unshared['memory']).strip()}（预加载 {_format_memory(results[widest]['memory']).strip()}）")
+
+    failures.extend(await drain_check(widest))
+    await engine.dispose()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("OK   所有 worker 数下没有错误，SIGTERM 时进行中的请求均已完成")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
@@ -0,0 +1,101 @@
+"""帖子/物品修改与删除接口的写入吞吐基准。
+
+用法: python -m scripts.bench_writes [--rows 500] [--concurrency 16]
+进程内通过 ASGI 直接调用接口，按接口输出每秒请求数、p50 延迟与每个请求的 SQL 语句数。
+默认使用临时 SQLite；设置 DATABASE_URL=postgresql://... 可对 PostgreSQL 压测（会清空其中的表）。
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_writes.db')}")
+os.environ["COUNTER_RECONCILE_INTERVAL"] = "0"
+# 请求全部来自本机同一个 IP，关闭限流
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.utils.security import create_access_token  # noqa: E402
+
+_statements = 0
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    global _statements
+    _statements += 1
+
+
+async def _seed(client, headers, rows):
+    post_ids, item_ids = [], []
+    for i in range(rows):
+        response = await client.post("/api/v1/posts/", json={"title": f"帖子{i}", "content": "内容"}, headers=headers)
+        post_ids.append(response.json()["id"])
+        response = await client.post("/api/v1/exchanges/", json={"title": f"物品{i}"}, headers=headers)
+        item_ids.append(response.json()["id"])
+    return post_ids, item_ids
+
+
+async def _measure(label, requests, concurrency):
+    global _statements
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def run(send):
+        async with slots:
+            start = time.perf_counter()
+            response = await send()
+            latencies.append((time.perf_counter() - start) * 1000)
+            assert response.status_code < 300, response.text
+
+    _statements = 0
+    started = time.perf_counter()
+    await asyncio.gather(*(run(send) for send in requests))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {len(requests) / elapsed:>8.1f} {statistics.median(latencies):>8.2f} "
+          f"{_statements / len(requests):>8.1f}")
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/api/v1/users/", json={
+                "username": "writer", "email": "writer@example.com", "password": "secret"})
+            headers = {"Authorization": f"Bearer {create_access_token({'sub': 'writer'})}"}
+            post_ids, item_ids = await _seed(client, headers, args.rows)
+
+            def put(path, body):
+                return lambda: client.put(path, json=body, headers=headers)
+
+            def delete(path):
+                return lambda: client.delete(path, headers=headers)
+
+            print(f"{'endpoint':<28} {'req/s':>8} {'p50 ms':>8} {'sql/req':>8}")
+            await _measure("PUT /posts/{id}", [
+                put(f"/api/v1/posts/{i}", {"title": "新标题", "content": "新内容"}) for i in post_ids], args.concurrency)
+            await _measure("PUT /exchanges/{id}", [
+                put(f"/api/v1/exchanges/{i}", {"title": "新标题", "is_available": False}) for i in item_ids],
+                args.concurrency)
+            await _measure("DELETE /posts/{id}", [delete(f"/api/v1/posts/{i}") for i in post_ids], args.concurrency)
+            await _measure("DELETE /exchanges/{id}", [
+                delete(f"/api/v1/exchanges/{i}") for i in item_ids], args.concurrency)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
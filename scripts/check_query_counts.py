@@ -0,0 +1,142 @@
+"""逐个接口统计 SQL 查询次数，超出预算时以非零状态退出。
+
+用法: python -m scripts.check_query_counts
+使用临时 SQLite 数据库（需要 aiosqlite），防止 N+1 与过度加载回归。
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+_db_file = os.path.join(tempfile.mkdtemp(), "query_counts.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file}"
+# 请求全部来自本机同一个 IP，关闭限流
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+# 按默认的就地执行统计；开启任务队列时触发副作用的接口各多一次 INSERT jobs
+os.environ["JOBS_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+from app.utils.security import create_access_token, principal_cache  # noqa: E402
+
+# 每个接口允许的最大查询数（含认证查询）
+QUERY_BUDGETS = {
+    "POST /users/": 3,
+    "GET /users/": 2,
+    "GET /users/{id}": 2,
+    "PUT /users/{id}": 4,
+    "POST /posts/": 7,
+    "GET /posts/": 3,
+    "GET /posts/{id}": 3,
+    "GET /posts/feed": 6,
+    "PUT /posts/{id}": 5,
+    "POST /posts/{id}/comments": 5,
+    "POST /posts/{id}/comments (reply)": 6,
+    "GET /posts/{id}/comments": 4,
+    "GET /posts/{id}/comments?depth=2": 6,
+    "GET /posts/feed (previews)": 6,
+    "DELETE /posts/{id}": 5,
+    "POST /exchanges/": 5,
+    "GET /exchanges/": 3,
+    "GET /exchanges/{id}": 3,
+    "GET /exchanges/?filters": 3,
+    "GET /exchanges/facets": 2,
+    "POST /exchanges/wants": 4,
+    "GET /exchanges/matches": 2,
+    "PUT /exchanges/{id}": 5,
+    "DELETE /exchanges/{id}": 3,
+}
+
+_statements = []
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _count(conn, cursor, statement, parameters, context, executemany):
+    _statements.append(statement)
+
+
+async def _measure(client, label, method, url, **kwargs):
+    # 按认证缓存未命中的最坏情况计数
+    principal_cache.local.clear()
+    _statements.clear()
+    response = await client.request(method, "/api/v1" + url, **kwargs)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{label} 返回 {response.status_code}: {response.text}")
+    if os.environ.get("SHOW_SQL"):
+        print(label, *_statements, sep="\n  ")
+    return label, len(_statements), response
+
+
+async def run():
+    results = []
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            results.append(await _measure(client, "POST /users/", "POST", "/users/", json={
+                "username": "bench", "email": "bench@example.com", "password": "secret"}))
+            # 再造几个用户，让列表接口有多个作者
+            for i in range(5):
+                await client.post("/api/v1/users/", json={
+                    "username": f"u{i}", "email": f"u{i}@example.com", "password": "secret"})
+            user_id = results[-1][2].json()["id"]
+            headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench'})}"}
+            for i in range(5):
+                other = {"Authorization": f"Bearer {create_access_token({'sub': f'u{i}'})}"}
+                await client.post("/api/v1/posts/", json={"title": "t", "content": "c"}, headers=other)
+                await client.post("/api/v1/exchanges/", json={"title": "t"}, headers=other)
+
+            results.append(await _measure(client, "POST /posts/", "POST", "/posts/",
+                                          json={"title": "t", "content": "c"}, headers=headers))
+            post_id = results[-1][2].json()["id"]
+            results.append(await _measure(client, "POST /exchanges/", "POST", "/exchanges/",
+                                          json={"title": "t"}, headers=headers))
+            item_id = results[-1][2].json()["id"]
+            r = await client.post("/api/v1/posts/", json={"title": "t", "content": "c"}, headers=headers)
+            doomed_post_id = r.json()["id"]
+            # u0 想要 bench 的物品，构成一个直接互换；匹配索引按进程加载一次，先预热
+            await client.post("/api/v1/exchanges/wants", json={"keywords": "t"}, headers={
+                "Authorization": f"Bearer {create_access_token({'sub': 'u0'})}"})
+            await client.get("/api/v1/exchanges/matches", headers=headers)
+
+            checks = [
+                ("GET /users/", "GET", "/users/", {}),
+                ("GET /users/{id}", "GET", f"/users/{user_id}", {}),
+                ("PUT /users/{id}", "PUT", f"/users/{user_id}", {"json": {"bio": "hi"}}),
+                ("GET /posts/", "GET", "/posts/", {}),
+                ("GET /posts/{id}", "GET", f"/posts/{post_id}", {}),
+                ("GET /posts/feed", "GET", "/posts/feed", {}),
+                ("PUT /posts/{id}", "PUT", f"/posts/{post_id}", {"json": {"title": "t2"}}),
+                ("POST /posts/{id}/comments", "POST", f"/posts/{post_id}/comments",
+                 {"json": {"content": "c", "post_id": post_id}}),
+                ("POST /posts/{id}/comments (reply)", "POST", f"/posts/{post_id}/comments",
+                 {"json": {"content": "c", "parent_id": 1}}),
+                ("GET /posts/{id}/comments", "GET", f"/posts/{post_id}/comments", {}),
+                ("GET /posts/{id}/comments?depth=2", "GET", f"/posts/{post_id}/comments?depth=2", {}),
+                ("GET /posts/feed (previews)", "GET", "/posts/feed?limit=5", {}),
+                ("GET /exchanges/", "GET", "/exchanges/", {}),
+                ("GET /exchanges/{id}", "GET", f"/exchanges/{item_id}", {}),
+                ("GET /exchanges/?filters", "GET", "/exchanges/?is_available=true&category=书籍&condition=良好", {}),
+                ("GET /exchanges/facets", "GET", "/exchanges/facets", {}),
+                ("POST /exchanges/wants", "POST", "/exchanges/wants", {"json": {"keywords": "t"}}),
+                ("GET /exchanges/matches", "GET", "/exchanges/matches", {}),
+                ("PUT /exchanges/{id}", "PUT", f"/exchanges/{item_id}", {"json": {"title": "t2"}}),
+                ("DELETE /exchanges/{id}", "DELETE", f"/exchanges/{item_id}", {}),
+                ("DELETE /posts/{id}", "DELETE", f"/posts/{doomed_post_id}", {}),
+            ]
+            for label, method, url, kwargs in checks:
+                results.append(await _measure(client, label, method, url, headers=headers, **kwargs))
+
+    failed = False
+    for label, count, _ in results:
+        budget = QUERY_BUDGETS[label]
+        flag = "OK " if count <= budget else "FAIL"
+        failed = failed or count > budget
+        print(f"{flag} {label:<32} {count:>3} / {budget}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
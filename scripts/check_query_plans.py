@@ -0,0 +1,127 @@
+"""用 EXPLAIN 检查物品市场的筛选查询是否走了预期的索引，未命中时以非零状态退出。
+
+用法: python -m scripts.check_query_plans [--rows 20000]
+默认使用临时 SQLite；设置 DATABASE_URL=postgresql://... 可检查 PostgreSQL 的执行计划（会清空其中的表）。
+写入一批分布接近线上的物品并 ANALYZE 后，捕获服务函数实际发出的 SQL，逐条 EXPLAIN：
+要求计划中出现预期的索引，列表查询还要求没有额外的排序步骤。
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'query_plans.db')}")
+
+from sqlalchemy import event, insert, text  # noqa: E402
+
+from app.database import async_session, engine  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.models.exchange_item import ExchangeItem  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.exchange_service import facet_cache, get_category_facets, get_exchange_items  # noqa: E402
+
+CATEGORIES = ["书籍", "电子产品", "衣物", "运动器材", "生活用品", "文具", "乐器", "自行车", "化妆品", "其他"]
+CONDITIONS = ["全新", "几乎全新", "良好", "一般", "较差"]
+# SQLite 的 "USE TEMP B-TREE FOR ORDER BY" 与 PostgreSQL 的 Sort / Incremental Sort 节点
+_SORT = re.compile(r"TEMP B-TREE FOR ORDER BY|(^|->\s+)(Incremental )?Sort\b")
+
+AVAILABLE = "ix_exchange_items_available_created"
+AVAILABLE_CATEGORY = "ix_exchange_items_available_category_created"
+
+_captured = []
+
+
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _capture(conn, cursor, statement, parameters, context, executemany):
+    _captured.append((statement, parameters))
+
+
+async def _seed(rows):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"username": f"u{i}", "email": f"u{i}@example.com", "hashed_password": "x"} for i in range(200)])
+        rng = random.Random(0)
+        start = datetime(2024, 1, 1)
+        for offset in range(0, rows, 5000):
+            await conn.execute(insert(ExchangeItem), [{
+                "owner_id": rng.randint(1, 200),
+                "title": f"物品{i}",
+                "description": "九成新，自提或校内面交。" * 10,
+                "category": rng.choice(CATEGORIES),
+                "condition": rng.choice(CONDITIONS),
+                "is_available": rng.random() < 0.7,
+                "created_at": start + timedelta(minutes=i),
+            } for i in range(offset, min(rows, offset + 5000))])
+    # 线上由 autovacuum 维护统计信息与可见性映射（影响能否仅索引扫描）；VACUUM 不能在事务内执行
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE" if engine.dialect.name == "sqlite" else "VACUUM ANALYZE"))
+
+
+async def _plan(statement, parameters):
+    async with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            result = await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+            return [row[-1] for row in result]
+        result = await conn.exec_driver_sql("EXPLAIN " + statement, parameters)
+        return [row[0] for row in result]
+
+
+async def _check(label, call, indexes, ordered=True):
+    facet_cache.local.clear()
+    _captured.clear()
+    async with async_session() as db:
+        await call(db)
+    statement, parameters = next(item for item in _captured if "exchange_items" in item[0])
+    plan = await _plan(statement, parameters)
+    problems = []
+    if not any(index in line for line in plan for index in indexes):
+        problems.append(f"未使用 {' / '.join(indexes)}")
+    if ordered and any(_SORT.search(line) for line in plan):
+        problems.append("存在额外排序")
+    if os.environ.get("SHOW_PLAN") or problems:
+        print(label, *plan, sep="\n  ")
+    return label, problems
+
+
+async def run(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    await _seed(args.rows)
+    cursor = (datetime(2024, 1, 1) + timedelta(minutes=args.rows // 2), args.rows // 2)
+    checks = [
+        ("可交换物品首页", lambda db: get_exchange_items(db, limit=20, is_available=True),
+         [AVAILABLE]),
+        ("可交换 + 类别", lambda db: get_exchange_items(db, limit=20, is_available=True, category="书籍"),
+         [AVAILABLE_CATEGORY]),
+        ("可交换 + 类别 + 游标翻页", lambda db: get_exchange_items(
+            db, limit=20, is_available=True, category="书籍", after=cursor),
+         [AVAILABLE_CATEGORY, AVAILABLE]),
+        ("可交换 + 类别 + 成色", lambda db: get_exchange_items(
+            db, limit=20, is_available=True, category="书籍", condition="全新"),
+         [AVAILABLE_CATEGORY]),
+        ("已下架 + 类别", lambda db: get_exchange_items(db, limit=20, is_available=False, category="书籍"),
+         [AVAILABLE_CATEGORY]),
+        ("某用户的物品", lambda db: get_exchange_items(db, limit=20, owner_id=7),
+         ["ix_exchange_items_owner_id_created"]),
+        ("类别分面统计", get_category_facets, [AVAILABLE_CATEGORY], False),
+    ]
+    results = [await _check(*check) for check in checks]
+    await engine.dispose()
+
+    print(f"dialect: {engine.dialect.name}, rows: {args.rows}")
+    for label, problems in results:
+        print(f"{'FAIL' if problems else 'OK  '} {label}  {'; '.join(problems)}")
+    return 1 if any(problems for _, problems in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
@@ -0,0 +1,37 @@
+"""授予或撤销用户的管理员权限。
+
+用法: python -m scripts.grant_admin <用户名> [--revoke]
+"""
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import update
+
+from app.database import async_session
+from app.models.user import User
+from app.utils.security import invalidate_principal
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("username")
+    parser.add_argument("--revoke", action="store_true")
+    args = parser.parse_args(argv)
+
+    async with async_session() as db:
+        result = await db.execute(
+            update(User).where(User.username == args.username).values(is_admin=not args.revoke)
+        )
+        await db.commit()
+    if result.rowcount == 0:
+        print(f"用户不存在: {args.username}")
+        return 1
+    # 认证缓存中的旧权限需要立即失效
+    await invalidate_principal(args.username)
+    print(f"{args.username}: is_admin={not args.revoke}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,823 @@
+"""全接口压测：按流量配比并发请求，统计每个接口的 RPS、p50/p95/p99 延迟与每请求 SQL 条数，可与基线比较。
+
+用法: python -m scripts.loadtest [--target asgi|uvicorn|http://host:port] [--mix browse|write|mixed|all]
+                                 [--scale 10k] [--concurrency 20] [--duration 20] [--warmup 3]
+                                 [--workers 1] [--save result.json] [--baseline result.json] [--threshold 0.2]
+
+目标：
+  - asgi：进程内通过 ASGI 直接调用 app.main:app，不经过网络与 HTTP 解析；
+  - uvicorn：启动 uvicorn 子进程（--workers 个 worker），经本机 TCP 请求；
+  - http://...：已在运行的服务，与本脚本连接同一个 DATABASE_URL。
+未设置 DATABASE_URL 时使用临时 SQLite 并按 --scale（默认 10k）生成数据；设置了 DATABASE_URL 时只有给出
+--scale 才重新生成（会清空其中的表），否则沿用库中已有的 scripts.seed_data 数据。
+
+每个接口对应一个操作，请求参数从已生成的数据中随机选取；写接口只修改、删除压测过程中自己创建的记录。
+SSE 与导出按首字节时间统计：SSE 收到首个数据块即断开，导出仍读完整个响应体。每请求 SQL 条数取自压测前后 /metrics 的差值，
+多 worker 时 /metrics 只反映其中一个 worker，不统计；压测已运行的服务时需设置与服务相同的 METRICS_TOKEN。
+
+--baseline 给出先前 --save 的结果时逐项比较，以下情况以非零状态退出：
+  - 某个接口的 p95 比基线高出 threshold 以上（且绝对增加超过 --min-delta-ms，两次的请求数都不少于 --min-samples）；
+  - 总 RPS 比基线低 threshold 以上；
+  - 某个接口每请求 SQL 条数增加 0.5 条以上；
+  - 某个接口出现错误（非 2xx/3xx），或有接口没有对应的操作。
+基线与机器相关，需在同一台机器、同样的参数下生成，不入库。
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+# 请求全部来自本机同一个 IP，关闭限流
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("MEDIA_ROOT", tempfile.mkdtemp())
+# 读取 /metrics 统计每请求 SQL 条数；压测已运行的服务时需设置为与服务相同的令牌
+os.environ.setdefault("METRICS_TOKEN", uuid.uuid4().hex)
+_temp_db = "DATABASE_URL" not in os.environ
+if _temp_db:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}"
+
+import httpx  # noqa: E402
+from sqlalchemy import func, select  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app, lifespan  # noqa: E402
+from app.models.exchange_item import ExchangeItem  # noqa: E402
+from app.models.exchange_want import ExchangeWant  # noqa: E402
+from app.models.image import Image  # noqa: E402
+from app.models.post import Post  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.utils.security import create_access_token  # noqa: E402
+from scripts.seed_data import CATEGORIES, CONDITIONS, parse_scale, seed  # noqa: E402
+
+# 参与压测的活跃用户数
+ACTIVE_USERS = 500
+SEARCH_WORDS = ["耳机", "台灯", "自行车", "吉他", "考研资料", "图书馆", "转让", "求购", "高等数学 教学楼"]
+
+
+class Request(NamedTuple):
+    url: str
+    kwargs: dict = {}
+    on_success: Optional[Callable] = None  # 参数为响应 JSON
+
+
+class Operation(NamedTuple):
+    method: str
+    path: str
+    build: Callable  # (world, rng) -> Request 或 None（当前不适用，另选一个操作）
+    first_byte: bool = False
+
+
+OPERATIONS: Dict[str, Operation] = {}
+
+
+def operation(method: str, path: str, first_byte: bool = False):
+    def register(build):
+        OPERATIONS[f"{method} {path}"] = Operation(method, path, build, first_byte)
+        return build
+    return register
+
+
+class World:
+    """已生成数据的范围，以及压测过程中创建的、可以修改或删除的记录"""
+
+    def __init__(self, users: int, posts: int, items: int, images: int, busy_users: set):
+        self.users, self.posts, self.items, self.images = users, posts, items, images
+        # 已有求购意向的用户不参与，避免超过每人求购数上限
+        candidates = [i for i in range(2, users + 1) if i not in busy_users]
+        self.active = random.Random(0).sample(candidates, min(ACTIVE_USERS, len(candidates)))
+        self._headers = {}
+        self.posts_owned = []  # [(用户, 帖子)]
+        self.items_owned = []
+        self.wants = []  # [(用户, 求购意向)]
+        self.comments = []  # [(帖子, 评论)]
+        self.likes = set()  # {(用户, 帖子)}
+        self.follows = set()
+        self.registered = []  # [(用户id, 用户名)]
+
+    @classmethod
+    async def load(cls):
+        # 只取 seed_data 生成的记录（id 从 1 连续编号），不含先前压测创建、可能已删除的
+        seeded = (
+            (User, User.username.like("u%")),
+            (Post, Post.title.not_like("%压测%")),
+            (ExchangeItem, ExchangeItem.title.not_like("%压测%")),
+            (Image, Image.original_key.like("seed/%")),
+        )
+        async with engine.connect() as conn:
+            counts = []
+            for model, condition in seeded:
+                counts.append(await conn.scalar(select(func.coalesce(func.max(model.id), 0)).where(condition)))
+            busy = set(await conn.scalars(select(ExchangeWant.user_id).distinct()))
+        if counts[0] < 10 or counts[1] == 0 or counts[2] == 0 or counts[3] == 0:
+            raise SystemExit("数据库中没有压测数据，请加 --scale 生成或先执行 python -m scripts.seed_data")
+        return cls(*counts, busy)
+
+    def headers(self, user_id: int) -> dict:
+        headers = self._headers.get(user_id)
+        if headers is None:
+            token = create_access_token({"sub": f"u{user_id}"})
+            headers = self._headers[user_id] = {"Authorization": f"Bearer {token}"}
+        return headers
+
+    def user(self, rng) -> int:
+        return rng.choice(self.active)
+
+    def post(self, rng) -> int:
+        return rng.randint(1, self.posts)
+
+    def item(self, rng) -> int:
+        return rng.randint(1, self.items)
+
+
+def _auth(world, user_id, **kwargs):
+    return dict(kwargs, headers=world.headers(user_id))
+
+
+def _post_payload(rng, world):
+    payload = {"title": f"{rng.choice(SEARCH_WORDS)}压测帖", "content": "压测数据，" * rng.randint(1, 20)}
+    if rng.random() < 0.3:
+        payload["image_ids"] = [rng.randint(1, world.images) for _ in range(rng.randint(1, 3))]
+    return payload
+
+
+def _item_payload(rng):
+    return {
+        "title": f"{rng.choice(SEARCH_WORDS)}压测物品",
+        "description": "压测数据",
+        "category": rng.choice(CATEGORIES),
+        "condition": rng.choice(CONDITIONS),
+    }
+
+
+def _png(rng) -> bytes:
+    from PIL import Image as PILImage
+
+    buffer = io.BytesIO()
+    color = tuple(rng.randrange(256) for _ in range(3))
+    PILImage.new("RGB", (320, 240), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+# ---- 用户 ----
+
+@operation("POST", "/api/v1/users/")
+def register_user(world, rng):
+    name = f"lt{uuid.uuid4().hex[:12]}"
+    return Request("/api/v1/users/", {"json": {"username": name, "email": f"{name}@example.com", "password": "secret"}},
+                   lambda body: world.registered.append((body["id"], name)))
+
+
+@operation("GET", "/api/v1/users/")
+def list_users(world, rng):
+    return Request("/api/v1/users/?limit=20", _auth(world, world.user(rng)))
+
+
+@operation("GET", "/api/v1/users/{user_id}")
+def read_user(world, rng):
+    return Request(f"/api/v1/users/{world.user(rng)}", _auth(world, world.user(rng)))
+
+
+@operation("PUT", "/api/v1/users/{user_id}")
+def update_user(world, rng):
+    user_id = world.user(rng)
+    return Request(f"/api/v1/users/{user_id}", _auth(world, user_id, json={"bio": f"压测 {rng.random():.6f}"}))
+
+
+@operation("DELETE", "/api/v1/users/{user_id}")
+def delete_user(world, rng):
+    if not world.registered:
+        return None
+    user_id, name = world.registered.pop(rng.randrange(len(world.registered)))
+    token = create_access_token({"sub": name})
+    return Request(f"/api/v1/users/{user_id}", {"headers": {"Authorization": f"Bearer {token}"}})
+
+
+@operation("POST", "/api/v1/users/{user_id}/follow")
+def follow(world, rng):
+    user_id, target = world.user(rng), world.user(rng)
+    if user_id == target:
+        return None
+    return Request(f"/api/v1/users/{target}/follow", _auth(world, user_id),
+                   lambda body: world.follows.add((user_id, target)))
+
+
+@operation("DELETE", "/api/v1/users/{user_id}/follow")
+def unfollow(world, rng):
+    if not world.follows:
+        return None
+    user_id, target = world.follows.pop()
+    return Request(f"/api/v1/users/{target}/follow", _auth(world, user_id))
+
+
+# ---- 帖子 ----
+
+@operation("POST", "/api/v1/posts/")
+def create_post(world, rng):
+    user_id = world.user(rng)
+    return Request("/api/v1/posts/", _auth(world, user_id, json=_post_payload(rng, world)),
+                   lambda body: world.posts_owned.append((user_id, body["id"])))
+
+
+@operation("GET", "/api/v1/posts/")
+def list_posts(world, rng):
+    return Request("/api/v1/posts/?limit=20", _auth(world, world.user(rng)))
+
+
+@operation("POST", "/api/v1/posts/bulk")
+def bulk_posts(world, rng):
+    rows = [_post_payload(rng, world) for _ in range(20)]
+    return Request("/api/v1/posts/bulk", _auth(world, world.user(rng), json=rows))
+
+
+@operation("POST", "/api/v1/posts/import")
+def import_posts(world, rng):
+    body = "".join(json.dumps(_post_payload(rng, world), ensure_ascii=False) + "\n" for _ in range(20))
+    return Request("/api/v1/posts/import", _auth(world, world.user(rng), content=body.encode(),
+                                                 headers={"Content-Type": "application/x-ndjson"}))
+
+
+@operation("GET", "/api/v1/posts/feed")
+def read_feed(world, rng):
+    return Request("/api/v1/posts/feed?limit=20", _auth(world, world.user(rng)))
+
+
+@operation("GET", "/api/v1/posts/{post_id}")
+def read_post(world, rng):
+    return Request(f"/api/v1/posts/{world.post(rng)}", _auth(world, world.user(rng)))
+
+
+@operation("PUT", "/api/v1/posts/{post_id}")
+def update_post(world, rng):
+    if not world.posts_owned:
+        return None
+    user_id, post_id = rng.choice(world.posts_owned)
+    return Request(f"/api/v1/posts/{post_id}", _auth(world, user_id, json={"content": f"已编辑 {rng.random():.6f}"}))
+
+
+@operation("DELETE", "/api/v1/posts/{post_id}")
+def delete_post(world, rng):
+    if len(world.posts_owned) < 2:
+        return None
+    user_id, post_id = world.posts_owned.pop(rng.randrange(len(world.posts_owned)))
+    world.comments = [(post, comment) for post, comment in world.comments if post != post_id]
+    return Request(f"/api/v1/posts/{post_id}", _auth(world, user_id))
+
+
+@operation("POST", "/api/v1/posts/{post_id}/comments")
+def create_comment(world, rng):
+    if world.comments and rng.random() < 0.3:
+        post_id, parent_id = rng.choice(world.comments)
+    else:
+        post_id, parent_id = world.post(rng), None
+    return Request(f"/api/v1/posts/{post_id}/comments",
+                   _auth(world, world.user(rng), json={"content": "同问，还在吗？", "parent_id": parent_id}),
+                   lambda body: world.comments.append((post_id, body["id"])))
+
+
+@operation("GET", "/api/v1/posts/{post_id}/comments")
+def read_comments(world, rng):
+    depth = rng.choice(("", "&depth=2"))
+    return Request(f"/api/v1/posts/{world.post(rng)}/comments?limit=20{depth}", _auth(world, world.user(rng)))
+
+
+@operation("POST", "/api/v1/posts/{post_id}/like")
+def like(world, rng):
+    user_id, post_id = world.user(rng), world.post(rng)
+    return Request(f"/api/v1/posts/{post_id}/like", _auth(world, user_id),
+                   lambda body: world.likes.add((user_id, post_id)))
+
+
+@operation("DELETE", "/api/v1/posts/{post_id}/like")
+def unlike(world, rng):
+    if not world.likes:
+        return None
+    user_id, post_id = world.likes.pop()
+    return Request(f"/api/v1/posts/{post_id}/like", _auth(world, user_id))
+
+
+# ---- 交换 ----
+
+@operation("POST", "/api/v1/exchanges/")
+def create_item(world, rng):
+    user_id = world.user(rng)
+    return Request("/api/v1/exchanges/", _auth(world, user_id, json=_item_payload(rng)),
+                   lambda body: world.items_owned.append((user_id, body["id"])))
+
+
+@operation("GET", "/api/v1/exchanges/")
+def list_items(world, rng):
+    filters = rng.choice((
+        "", "&is_available=true", f"&is_available=true&category={rng.choice(CATEGORIES)}",
+        f"&category={rng.choice(CATEGORIES)}&condition={rng.choice(CONDITIONS)}", f"&owner_id={world.user(rng)}",
+    ))
+    return Request(f"/api/v1/exchanges/?limit=20{filters}", _auth(world, world.user(rng)))
+
+
+@operation("POST", "/api/v1/exchanges/bulk")
+def bulk_items(world, rng):
+    rows = [_item_payload(rng) for _ in range(20)]
+    return Request("/api/v1/exchanges/bulk", _auth(world, world.user(rng), json=rows))
+
+
+@operation("POST", "/api/v1/exchanges/import")
+def import_items(world, rng):
+    body = "".join(json.dumps(_item_payload(rng), ensure_ascii=False) + "\n" for _ in range(20))
+    return Request("/api/v1/exchanges/import", _auth(world, world.user(rng), content=body.encode(),
+                                                     headers={"Content-Type": "application/x-ndjson"}))
+
+
+@operation("GET", "/api/v1/exchanges/facets")
+def facets(world, rng):
+    return Request("/api/v1/exchanges/facets", _auth(world, world.user(rng)))
+
+
+@operation("GET", "/api/v1/exchanges/wants")
+def list_wants(world, rng):
+    return Request("/api/v1/exchanges/wants", _auth(world, world.user(rng)))
+
+
+@operation("POST", "/api/v1/exchanges/wants")
+def create_want(world, rng):
+    user_id = world.user(rng)
+    if sum(1 for owner, _ in world.wants if owner == user_id) >= 5:
+        return None
+    payload = {"category": rng.choice(CATEGORIES), "keywords": rng.choice(SEARCH_WORDS)}
+    return Request("/api/v1/exchanges/wants", _auth(world, user_id, json=payload),
+                   lambda body: world.wants.append((user_id, body["id"])))
+
+
+@operation("DELETE", "/api/v1/exchanges/wants/{want_id}")
+def delete_want(world, rng):
+    if not world.wants:
+        return None
+    user_id, want_id = world.wants.pop(rng.randrange(len(world.wants)))
+    return Request(f"/api/v1/exchanges/wants/{want_id}", _auth(world, user_id))
+
+
+@operation("GET", "/api/v1/exchanges/matches")
+def matches(world, rng):
+    return Request("/api/v1/exchanges/matches", _auth(world, world.user(rng)))
+
+
+@operation("GET", "/api/v1/exchanges/{exchange_item_id}")
+def read_item(world, rng):
+    return Request(f"/api/v1/exchanges/{world.item(rng)}", _auth(world, world.user(rng)))
+
+
+@operation("PUT", "/api/v1/exchanges/{exchange_item_id}")
+def update_item(world, rng):
+    if not world.items_owned:
+        return None
+    user_id, item_id = rng.choice(world.items_owned)
+    payload = {"description": f"已编辑 {rng.random():.6f}", "is_available": rng.random() < 0.8}
+    return Request(f"/api/v1/exchanges/{item_id}", _auth(world, user_id, json=payload))
+
+
+@operation("DELETE", "/api/v1/exchanges/{exchange_item_id}")
+def delete_item(world, rng):
+    if len(world.items_owned) < 2:
+        return None
+    user_id, item_id = world.items_owned.pop(rng.randrange(len(world.items_owned)))
+    return Request(f"/api/v1/exchanges/{item_id}", _auth(world, user_id))
+
+
+# ---- 检索、图片、导出、事件 ----
+
+@operation("GET", "/api/v1/search")
+def search(world, rng):
+    params = {"q": rng.choice(SEARCH_WORDS), "type": rng.choice(("posts", "exchanges")), "limit": 20}
+    return Request("/api/v1/search", _auth(world, world.user(rng), params=params))
+
+
+@operation("POST", "/api/v1/images/")
+def upload_image(world, rng):
+    files = {"file": ("bench.png", _png(rng), "image/png")}
+    return Request("/api/v1/images/", _auth(world, world.user(rng), files=files))
+
+
+@operation("GET", "/api/v1/images/{image_id}")
+def read_image(world, rng):
+    return Request(f"/api/v1/images/{rng.randint(1, world.images)}", _auth(world, world.user(rng)))
+
+
+@operation("GET", "/api/v1/admin/export/{name}", first_byte=True)
+def export(world, rng):
+    name = rng.choice(("users", "posts", "exchanges"))
+    return Request(f"/api/v1/admin/export/{name}?format={rng.choice(('ndjson', 'csv'))}", _auth(world, 1))
+
+
+@operation("GET", "/api/v1/events/stream", first_byte=True)
+def event_stream(world, rng):
+    return Request(f"/api/v1/events/stream?channels=post:{world.post(rng)}", _auth(world, world.user(rng)))
+
+
+# ---- 旧版接口 ----
+
+@operation("POST", "/users/")
+def legacy_register(world, rng):
+    name = f"lg{uuid.uuid4().hex[:12]}"
+    return Request("/users/", {"json": {"username": name, "email": f"{name}@example.com", "password": "secret"}})
+
+
+@operation("GET", "/users/")
+def legacy_users(world, rng):
+    return Request(f"/users/?skip={rng.randrange(world.users)}&limit=20")
+
+
+@operation("GET", "/users/{user_id}")
+def legacy_user(world, rng):
+    return Request(f"/users/{world.user(rng)}")
+
+
+@operation("POST", "/exchanges/")
+def legacy_create_item(world, rng):
+    return Request("/exchanges/", {"json": dict(_item_payload(rng), owner_id=world.user(rng))})
+
+
+@operation("GET", "/exchanges/")
+def legacy_items(world, rng):
+    return Request(f"/exchanges/?skip={rng.randrange(world.items)}&limit=20")
+
+
+@operation("GET", "/exchanges/{exchange_id}")
+def legacy_item(world, rng):
+    return Request(f"/exchanges/{world.item(rng)}")
+
+
+@operation("POST", "/posts/")
+def legacy_create_post(world, rng):
+    payload = _post_payload(rng, world)
+    return Request("/posts/", {"json": {"title": payload["title"], "content": payload["content"],
+                                        "author_id": world.user(rng)}})
+
+
+@operation("GET", "/posts/")
+def legacy_posts(world, rng):
+    return Request(f"/posts/?skip={rng.randrange(world.posts)}&limit=20")
+
+
+# ---- 其他 ----
+
+@operation("GET", "/api/v1/")
+def api_root(world, rng):
+    return Request("/api/v1/")
+
+
+@operation("GET", "/")
+def root(world, rng):
+    return Request("/")
+
+
+for _name in ("cache", "db", "events", "jobs", "rate-limit"):
+    # 仅管理员可见，u1 为管理员
+    operation("GET", f"/api/v1/stats/{_name}")(
+        lambda world, rng, _name=_name: Request(f"/api/v1/stats/{_name}", _auth(world, 1))
+    )
+
+
+# 流量配比（权重）；未列出的接口不参与，all 为所有接口等权
+MIXES = {
+    "browse": {
+        "GET /api/v1/posts/": 20, "GET /api/v1/posts/feed": 15, "GET /api/v1/posts/{post_id}": 20,
+        "GET /api/v1/posts/{post_id}/comments": 10, "GET /api/v1/exchanges/": 15,
+        "GET /api/v1/exchanges/{exchange_item_id}": 10, "GET /api/v1/exchanges/facets": 3,
+        "GET /api/v1/search": 5, "GET /api/v1/users/{user_id}": 3, "GET /api/v1/images/{image_id}": 2,
+    },
+    "write": {
+        "POST /api/v1/posts/": 10, "PUT /api/v1/posts/{post_id}": 5, "DELETE /api/v1/posts/{post_id}": 2,
+        "POST /api/v1/posts/{post_id}/comments": 10, "POST /api/v1/posts/{post_id}/like": 10,
+        "DELETE /api/v1/posts/{post_id}/like": 5, "POST /api/v1/users/{user_id}/follow": 4,
+        "DELETE /api/v1/users/{user_id}/follow": 2, "POST /api/v1/exchanges/": 6,
+        "PUT /api/v1/exchanges/{exchange_item_id}": 4, "DELETE /api/v1/exchanges/{exchange_item_id}": 1,
+        "POST /api/v1/exchanges/wants": 2, "DELETE /api/v1/exchanges/wants/{want_id}": 1,
+        "PUT /api/v1/users/{user_id}": 2, "POST /api/v1/users/": 1,
+    },
+}
+MIXES["mixed"] = {**{label: weight * 9 for label, weight in MIXES["browse"].items()}, **MIXES["write"]}
+MIXES["all"] = {label: 1 for label in OPERATIONS}
+
+
+def uncovered_routes() -> List[str]:
+    routes = [f"{method.upper()} {path}" for path, item in app.openapi()["paths"].items() for method in item]
+    return [route for route in routes if route not in OPERATIONS]
+
+
+# ---- 发送请求 ----
+
+class Driver:
+    """普通请求走 httpx；首字节计时的请求在进程内直接调用 ASGI，经网络时用流式读取"""
+
+    def __init__(self, client: httpx.AsyncClient, in_process: bool):
+        self.client = client
+        self.in_process = in_process
+
+    async def send(self, op: Operation, request: Request):
+        kwargs = dict(request.kwargs)
+        start = time.perf_counter()
+        if not op.first_byte:
+            response = await self.client.request(op.method, request.url, **kwargs)
+            return response.status_code, time.perf_counter() - start, response
+        if self.in_process:
+            status, first_byte = await _asgi_first_byte(op.method, request.url, kwargs.get("headers", {}))
+            return status, first_byte - start, None
+        async with self.client.stream(op.method, request.url, **kwargs) as response:
+            first_byte = None
+            async for _ in response.aiter_raw():
+                first_byte = first_byte or time.perf_counter()
+                if _endless(response.headers.get("content-type")):
+                    break
+            return response.status_code, (first_byte or time.perf_counter()) - start, None
+
+
+def _endless(content_type: Optional[str]) -> bool:
+    # SSE 收到首个数据块后断开；导出等有限的响应读完，避免中途断开让服务端在游标读到一半时取消
+    return (content_type or "").startswith("text/event-stream")
+
+
+async def _asgi_first_byte(method: str, url: str, headers: dict):
+    """返回 (状态码, 首字节时刻)；httpx 的 ASGITransport 会等响应体全部生成，SSE 永远不会结束"""
+    parts = urlsplit(url)
+    done = asyncio.Event()
+    status, first_byte, endless = 0, None, False
+    sent_request = False
+
+    async def receive():
+        nonlocal sent_request
+        if not sent_request:
+            sent_request = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, first_byte, endless
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            endless = _endless(dict(message["headers"]).get(b"content-type", b"").decode())
+        elif message["type"] == "http.response.body":
+            first_byte = first_byte or time.perf_counter()
+            if endless or not message.get("more_body"):
+                done.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": parts.path, "raw_path": parts.path.encode(), "query_string": parts.query.encode(),
+        "root_path": "", "client": ("127.0.0.1", 50000), "server": ("test", 80),
+        "headers": [(b"host", b"test"), *((k.lower().encode(), v.encode()) for k, v in headers.items())],
+    }
+    await app(scope, receive, send)
+    return status, first_byte or time.perf_counter()
+
+
+class Results:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    def record(self, label: str, status: int, elapsed: float):
+        if not self.recording:
+            return
+        self.latencies[label].append(elapsed)
+        if not 200 <= status < 400:
+            self.errors[label][status] += 1
+
+
+async def _virtual_user(driver: Driver, world: World, mix: dict, seed_value: int, deadline: float, results: Results):
+    rng = random.Random(seed_value)
+    labels, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        for label in rng.choices(labels, weights, k=20):
+            op = OPERATIONS[label]
+            request = op.build(world, rng)
+            if request is not None:
+                break
+        else:
+            await asyncio.sleep(0)
+            continue
+        try:
+            status, elapsed, response = await driver.send(op, request)
+        except httpx.HTTPError:
+            status, elapsed, response = 599, 0.0, None
+        results.record(label, status, elapsed)
+        if 200 <= status < 300 and request.on_success is not None:
+            request.on_success(response.json() if response is not None and response.content else None)
+
+
+# ---- /metrics ----
+
+_SAMPLE = re.compile(r'^http_request_db_queries_(sum|count)\{(.*)\} (\S+)$')
+
+
+async def _scrape_queries(client: httpx.AsyncClient) -> Dict[str, List[float]]:
+    """{"METHOD 路由": [SQL 总条数, 请求数]}"""
+    response = await client.get("/metrics", headers={"Authorization": f"Bearer {settings.METRICS_TOKEN}"})
+    if response.status_code != 200:
+        return {}
+    totals = defaultdict(lambda: [0.0, 0.0])
+    for line in response.text.splitlines():
+        match = _SAMPLE.match(line)
+        if match:
+            labels = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2)))
+            totals[f"{labels.get('method')} {labels.get('route')}"][match.group(1) == "count"] += float(match.group(3))
+    return totals
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def summarize(results: Results, duration: float, before: dict, after: dict, track_queries: bool) -> dict:
+    routes = {}
+    for label, latencies in sorted(results.latencies.items()):
+        queries = None
+        if track_queries:
+            total, count = (after.get(label, [0, 0])[i] - before.get(label, [0, 0])[i] for i in (0, 1))
+            queries = round(total / count, 2) if count else None
+        routes[label] = {
+            "count": len(latencies),
+            "errors": sum(results.errors[label].values()),
+            "statuses": {str(k): v for k, v in results.errors[label].items()},
+            "rps": round(len(latencies) / duration, 2),
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(_percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 2),
+            "queries": queries,
+        }
+    latencies = [elapsed for values in results.latencies.values() for elapsed in values]
+    overall = {
+        f"p{q}_ms": round(_percentile(latencies, q / 100) * 1000, 2) if latencies else None for q in (50, 95, 99)
+    }
+    return {"rps": round(len(latencies) / duration, 2), "requests": len(latencies), **overall, "routes": routes}
+
+
+def print_report(summary: dict, meta: dict):
+    print(f"目标 {meta['target']}，{meta['dialect']}，配比 {meta['mix']}，并发 {meta['concurrency']}，"
+          f"{meta['duration']}s：共 {summary['requests']} 个请求，{summary['rps']:.1f} req/s")
+    print(f"{'接口':<48} {'请求':>6} {'错误':>5} {'RPS':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>6}")
+    for label, route in summary["routes"].items():
+        queries = "-" if route["queries"] is None else f"{route['queries']:.2f}"
+        print(f"{label:<48} {route['count']:>6} {route['errors']:>5} {route['rps']:>8.1f} {route['p50_ms']:>6.1f}ms "
+              f"{route['p95_ms']:>6.1f}ms {route['p99_ms']:>6.1f}ms {queries:>6}")
+
+
+def compare(summary: dict, baseline: dict, threshold: float, min_delta_ms: float, min_samples: int) -> List[str]:
+    failures = []
+    base_rps = baseline["summary"]["rps"]
+    if summary["rps"] < base_rps * (1 - threshold):
+        failures.append(f"总 RPS {summary['rps']:.1f}，基线 {base_rps:.1f}")
+    for label, route in summary["routes"].items():
+        base = baseline["summary"]["routes"].get(label)
+        if base is None:
+            continue
+        # 样本太少时 p95 只是最慢的一两个请求，不作比较
+        enough = min(route["count"], base["count"]) >= min_samples
+        slower = route["p95_ms"] > base["p95_ms"] * (1 + threshold) and route["p95_ms"] - base["p95_ms"] > min_delta_ms
+        if enough and slower:
+            failures.append(f"{label} p95 {route['p95_ms']:.1f}ms，基线 {base['p95_ms']:.1f}ms")
+        if route["queries"] is not None and base["queries"] is not None and route["queries"] > base["queries"] + 0.5:
+            failures.append(f"{label} 每请求 SQL {route['queries']:.2f} 条，基线 {base['queries']:.2f} 条")
+    return failures
+
+
+# ---- 目标 ----
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"uvicorn 已退出，状态 {process.returncode}")
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("等待 uvicorn 启动超时")
+
+
+async def _load(args, client: httpx.AsyncClient, in_process: bool) -> dict:
+    world = await World.load()
+    driver = Driver(client, in_process)
+    mix = MIXES[args.mix]
+    results = Results()
+    track_queries = args.target == "asgi" or args.workers == 1
+
+    # 预热：建立连接、填充缓存，不计入结果
+    deadline = time.perf_counter() + args.warmup
+    await asyncio.gather(*(
+        _virtual_user(driver, world, mix, args.seed * 1000 + i, deadline, results) for i in range(args.concurrency)
+    ))
+    before = await _scrape_queries(client) if track_queries else {}
+    results.recording = True
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(
+        _virtual_user(driver, world, mix, args.seed * 1000 + 500 + i, deadline, results)
+        for i in range(args.concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+    after = await _scrape_queries(client) if track_queries else {}
+    return summarize(results, elapsed, before, after, track_queries)
+
+
+async def _run_target(args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    timeout = httpx.Timeout(60.0)
+    if args.target == "asgi":
+        async with lifespan(app):
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=timeout) as client:
+                return await _load(args, client, True)
+    if args.target == "uvicorn":
+        port = _free_port()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(args.workers), "--no-access-log", "--log-level", "warning"],
+            env=dict(os.environ),
+        )
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=timeout) as client:
+                await _wait_ready(client, process)
+                return await _load(args, client, False)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+    async with httpx.AsyncClient(base_url=args.target, limits=limits, timeout=timeout) as client:
+        return await _load(args, client, False)
+
+
+async def run(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", default="asgi", help="asgi / uvicorn / 已运行服务的 http:// 地址")
+    parser.add_argument("--mix", default="mixed", choices=sorted(MIXES))
+    parser.add_argument("--scale", help="重新生成数据：10k / 1m / 10m，或直接给出帖子数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker 数")
+    parser.add_argument("--save", help="结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="与先前 --save 的结果比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="允许的相对退化")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="p95 绝对增加不超过此值时不算退化")
+    parser.add_argument("--min-samples", type=int, default=50, help="请求数少于此值的接口不比较 p95")
+    args = parser.parse_args(argv)
+
+    failures = [f"{route} 没有对应的压测操作" for route in uncovered_routes()]
+    scale = args.scale or ("10k" if _temp_db else None)
+    if scale:
+        start = time.perf_counter()
+        counts = await seed(parse_scale(scale), args.seed)
+        print(f"生成数据 {sum(counts.values())} 行，用时 {time.perf_counter() - start:.1f}s")
+    summary = await _run_target(args)
+    await engine.dispose()
+
+    meta = {
+        "target": args.target, "dialect": engine.dialect.name, "mix": args.mix, "concurrency": args.concurrency,
+        "duration": args.duration, "workers": args.workers, "scale": scale,
+    }
+    print_report(summary, meta)
+    for label, route in summary["routes"].items():
+        if route["errors"]:
+            failures.append(f"{label} 出现 {route['errors']} 个错误响应 {route['statuses']}")
+    if args.mix == "all":
+        failures.extend(f"{label} 压测期间没有请求" for label in OPERATIONS if label not in summary["routes"])
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "summary": summary}, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if any(baseline["meta"][key] != meta[key] for key in ("target", "dialect", "mix", "concurrency", "workers")):
+            print(f"注意：基线参数 {baseline['meta']} 与本次不同，比较结果仅供参考")
+        failures.extend(compare(summary, baseline, args.threshold, args.min_delta_ms, args.min_samples))
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("OK   没有发现退化")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
@@ -0,0 +1,20 @@
+"""为已有帖子和交换物品回填全文检索分词。
+
+用法: python -m scripts.reindex_search
+"""
+import asyncio
+import sys
+
+from app.database import async_session
+from app.services.search_service import SEARCH_MODELS, rebuild_search_tokens
+
+
+async def main():
+    async with async_session() as db:
+        for target in SEARCH_MODELS:
+            total = await rebuild_search_tokens(db, target)
+            print(f"{target}: {total} rows reindexed")
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
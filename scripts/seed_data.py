@@ -0,0 +1,249 @@
+"""生成压测用的合成数据：用户、关注、帖子（含图片）、评论（含楼中楼）、点赞、交换物品、求购意向。
+
+用法: python -m scripts.seed_data [--scale 10k|1m|10m|帖子数] [--seed 0]
+
+规模以帖子数计，其余按比例：用户 = 帖子/10（至少 100）、评论与点赞各约 2 倍帖子、物品 = 帖子/2、
+每个用户关注 20 人、图片 = 帖子/10。作者与被关注者偏向少数热门账号，粉丝数可超过写扩散阈值。
+所有主键显式指定、计数列与明细一致；同一 seed 生成的数据完全相同。用户名为 u1、u2…（id 与序号相同），
+密码均为 secret，u1 为管理员。会清空 DATABASE_URL 指向的数据库中的表。
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app.database import engine
+from app.models import Base
+from app.models.exchange_item import ExchangeItem
+from app.models.exchange_want import ExchangeWant
+from app.models.follow import Follow
+from app.models.image import Image, PostImage
+from app.models.post import Comment, Post, PostLike
+from app.models.user import User
+from app.utils.security import hash_password
+from app.utils.text_search import search_document
+
+SCALES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+BATCH = 5000
+FOLLOWS_PER_USER = 20
+PASSWORD = "secret"
+
+CATEGORIES = ["书籍", "电子产品", "生活用品", "运动器材", "服装", "乐器"]
+CONDITIONS = ["全新", "九成新", "良好", "一般"]
+_PLACES = ["图书馆", "食堂", "操场", "实验楼", "宿舍楼下", "南门", "教学楼"]
+_THINGS = ["高等数学", "耳机", "台灯", "羽毛球拍", "雨伞", "自行车", "吉他", "显示器", "考研资料", "电饭煲"]
+_ACTIONS = ["捡到", "出", "求购", "转让", "丢了", "推荐", "交换"]
+
+
+def _templates(rng: random.Random, count: int):
+    """预先生成有限的文本模板并分词，批量插入时不再逐行分词"""
+    templates = []
+    for _ in range(count):
+        place, thing, action = rng.choice(_PLACES), rng.choice(_THINGS), rng.choice(_ACTIONS)
+        title = f"{place}{action}{thing}"
+        content = f"今天在{place}{action}一个{thing}，有需要的同学联系我。" * rng.randint(1, 4)
+        category = rng.choice(CATEGORIES)
+        templates.append((
+            title, content, category, search_document(title, content), search_document(title, content, category)
+        ))
+    return templates
+
+
+def _skewed(rng: random.Random, n: int) -> int:
+    """1..n，偏向小 id（热门账号）"""
+    return 1 + int(n * rng.random() ** 3)
+
+
+def _followees(seed: int, user_id: int, users: int):
+    # 每个用户独立的随机序列：先统计粉丝数，插入时再按同样的序列生成关注关系
+    rng = random.Random(seed * 1_000_003 + user_id)
+    followees = set()
+    while len(followees) < min(FOLLOWS_PER_USER, users - 1):
+        followee = _skewed(rng, users)
+        if followee != user_id:
+            followees.add(followee)
+    return followees
+
+
+def _created_at(start: datetime, span: timedelta, i: int, total: int) -> datetime:
+    # 按 id 递增，贴近真实的写入顺序
+    return start + span * (i / max(1, total))
+
+
+class Seeder:
+    def __init__(self, posts: int, seed: int):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.posts = posts
+        self.users = max(100, posts // 10)
+        self.items = max(10, posts // 2)
+        self.images = max(10, posts // 10)
+        self.wants = max(10, self.users // 10)
+        self.templates = _templates(self.rng, 200)
+        self.now = datetime.utcnow()
+        self.start = self.now - timedelta(days=180)
+        self.span = self.now - self.start
+        self.counts = {}
+
+    async def _insert(self, table, rows):
+        if not rows:
+            return
+        async with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                # COPY 代替多行 INSERT；压测数据可重新生成，不必等每批提交落盘
+                await conn.execute(text("SET LOCAL synchronous_commit TO off"))
+                # COPY 不经过 SQLAlchemy，未给出的列按模型的 Python 端默认值补齐（每批取一次）
+                defaults = {
+                    column.name: column.default.arg(None) if column.default.is_callable else column.default.arg
+                    for column in table.__table__.columns
+                    if column.name not in rows[0] and column.default is not None
+                }
+                rows = [dict(defaults, **row) for row in rows] if defaults else rows
+                columns = list(rows[0])
+                raw = await conn.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(
+                    table.__tablename__, records=[tuple(row[c] for c in columns) for row in rows], columns=columns
+                )
+            else:
+                await conn.execute(insert(table), rows)
+        self.counts[table.__tablename__] = self.counts.get(table.__tablename__, 0) + len(rows)
+
+    async def users_and_follows(self):
+        followers = array("i", [0]) * (self.users + 1)
+        for user_id in range(1, self.users + 1):
+            for followee in _followees(self.seed, user_id, self.users):
+                followers[followee] += 1
+        hashed = hash_password(PASSWORD)
+        for first in range(1, self.users + 1, BATCH):
+            await self._insert(User, [
+                {"id": i, "username": f"u{i}", "email": f"u{i}@example.com", "hashed_password": hashed,
+                 "full_name": f"用户{i}", "bio": "校园二手交易爱好者", "is_active": True, "is_admin": i == 1,
+                 "followers_count": followers[i], "created_at": _created_at(self.start, self.span, i, self.users)}
+                for i in range(first, min(self.users + 1, first + BATCH))
+            ])
+        rows = []
+        for user_id in range(1, self.users + 1):
+            rows.extend({"follower_id": user_id, "followee_id": followee}
+                        for followee in _followees(self.seed, user_id, self.users))
+            if len(rows) >= BATCH:
+                await self._insert(Follow, rows)
+                rows = []
+        await self._insert(Follow, rows)
+
+    async def images_rows(self):
+        rng = self.rng
+        for first in range(1, self.images + 1, BATCH):
+            await self._insert(Image, [
+                {"id": i, "sha256": f"{i:064x}", "uploader_id": rng.randint(1, self.users),
+                 "content_type": "image/webp", "size": 50_000, "width": 1024, "height": 768,
+                 "original_key": f"seed/{i}.webp", "display_key": f"seed/{i}-display.webp",
+                 "thumbnail_key": f"seed/{i}-thumb.webp"}
+                for i in range(first, min(self.images + 1, first + BATCH))
+            ])
+
+    async def posts_comments_likes(self):
+        rng = self.rng
+        comment_id = 0
+        for first in range(1, self.posts + 1, BATCH):
+            posts, comments, likes, links = [], [], [], []
+            for post_id in range(first, min(self.posts + 1, first + BATCH)):
+                title, content, _, tokens, _ = rng.choice(self.templates)
+                created = _created_at(self.start, self.span, post_id, self.posts)
+                # 评论：0~4 条，其中约三成回复本帖更早的评论
+                post_comments = []
+                for _ in range(rng.choice((0, 0, 1, 2, 2, 3, 4, 4))):
+                    comment_id += 1
+                    parent = rng.choice(post_comments) if post_comments and rng.random() < 0.3 else None
+                    post_comments.append({
+                        "id": comment_id, "post_id": post_id, "author_id": rng.randint(1, self.users),
+                        "parent_id": parent["id"] if parent else None, "content": "同问，还在吗？",
+                        "replies_count": 0, "created_at": created + timedelta(minutes=len(post_comments) + 1),
+                    })
+                    if parent:
+                        parent["replies_count"] += 1
+                comments.extend(post_comments)
+                likers = rng.sample(range(1, self.users + 1), min(self.users, rng.choice((0, 1, 1, 2, 3, 5))))
+                likes.extend({"post_id": post_id, "user_id": user_id, "created_at": created} for user_id in likers)
+                if rng.random() < 0.3:
+                    for position, image_id in enumerate(rng.sample(range(1, self.images + 1), rng.randint(1, 3))):
+                        links.append({"post_id": post_id, "image_id": image_id, "position": position})
+                posts.append({
+                    "id": post_id, "title": title, "content": content, "author_id": _skewed(rng, self.users),
+                    "likes_count": len(likers), "comments_count": len(post_comments), "search_tokens": tokens,
+                    "created_at": created, "updated_at": created,
+                })
+            await self._insert(Post, posts)
+            await self._insert(Comment, comments)
+            await self._insert(PostLike, likes)
+            await self._insert(PostImage, links)
+
+    async def items_and_wants(self):
+        rng = self.rng
+        for first in range(1, self.items + 1, BATCH):
+            rows = []
+            for i in range(first, min(self.items + 1, first + BATCH)):
+                title, content, category, _, tokens = rng.choice(self.templates)
+                created = _created_at(self.start, self.span, i, self.items)
+                rows.append({
+                    "id": i, "owner_id": _skewed(rng, self.users), "title": title, "description": content,
+                    "category": category, "condition": rng.choice(CONDITIONS), "is_available": rng.random() < 0.7,
+                    "search_tokens": tokens, "created_at": created, "updated_at": created,
+                })
+            await self._insert(ExchangeItem, rows)
+        await self._insert(ExchangeWant, [
+            {"id": i, "user_id": rng.randint(1, self.users), "category": rng.choice(CATEGORIES),
+             "keywords": rng.choice(_THINGS) if rng.random() < 0.5 else None}
+            for i in range(1, self.wants + 1)
+        ])
+
+    async def fix_sequences(self):
+        # 显式写入了主键，PostgreSQL 的自增序列需要跟上
+        if engine.dialect.name != "postgresql":
+            return
+        async with engine.begin() as conn:
+            for table in ("users", "images", "posts", "comments", "post_likes", "exchange_items", "exchange_wants"):
+                await conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT coalesce(max(id), 1) FROM {table}))"
+                ))
+            await conn.execute(text("ANALYZE"))
+
+
+def parse_scale(value: str) -> int:
+    return SCALES.get(value.lower()) or int(value)
+
+
+async def seed(posts: int, seed_value: int = 0) -> dict:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    seeder = Seeder(posts, seed_value)
+    for step in (seeder.users_and_follows, seeder.images_rows, seeder.posts_comments_likes,
+                 seeder.items_and_wants, seeder.fix_sequences):
+        await step()
+    return seeder.counts
+
+
+async def run(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="10k", help="10k / 1m / 10m，或直接给出帖子数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    counts = await seed(parse_scale(args.scale), args.seed)
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(f"dialect: {engine.dialect.name}，共 {total} 行，用时 {elapsed:.1f}s（{total / elapsed:.0f} 行/s）")
+    for table, count in counts.items():
+        print(f"  {table:<16} {count}")
+    await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))